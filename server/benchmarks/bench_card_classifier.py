@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+"""Benchmark: memory-card line classification over a 10k-line transcript.
+
+No services needed; the baseline is read from git.
+
+How to run:
+
+  cd server
+  python benchmarks/bench_card_classifier.py --lines 10000 --repeat 5
+  python benchmarks/bench_card_classifier.py --base 0a747a1
+
+Modes:
+- baseline: `structured_condense` as of `--base` (loaded with `git show`): one pass per bucket
+  over the lines (action regex, marker substrings, `extract_directive_buckets` trying up to
+  seven regexes per line, then every fact anchor as separate substring tests)
+- card: the current `structured_condense` on the whole transcript (cleaning, classification,
+  merge)
+- compiled: `LineClassifier.classify` per line (one action regex, one directive alternation,
+  one keyword scan)
+- uncached: the same without the hit-set -> rules cache (`LineClassifier._fired`)
+
+Before timing, every distinct line is checked to get the same buckets from `classify` as from
+the baseline card of that line alone (whole-text heuristics such as "localhost" are left out:
+they are not per-line rules).
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+from memos_server.condensation import structured_condense  # noqa: E402
+from memos_server.demo_seed import get_demo_seed_messages_zh  # noqa: E402
+from memos_server.line_classifier import BUCKETS, LineClassifier  # noqa: E402
+from memos_server.memory_card import clean_line  # noqa: E402
+
+_FILLER = [
+    "ok, let me check the logs",
+    "the build passed on CI but the container still restarts",
+    "I think the issue is in the connection pool settings",
+    "可以，我先跑一下看看结果",
+    "这个问题之前也遇到过，等我确认一下",
+    "`docker compose logs -f api`",
+    "curl -s localhost:8000/v1/health",
+    "redis is listening on 6379 inside the network",
+]
+
+# Risks the baseline derives from the whole text, not from single lines.
+_TEXT_RISKS = {
+    "CORS-like symptom masking backend error (e.g. DB auth / 500)",
+    "CORS header/config mismatch",
+    "DB/Redis connection refused",
+    "Container vs host networking mismatch (localhost)",
+}
+
+
+def _load_module(rev: str, path: str, name: str, deps: dict[str, types.ModuleType]) -> types.ModuleType:
+    source = subprocess.run(
+        ["git", "-C", str(SERVER_DIR), "show", f"{rev}:./{path}"], capture_output=True, text=True, check=True
+    ).stdout
+    module = types.ModuleType(name)
+    # Its own imports of `deps` resolve to the baseline modules while it executes.
+    saved = {key: sys.modules.get(key) for key in [*deps, name]}
+    sys.modules.update(deps)
+    sys.modules[name] = module
+    try:
+        exec(compile(source, f"{rev}:{path}", "exec"), module.__dict__)
+    finally:
+        for key, value in saved.items():
+            if key == name:
+                continue
+            if value is None:
+                sys.modules.pop(key, None)
+            else:
+                sys.modules[key] = value
+    return module
+
+
+def load_baseline(rev: str) -> types.ModuleType:
+    """`memos_server.condensation` as of `rev` (with the extractor of that revision)."""
+
+    extractor = _load_module(rev, "memos_server/extractor.py", "_baseline_extractor", {})
+    return _load_module(
+        rev, "memos_server/condensation.py", "_baseline_condensation", {"memos_server.extractor": extractor}
+    )
+
+
+def baseline_buckets(baseline: types.ModuleType, line: str) -> dict[str, list[str]]:
+    card = json.loads(baseline.structured_condense(line))
+    return {b: [item for item in card[b] if not (b == "risks" and item in _TEXT_RISKS)] for b in BUCKETS}
+
+
+def compiled_buckets(classifier: LineClassifier, line: str) -> dict[str, list[str]]:
+    out: dict[str, list[str]] = {b: [] for b in BUCKETS}
+    for bucket, item in classifier.classify(line):
+        out[bucket].append(item)
+    # The card keeps each item once.
+    return {b: list(dict.fromkeys(items)) for b, items in out.items()}
+
+
+def make_transcript(n: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    pool = [f"[{role}] {text}" for role, text in get_demo_seed_messages_zh()]
+    lines = []
+    for i in range(n):
+        # ~1 in 4 lines carries a directive/anchor from the seed, the rest is chatter.
+        line = rng.choice(pool) if rng.random() < 0.25 else f"[agent] {rng.choice(_FILLER)} #{i}"
+        lines.append(line)
+    return lines
+
+
+def _time(fn, repeat: int) -> float:  # type: ignore[no-untyped-def]
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--base", default="0a747a1", help="git revision of the baseline (default: %(default)s)")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.base)
+    transcript = make_transcript(args.lines)
+    cleaned = [s for s in (clean_line(line) for line in transcript) if s]
+    classifier = LineClassifier()
+
+    for line in dict.fromkeys(cleaned):
+        expected, got = baseline_buckets(baseline, line), compiled_buckets(classifier, line)
+        if expected != got:
+            raise SystemExit(f"mismatch: {line!r}\n baseline={expected}\n compiled={got}")
+
+    def uncached() -> None:
+        for s in cleaned:
+            classifier._fired.clear()
+            classifier.classify(s)
+
+    text = "\n".join(transcript)
+    results = {
+        "baseline": _time(lambda: baseline.structured_condense(text), args.repeat),
+        "card": _time(lambda: structured_condense(text), args.repeat),
+        "compiled": _time(lambda: [classifier.classify(s) for s in cleaned], args.repeat),
+        "uncached": _time(uncached, args.repeat),
+    }
+    print(f"lines={len(cleaned)} repeat={args.repeat} base={args.base} (best of)")
+    for mode, seconds in results.items():
+        print(f"{mode:>9}: {seconds * 1000:8.2f} ms  {len(cleaned) / seconds:12,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
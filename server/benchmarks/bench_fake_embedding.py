@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+"""Micro-benchmark: scalar `fake_embedding` loop vs vectorized `fake_embeddings`.
+
+How to run:
+
+  cd server
+  python benchmarks/bench_fake_embedding.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+import numpy as np  # noqa: E402
+
+from memos_server.embedding import EMBEDDING_DIM, fake_embedding, fake_embeddings  # noqa: E402
+
+
+def _best_per_call(fn, number: int, repeat: int = 5) -> float:  # type: ignore[no-untyped-def]
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def main() -> None:
+    print(f"dim={EMBEDDING_DIM}")
+    print(f"{'texts':>7} {'scalar':>12} {'vectorized':>12} {'speedup':>8}")
+    for n in (1, 100, 10_000):
+        texts = [f"[user] message {i}: redis port 6379 / postgres 5432" for i in range(n)]
+
+        # Sanity: the fast path must be bit-identical.
+        assert np.array_equal(fake_embeddings(texts), np.array([fake_embedding(t) for t in texts]))
+
+        number = max(1, 20_000 // n)
+        scalar = _best_per_call(lambda: [fake_embedding(t) for t in texts], number)
+        vectorized = _best_per_call(lambda: fake_embeddings(texts), number)
+        print(f"{n:>7} {scalar * 1e3:>10.3f}ms {vectorized * 1e3:>10.3f}ms {scalar / vectorized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
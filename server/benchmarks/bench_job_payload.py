@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+"""Benchmark: size and enqueue cost of condensation job payloads.
+
+No services needed for the size/serialization numbers; pass `--redis-url` to also enqueue into
+a scratch queue and read `MEMORY USAGE` of the job hashes (the queue is emptied afterwards).
+
+How to run:
+
+  cd server
+  python benchmarks/bench_job_payload.py --jobs 2000
+  python benchmarks/bench_job_payload.py --jobs 2000 --redis-url redis://localhost:6379/0
+
+Payloads:
+- data: the first `/v1/query` protocol (`run_condensation_job` with 40 memory ids and the
+  previous card as `prev_summary_text`)
+- keyword: scheduler jobs with keyword args (token, watermark, trigger reason/details)
+- slim: scheduler jobs as positional references (`JOB_ARGS`) with a short description; the
+  trigger lives in the session's meta hash
+
+Bytes are the job hash fields RQ writes (pickled data + description + bookkeeping).
+"""
+
+import argparse
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import redis
+from rq import Queue
+from rq.job import Job
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+from memos_server.condensation import structured_condense  # noqa: E402
+from memos_server.demo_seed import get_demo_seed_messages_zh  # noqa: E402
+from memos_server.scheduler import JOB_FUNC  # noqa: E402
+
+_DETAILS = {"source": "api:/v1/query", "strategy": "rolling_summary_v1", "new_message_count": 40}
+
+
+def payloads() -> dict[str, tuple[str, tuple[object, ...], dict[str, object], str | None]]:
+    """Mode -> (func, args, kwargs, description)."""
+
+    card = structured_condense("\n".join(f"[{role}] {text}" for role, text in get_demo_seed_messages_zh()))
+    ref = ("default", "sess-" + uuid.uuid4().hex[:12], uuid.uuid4().hex, int(time.time() * 1000))
+    data_kwargs: dict[str, object] = {
+        "namespace": ref[0],
+        "session_id": ref[1],
+        "memory_ids": [str(uuid.uuid4()) for _ in range(40)],
+        "prev_summary_id": str(uuid.uuid4()),
+        "prev_summary_text": card,
+        "trigger_reason": "new_messages_threshold",
+        "trigger_details": _DETAILS,
+    }
+    keyword_kwargs: dict[str, object] = {
+        "namespace": ref[0],
+        "session_id": ref[1],
+        "token": ref[2],
+        "first_requested_ms": ref[3],
+        "trigger_reason": "new_messages_threshold",
+        "trigger_details": _DETAILS,
+    }
+    return {
+        "data": ("memos_server.condensation.run_condensation_job", (), data_kwargs, None),
+        "keyword": (JOB_FUNC, (), keyword_kwargs, None),
+        "slim": (JOB_FUNC, ref, {}, f"condense {ref[0]}/{ref[1]}"),
+    }
+
+
+def _hash_bytes(job: Job) -> int:
+    return sum(len(str(k)) + len(v if isinstance(v, (bytes, str)) else str(v)) for k, v in job.to_dict().items())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--redis-url", default="")
+    args = parser.parse_args()
+
+    client = redis.Redis.from_url(args.redis_url or "redis://localhost:6379/0")
+    print(f"jobs={args.jobs}")
+    for mode, (func, job_args, kwargs, description) in payloads().items():
+        t0 = time.perf_counter()
+        for _ in range(args.jobs):
+            job = Job.create(func, args=job_args, kwargs=kwargs, description=description, connection=client)
+            job.to_dict()
+        serialize_us = (time.perf_counter() - t0) / args.jobs * 1e6
+        line = f"{mode:>8}: {_hash_bytes(job):6d} B/job  serialize {serialize_us:7.1f} us/job"
+
+        if args.redis_url:
+            queue = Queue(f"bench-payload-{uuid.uuid4().hex[:8]}", connection=client)
+            t0 = time.perf_counter()
+            jobs = [queue.enqueue(func, args=job_args, kwargs=kwargs, description=description) for _ in range(args.jobs)]
+            enqueue_us = (time.perf_counter() - t0) / args.jobs * 1e6
+            used = sum(int(client.memory_usage(j.key) or 0) for j in jobs[:200]) / min(200, len(jobs))
+            queue.empty()
+            queue.delete(delete_jobs=True)
+            line += f"  enqueue {enqueue_us:7.1f} us/job  redis {used:7.0f} B/job"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+"""Load benchmark: `/v1/query` latency/throughput, sync vs async request path.
+
+Run one API per mode against the same Postgres/Redis (seeded by this script), e.g.:
+
+  cd server
+  MEMOS_API_ASYNC=0 uvicorn memos_server.app:create_app --factory --port 8000
+  MEMOS_API_ASYNC=1 uvicorn memos_server.app:create_app --factory --port 8001
+  python benchmarks/bench_load_query.py --url sync=http://127.0.0.1:8000 --url async=http://127.0.0.1:8001
+
+Each target is measured at 50/200/1000 concurrent clients (override with --clients).
+The result cache should be off (default) so every request reaches L1/L2.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+QUERIES = ["数据库端口是多少", "redis 配置", "部署步骤", "what did we decide about caching", "错误日志"]
+
+
+def _pct(sorted_ms: list[float], p: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(p / 100.0 * (len(sorted_ms) - 1))))]
+
+
+async def _seed(client: httpx.AsyncClient, namespace: str, sessions: int) -> None:
+    for i in range(sessions):
+        r = await client.post("/v1/dev/seed", params={"namespace": namespace, "session_id": f"load-{i}", "reset": True})
+        r.raise_for_status()
+
+
+async def _run_level(base_url: str, namespace: str, sessions: int, clients: int, requests_per_client: int) -> dict[str, float]:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    latencies: list[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+
+        async def worker(worker_id: int) -> None:
+            nonlocal errors
+            for j in range(requests_per_client):
+                body = {
+                    "namespace": namespace,
+                    "session_id": f"load-{(worker_id + j) % sessions}",
+                    "query": QUERIES[(worker_id + j) % len(QUERIES)],
+                    "top_k": 5,
+                }
+                started = time.perf_counter()
+                try:
+                    r = await client.post("/v1/query", json=body)
+                    r.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000.0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "ok": float(len(latencies)),
+        "errors": float(errors),
+        "rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50": _pct(latencies, 50),
+        "p95": _pct(latencies, 95),
+        "p99": _pct(latencies, 99),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", action="append", required=True, help="label=base_url (repeatable)")
+    parser.add_argument("--clients", default="50,200,1000")
+    parser.add_argument("--requests-per-client", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--namespace", default="LoadBench")
+    args = parser.parse_args()
+
+    targets = [tuple(u.split("=", 1)) for u in args.url]
+    levels = [int(c) for c in args.clients.split(",") if c.strip()]
+
+    async with httpx.AsyncClient(base_url=targets[0][1], timeout=60.0) as client:
+        await _seed(client, args.namespace, args.sessions)
+
+    print(f"{'target':>8} {'clients':>8} {'ok':>7} {'err':>5} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, base_url in targets:
+        for clients in levels:
+            s = await _run_level(base_url, args.namespace, args.sessions, clients, args.requests_per_client)
+            print(
+                f"{label:>8} {clients:>8} {int(s['ok']):>7} {int(s['errors']):>5} {s['rps']:>9.1f} "
+                f"{s['p50']:>7.1f}ms {s['p95']:>7.1f}ms {s['p99']:>7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
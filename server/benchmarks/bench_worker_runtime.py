@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+"""Benchmark: condensation job throughput, per-job setup vs the persistent worker runtime.
+
+Needs the same Postgres/Redis as the API (MEMOS_DATABASE_URL / MEMOS_REDIS_URL).
+
+How to run:
+
+  cd server
+  python benchmarks/bench_worker_runtime.py --jobs 200
+
+Modes:
+- per_job_setup: the context is rebuilt before every job (settings + new engine/pool + Redis
+  clients, i.e. the previous behaviour of `run_condensation_job`)
+- runtime: one `WorkerContext` for all jobs (what `worker.py` does now)
+- rq_fork / rq_simple (with --rq): the same jobs through RQ in burst mode with the forking
+  `rq.Worker` vs `SimpleWorker` on a scratch queue
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+from rq import Queue, SimpleWorker, Worker  # noqa: E402
+
+from memos_server.condensation import run_condensation_job  # noqa: E402
+from memos_server.worker_runtime import get_worker_context, reset_worker_context  # noqa: E402
+
+NAMESPACE = "WorkerBench"
+JOB = "memos_server.condensation.run_condensation_job"
+TEXT = "[user] 部署时 postgres 端口 5432 被占用，改成 5433；redis 6379 正常。"
+
+
+def _job_kwargs(i: int) -> dict[str, object]:
+    return {"namespace": NAMESPACE, "session_id": f"bench-{i % 20}", "raw_text": f"{TEXT} #{i}"}
+
+
+def _inline(jobs: int, per_job_setup: bool) -> float:
+    reset_worker_context()
+    started = time.perf_counter()
+    for i in range(jobs):
+        if per_job_setup:
+            reset_worker_context()
+        run_condensation_job(**_job_kwargs(i))  # type: ignore[arg-type]
+    return time.perf_counter() - started
+
+
+def _rq(jobs: int, worker_cls: type[Worker]) -> float:
+    ctx = get_worker_context()
+    queue = Queue("condensation-bench", connection=ctx.queues.condensation.connection)
+    queue.empty()
+    for i in range(jobs):
+        queue.enqueue(JOB, **_job_kwargs(i))
+    started = time.perf_counter()
+    worker_cls([queue], connection=queue.connection).work(burst=True)
+    return time.perf_counter() - started
+
+
+def _cleanup() -> None:
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+
+    with Session(get_worker_context().db.engine) as session:
+        session.execute(text("DELETE FROM condensations WHERE namespace = :ns"), {"ns": NAMESPACE})
+        session.execute(text("DELETE FROM audit_logs WHERE namespace = :ns"), {"ns": NAMESPACE})
+        session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--rq", action="store_true", help="also measure through RQ workers (burst mode)")
+    args = parser.parse_args()
+
+    modes = [("per_job_setup", lambda: _inline(args.jobs, True)), ("runtime", lambda: _inline(args.jobs, False))]
+    if args.rq:
+        modes += [("rq_fork", lambda: _rq(args.jobs, Worker)), ("rq_simple", lambda: _rq(args.jobs, SimpleWorker))]
+
+    print(f"jobs={args.jobs}")
+    print(f"{'mode':>14} {'seconds':>9} {'jobs/s':>9}")
+    try:
+        for name, run in modes:
+            elapsed = run()
+            print(f"{name:>14} {elapsed:>9.2f} {args.jobs / elapsed:>9.1f}")
+    finally:
+        _cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,16 +13,32 @@ CREATE TABLE IF NOT EXISTS memories (
   metadata JSONB NOT NULL DEFAULT '{}'::jsonb,
   importance REAL NOT NULL DEFAULT 0.5,
   embedding vector(32),
+  -- Lexemes from memos_server.lexical.tokenize (CJK-aware), for hybrid retrieval.
+  lexical tsvector,
+  -- Rerank features computed at ingest (text is only read for the final top_k).
+  token_hashes INTEGER[],
+  token_estimate INTEGER,
+  text_length INTEGER,
+  -- Memory-card buckets + signals of the message (memory_card.memory_buckets), aggregated by
+  -- condensation instead of re-classifying text.
+  buckets JSONB,
   created_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
 CREATE INDEX IF NOT EXISTS idx_memories_namespace_created_at ON memories(namespace, created_at DESC);
 
--- pgvector cosine distance index for similarity search
-CREATE INDEX IF NOT EXISTS idx_memories_embedding_cosine
+-- Per-session access path: exact session scans, "new messages since" lookups.
+CREATE INDEX IF NOT EXISTS idx_memories_namespace_session_created_at
+  ON memories(namespace, session_id, created_at DESC);
+
+-- pgvector cosine distance index for similarity search (large sessions).
+-- HNSW (unlike ivfflat) needs no training data, so it can be created on an empty table.
+CREATE INDEX IF NOT EXISTS idx_memories_embedding_hnsw
   ON memories
-  USING ivfflat (embedding vector_cosine_ops)
-  WITH (lists = 100);
+  USING hnsw (embedding vector_cosine_ops);
+
+-- Full-text candidates for hybrid (lexical + vector) retrieval.
+CREATE INDEX IF NOT EXISTS idx_memories_lexical ON memories USING gin (lexical);
 
 CREATE TABLE IF NOT EXISTS condensations (
   id UUID PRIMARY KEY,
@@ -35,6 +51,8 @@ CREATE TABLE IF NOT EXISTS condensations (
   condensed_text TEXT NOT NULL,
   token_original INTEGER NOT NULL,
   token_condensed INTEGER NOT NULL,
+  covered_until TIMESTAMPTZ,
+  covered_id UUID,
   created_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
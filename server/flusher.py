@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+"""Write-behind flusher entrypoint.
+
+How to run locally (only needed when MEMOS_INGEST_MODE=write_behind):
+
+  cd server
+  source .venv/bin/activate
+  python flusher.py
+
+This process drains the ingest Redis stream and writes `memories`/`audit_logs` in bulk.
+"""
+
+import redis
+
+from memos_server.db import create_db
+from memos_server.embedding import create_embedder
+from memos_server.env import init_env
+from memos_server.settings import get_settings
+from memos_server.write_behind import run_flusher
+
+
+def main() -> None:
+  init_env()
+
+  settings = get_settings()
+  db = create_db(settings.database_url)
+  # Stream payloads are JSON text; decode to str like the API's L1 client.
+  conn = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+
+  run_flusher(
+    db,
+    conn,
+    create_embedder(settings),
+    settings.write_behind_stream,
+    batch_size=settings.write_behind_batch_size,
+    claim_idle_ms=settings.write_behind_claim_idle_ms,
+  )
+
+
+if __name__ == "__main__":
+  main()
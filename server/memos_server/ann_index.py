@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import random
+import threading
+from typing import Callable
+
+import numpy as np
+
+
+class HnswIndex:
+    """In-process HNSW (Hierarchical Navigable Small World) index over NumPy arrays.
+
+    Scope: cosine similarity over L2-normalized float32 vectors, string labels (memory ids)
+    and one string group per vector (session_id) for filtered search.
+
+    Design notes:
+    - Insert-only graph with tombstones: `remove()` hides a label from results but keeps it
+      as a routing node (rebuild to reclaim space).
+    - Small groups are answered by an exact NumPy scan over the group's rows: filtered HNSW
+      degrades when the filter is very selective, and a scan over a few thousand rows is
+      cheaper anyway.
+    - Thread-safe via one re-entrant lock (readers are short; ingest adds are incremental).
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        *,
+        m: int = 16,
+        ef_construction: int = 100,
+        seed: int = 0,
+        capacity: int = 1024,
+    ) -> None:
+        self.dim = int(dim)
+        self.m = int(m)
+        self.m0 = 2 * self.m
+        self.ef_construction = int(ef_construction)
+        self._level_mult = 1.0 / math.log(max(self.m, 2))
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+
+        self._vectors = np.zeros((max(1, capacity), self.dim), dtype=np.float32)
+        self._deleted = np.zeros(max(1, capacity), dtype=bool)
+        self._count = 0
+        self._live = 0
+        self.labels: list[str] = []
+        self.groups: list[str] = []
+        self._label_index: dict[str, int] = {}
+        self._group_members: dict[str, list[int]] = {}
+        # node -> level -> neighbor node indexes
+        self._links: list[list[list[int]]] = []
+        self._entry = -1
+        self._max_level = -1
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __contains__(self, label: object) -> bool:
+        i = self._label_index.get(label)  # type: ignore[arg-type]
+        return i is not None and not bool(self._deleted[i])
+
+    def group_size(self, group: str) -> int:
+        return len(self._group_members.get(group, ()))
+
+    def nbytes(self) -> int:
+        """Approximate resident size (vectors + adjacency lists + per-node Python objects)."""
+
+        link_slots = sum(len(level) for node in self._links for level in node)
+        return int(self._vectors.nbytes + self._deleted.nbytes + link_slots * 36 + self._count * 240)
+
+    # --- build ---
+
+    def add(self, label: str, vector: np.ndarray, group: str = "") -> bool:
+        """Insert one vector. Returns False if the label is already indexed."""
+
+        with self._lock:
+            if label in self._label_index:
+                return False
+
+            v = self._normalize(vector)
+            i = self._count
+            self._reserve(i + 1)
+            self._vectors[i] = v
+            self._count += 1
+            self._live += 1
+            self.labels.append(label)
+            self.groups.append(group)
+            self._label_index[label] = i
+            self._group_members.setdefault(group, []).append(i)
+
+            level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+            self._links.append([[] for _ in range(level + 1)])
+
+            if self._entry < 0:
+                self._entry, self._max_level = i, level
+                return True
+
+            ep = [self._entry]
+            for lc in range(self._max_level, level, -1):
+                ep = [self._search_layer(v, ep, 1, lc)[0][1]]
+
+            for lc in range(min(level, self._max_level), -1, -1):
+                candidates = self._search_layer(v, ep, self.ef_construction, lc)
+                neighbors = self._select_neighbors(candidates, self.m)
+                self._links[i][lc] = neighbors
+                max_links = self.m0 if lc == 0 else self.m
+                for nb in neighbors:
+                    nb_links = self._links[nb][lc]
+                    nb_links.append(i)
+                    if len(nb_links) > max_links:
+                        # Shrink by distance only: the heuristic runs once per insert for the new
+                        # node, while shrinking happens for up to `m` neighbors per insert.
+                        d = self._distances(self._vectors[nb], nb_links)
+                        keep = np.argpartition(d, max_links - 1)[:max_links]
+                        self._links[nb][lc] = [nb_links[j] for j in keep.tolist()]
+                ep = [idx for _, idx in candidates]
+
+            if level > self._max_level:
+                self._entry, self._max_level = i, level
+            return True
+
+    def remove(self, label: str) -> bool:
+        with self._lock:
+            i = self._label_index.get(label)
+            if i is None or self._deleted[i]:
+                return False
+            self._deleted[i] = True
+            self._live -= 1
+            members = self._group_members.get(self.groups[i])
+            if members is not None:
+                members.remove(i)
+            return True
+
+    def remove_group(self, group: str) -> int:
+        with self._lock:
+            members = self._group_members.pop(group, [])
+            for i in members:
+                self._deleted[i] = True
+            self._live -= len(members)
+            return len(members)
+
+    # --- query ---
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        *,
+        group: str | None = None,
+        ef: int = 64,
+        brute_force_max: int = 2048,
+    ) -> list[tuple[str, float]]:
+        """Top-k `(label, cosine similarity)` pairs, best first, optionally within one group."""
+
+        with self._lock:
+            if self._live == 0 or k <= 0:
+                return []
+            q = self._normalize(query)
+
+            if group is not None:
+                members = self._group_members.get(group, [])
+                if len(members) <= brute_force_max:
+                    return self._exact(q, members, k)
+
+            ep = [self._entry]
+            for lc in range(self._max_level, 0, -1):
+                ep = [self._search_layer(q, ep, 1, lc)[0][1]]
+
+            deleted, groups = self._deleted, self.groups
+            if group is None:
+                accept: Callable[[int], bool] = lambda n: not deleted[n]
+            else:
+                accept = lambda n: not deleted[n] and groups[n] == group
+            found = self._search_layer(q, ep, max(int(ef), k), 0, accept=accept)
+            return [(self.labels[n], 1.0 - d) for d, n in found[:k]]
+
+    def _exact(self, q: np.ndarray, members: list[int], k: int) -> list[tuple[str, float]]:
+        if not members:
+            return []
+        idx = np.asarray(members, dtype=np.int64)
+        sims = self._vectors[idx] @ q
+        top = np.argsort(-sims, kind="stable")[:k]
+        return [(self.labels[int(idx[t])], float(sims[t])) for t in top]
+
+    # --- internals ---
+
+    def _normalize(self, vector: np.ndarray) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if v.shape[0] != self.dim:
+            raise ValueError(f"expected dim {self.dim}, got {v.shape[0]}")
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm > 0.0 else v
+
+    def _reserve(self, n: int) -> None:
+        cap = self._vectors.shape[0]
+        if n <= cap:
+            return
+        new_cap = max(n, cap * 2)
+        vectors = np.zeros((new_cap, self.dim), dtype=np.float32)
+        vectors[:cap] = self._vectors
+        deleted = np.zeros(new_cap, dtype=bool)
+        deleted[:cap] = self._deleted
+        self._vectors, self._deleted = vectors, deleted
+
+    def _distances(self, q: np.ndarray, nodes: list[int]) -> np.ndarray:
+        return 1.0 - self._vectors[nodes] @ q
+
+    def _search_layer(
+        self,
+        q: np.ndarray,
+        entry_points: list[int],
+        ef: int,
+        level: int,
+        accept: Callable[[int], bool] | None = None,
+    ) -> list[tuple[float, int]]:
+        """Best-first search on one layer. Returns `(distance, node)` ascending.
+
+        With `accept`, every node is still traversed but only accepted nodes enter the result
+        set, so filtered-out regions keep routing the search.
+        """
+
+        visited = set(entry_points)
+        d0 = self._distances(q, entry_points).tolist()
+        candidates = list(zip(d0, entry_points))
+        heapq.heapify(candidates)
+        results = [(-d, n) for d, n in zip(d0, entry_points) if accept is None or accept(n)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            dc, c = heapq.heappop(candidates)
+            if len(results) >= ef and dc > -results[0][0]:
+                break
+            links = self._links[c]
+            if level >= len(links):
+                continue
+            fresh = [n for n in links[level] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for dist, n in zip(self._distances(q, fresh).tolist(), fresh):
+                if len(results) < ef or dist < -results[0][0]:
+                    heapq.heappush(candidates, (dist, n))
+                    if accept is None or accept(n):
+                        heapq.heappush(results, (-dist, n))
+                        if len(results) > ef:
+                            heapq.heappop(results)
+
+        return sorted((-nd, n) for nd, n in results)
+
+    def _select_neighbors(self, candidates: list[tuple[float, int]], m: int) -> list[int]:
+        """HNSW neighbor heuristic: prefer candidates not already covered by a closer pick.
+
+        `candidates` are `(distance to base, node)` ascending. Pruned candidates are kept to
+        fill up to `m` (better recall on clustered data), so at most `m` candidates need no work.
+        """
+
+        nodes = [c for _, c in candidates]
+        if len(nodes) <= m:
+            return nodes
+
+        # One matrix product instead of a vector op per (candidate, selected) pair.
+        sims = (self._vectors[nodes] @ self._vectors[nodes].T).tolist()
+        selected: list[int] = []
+        pruned: list[int] = []
+        for j, (dist, _c) in enumerate(candidates):
+            if len(selected) >= m:
+                break
+            row = sims[j]
+            # Covered: closer to an already selected neighbor than to the base node.
+            if any(1.0 - row[s] < dist for s in selected):
+                pruned.append(j)
+            else:
+                selected.append(j)
+        for j in pruned:
+            if len(selected) >= m:
+                break
+            selected.append(j)
+        return [nodes[j] for j in selected]
+
+    # --- snapshots ---
+
+    def save(self, path: str, meta: dict[str, object] | None = None) -> None:
+        """Write an `.npz` snapshot (no pickle) atomically."""
+
+        with self._lock:
+            n = self._count
+            node_levels = np.array([len(node) for node in self._links], dtype=np.int32)
+            flat: list[int] = []
+            offsets = [0]
+            for node in self._links:
+                for level in node:
+                    flat.extend(level)
+                    offsets.append(len(flat))
+            header = {
+                "dim": self.dim,
+                "m": self.m,
+                "ef_construction": self.ef_construction,
+                "entry": self._entry,
+                "max_level": self._max_level,
+                **(meta or {}),
+            }
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                np.savez(
+                    f,
+                    vectors=self._vectors[:n],
+                    deleted=self._deleted[:n],
+                    labels=np.array(self.labels, dtype=str),
+                    groups=np.array(self.groups, dtype=str),
+                    node_levels=node_levels,
+                    link_offsets=np.array(offsets, dtype=np.int64),
+                    link_data=np.array(flat, dtype=np.int32),
+                    header=np.array(json.dumps(header)),
+                )
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> tuple[HnswIndex, dict[str, object]]:
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data["header"]))
+            index = cls(
+                int(header["dim"]),
+                m=int(header["m"]),
+                ef_construction=int(header["ef_construction"]),
+                capacity=max(1, len(data["labels"])),
+            )
+            n = len(data["labels"])
+            index._vectors[:n] = data["vectors"]
+            index._deleted[:n] = data["deleted"]
+            index._count = n
+            index.labels = [str(x) for x in data["labels"]]
+            index.groups = [str(x) for x in data["groups"]]
+            offsets = data["link_offsets"].tolist()
+            link_data = data["link_data"].tolist()
+            pos = 0
+            for levels in data["node_levels"].tolist():
+                node = []
+                for _ in range(levels):
+                    node.append(link_data[offsets[pos] : offsets[pos + 1]])
+                    pos += 1
+                index._links.append(node)
+
+        for i, (label, group) in enumerate(zip(index.labels, index.groups)):
+            index._label_index[label] = i
+            if not index._deleted[i]:
+                index._group_members.setdefault(group, []).append(i)
+        index._live = int(n - int(index._deleted[:n].sum()))
+        index._entry = int(header["entry"])
+        index._max_level = int(header["max_level"])
+        return index, header
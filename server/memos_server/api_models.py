@@ -37,11 +37,22 @@ class IngestResponse(BaseModel):
     accepted: bool = True
 
 
+class IngestBatchRequest(BaseModel):
+    items: list[IngestRequest] = Field(..., min_length=1, max_length=1_000)
+
+
+class IngestBatchResponse(BaseModel):
+    memory_ids: list[str]
+    accepted: int
+
+
 class QueryRequest(BaseModel):
     namespace: str = Field(..., min_length=1, max_length=128)
     session_id: str = Field(..., min_length=1, max_length=128)
     query: str = Field(..., min_length=1, max_length=2_000)
     top_k: int = Field(default=6, ge=1, le=50)
+    # Overrides MEMOS_RETRIEVAL_MODE for this request.
+    retrieval_mode: Literal["vector", "hybrid"] | None = None
 
 
 class RetrievedChunk(BaseModel):
@@ -72,8 +83,12 @@ class QueryResponse(BaseModel):
     session_summary_id: str | None = None
     session_summary_cache_hit: bool = False
     session_summary_enqueued: bool = False
+    # A refresh was due but not enqueued: the condensation queues are over the hard depth.
+    session_summary_deferred: bool = False
     context_pack_id: str | None = None
     context_pack: dict[str, Any] = Field(default_factory=dict)
+    # Served from the query result cache (same session watermark, query and config).
+    cache_hit: bool = False
 
 
 class OpsStatsResponse(BaseModel):
@@ -86,6 +101,9 @@ class OpsStatsResponse(BaseModel):
 class OpsQueueInfo(BaseModel):
     name: str
     count: int
+    # Live RQ workers listening on the queue, and pool restarts of its shard worker.
+    workers: int = 0
+    restarts: int = 0
 
 
 class OpsRecentCondensation(BaseModel):
@@ -99,9 +117,110 @@ class OpsRecentCondensation(BaseModel):
     created_at: str
 
 
+class OpsWriteBehindInfo(BaseModel):
+    enabled: bool = False
+    stream: str
+    # Unflushed entries (pending + not yet delivered to the flusher).
+    length: int = 0
+    pending: int = 0
+    lag: int = 0
+    oldest_age_ms: int = 0
+
+
+class OpsEmbeddingCacheInfo(BaseModel):
+    # Counters are per API process.
+    provider: str
+    size: int = 0
+    maxsize: int = 0
+    shared_enabled: bool = False
+    local_hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+    shared_errors: int = 0
+
+
+class OpsHotIndexInfo(BaseModel):
+    # Per API process (each process holds its own in-memory index).
+    namespace: str
+    loaded: bool = False
+    # Exceeds the memory budget on its own: served from SQL until restart.
+    oversized: bool = False
+    vectors: int = 0
+    bytes: int = 0
+    watermark: str | None = None
+
+
+class OpsPersistenceInfo(BaseModel):
+    # Counters are per API process.
+    mode: str
+    queued: int = 0
+    written_packs: int = 0
+    written_audits: int = 0
+    batches: int = 0
+    sync_fallbacks: int = 0
+    failed_batches: int = 0
+    last_batch_ms: float = 0.0
+
+
+class OpsSchedulerInfo(BaseModel):
+    # Cluster-wide counters (Redis). requested vs runs shows how much coalescing saves.
+    requested: int = 0
+    scheduled: int = 0
+    coalesced: int = 0
+    deferred: int = 0
+    runs: int = 0
+    drained_messages: int = 0
+    catch_up_runs: int = 0
+    batched: int = 0
+    batch_runs: int = 0
+    interactive: int = 0
+
+
+class OpsLaneWaitInfo(BaseModel):
+    # Wait from first request to job start over the lane's recent jobs (cluster-wide).
+    lane: str
+    samples: int = 0
+    p50_ms: int = 0
+    p90_ms: int = 0
+    p99_ms: int = 0
+    max_ms: int = 0
+
+
+class OpsBackpressureInfo(BaseModel):
+    # Queue depth is cluster-wide (cached per API process); counters are per API process.
+    level: str
+    queue_depth: int = 0
+    min_new_messages: int = 0
+    base_min_new_messages: int = 0
+    max_min_new_messages: int = 0
+    soft_depth: int = 0
+    hard_depth: int = 0
+    cache_ms: int = 0
+    depth_age_ms: int = 0
+    # Refreshes deferred at the hard depth / skipped by a raised threshold.
+    deferred: int = 0
+    raised: int = 0
+    depth_errors: int = 0
+
+
+class OpsBacklogInfo(BaseModel):
+    # Messages waiting for (or being folded by) a condensation job.
+    namespace: str
+    session_id: str
+    pending: int
+
+
 class OpsPipelineResponse(BaseModel):
     queues: list[OpsQueueInfo]
     recent_condensations: list[OpsRecentCondensation]
+    write_behind: OpsWriteBehindInfo | None = None
+    embedding_cache: OpsEmbeddingCacheInfo | None = None
+    hot_index: list[OpsHotIndexInfo] = Field(default_factory=list)
+    persistence: OpsPersistenceInfo | None = None
+    condensation_scheduler: OpsSchedulerInfo | None = None
+    condensation_backlog: list[OpsBacklogInfo] = Field(default_factory=list)
+    condensation_backpressure: OpsBackpressureInfo | None = None
+    condensation_lanes: list[OpsLaneWaitInfo] = Field(default_factory=list)
 
 
 class OpsAuditEvent(BaseModel):
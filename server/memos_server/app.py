@@ -1,18 +1,31 @@
 from __future__ import annotations
 
+import asyncio
 import json
-import re
+import random
 import time
 import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from typing import TYPE_CHECKING
 
+import numpy as np
 from fastapi import Depends, FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from rq import Worker
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 from memos_server.env import init_env
 from memos_server.api_models import (
     HealthResponse,
+    IngestBatchRequest,
+    IngestBatchResponse,
     IngestRequest,
     IngestResponse,
     MemoryTier,
@@ -28,20 +41,71 @@ from memos_server.api_models import (
     ResetSessionRequest,
     ResetSessionResponse,
 )
+from memos_server.audit import audit_row, insert_audit_rows
+from memos_server.backpressure import LEVEL_DEFERRED, QueueBackpressure
 from memos_server.db import create_db, ensure_schema
-from memos_server.condensation import card_to_plain_text, estimate_tokens, latest_condensation
-from memos_server.queue import Queues, create_queues
-from memos_server.embedding import fake_embedding
-from memos_server.l1_redis import L1Redis, append_message, clear_session, create_l1, get_window
+from memos_server.condensation import card_to_plain_text, estimate_tokens
+from memos_server.queue import LANE_INTERACTIVE, Queues, create_queues
+from memos_server.query_cache import (
+    QueryCache,
+    bump_watermark,
+    bump_watermarks,
+    cache_key,
+    config_fingerprint,
+    normalize_query,
+)
+from memos_server.embedding import create_embedder
+from memos_server.embedding_cache import CachedEmbeddingProvider
+from memos_server.hot_index import create_hot_index
+from memos_server.ingest import MemoryRecord, insert_memories, new_memory, summarize_batch
+from memos_server.lexical import token_hashes, token_set
+from memos_server.l1_redis import (
+    L1Redis,
+    append_message,
+    append_messages,
+    append_messages_async,
+    clear_session,
+    create_l1,
+    create_l1_async,
+    get_window,
+    get_window_async,
+)
+from memos_server.persistence import MODE_ASYNC, MODE_SAMPLED, PersistenceWriter, context_pack_row, write_now
 from memos_server.procedural import get_procedural_registry
+from memos_server.retrieval import (
+    MODE_HYBRID,
+    RetrievalResult,
+    fetch_hot_hits,
+    fetch_texts,
+    hybrid_search,
+    vector_search,
+)
+from memos_server.scheduler import (
+    backlog_depths,
+    clear_pending,
+    create_scheduler,
+    lane_waits,
+    queue_depth,
+    track_pending,
+)
+from memos_server.session_state import (
+    SessionState,
+    bootstrap_fields,
+    count_unsummarized,
+    drop_state,
+    load_or_bootstrap,
+    load_state_async,
+    store_state_async,
+)
 from memos_server.settings import Settings, get_settings
-
-
-_TOKEN_RE = re.compile(r"[a-zA-Z0-9_]+")
+from memos_server.vector_codec import to_vector
+from memos_server.worker_pool import pool_restarts
+from memos_server.write_behind import enqueue_ingest, ingest_fields, stream_stats
 
 
 def _tokenize(text_value: str) -> set[str]:
-    return set(_TOKEN_RE.findall(text_value.lower()))
+    # Same tokens as the lexical index: alnum/underscore words + CJK unigrams/bigrams.
+    return token_set(text_value)
 
 
 def _score_overlap(query_text: str, candidate_text: str) -> float:
@@ -52,6 +116,14 @@ def _score_overlap(query_text: str, candidate_text: str) -> float:
     return len(q & c) / len(q)
 
 
+def _score_overlap_hashes(query_hashes: set[int], candidate_hashes: list[int]) -> float:
+    """`_score_overlap` on precomputed `lexical.token_hashes` (no candidate re-tokenizing)."""
+
+    if not query_hashes:
+        return 0.0
+    return len(query_hashes.intersection(candidate_hashes)) / len(query_hashes)
+
+
 def _clamp01(value: float) -> float:
     return 0.0 if value < 0.0 else (1.0 if value > 1.0 else value)
 
@@ -63,7 +135,28 @@ def create_app() -> FastAPI:
     """
     init_env()
 
-    app = FastAPI(title="MemOS Memory Controller", version="0.1.0")
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        # Background stages: hot-namespace indexes (queries use SQL until ready) and the
+        # async persistence writer.
+        if hot is not None:
+            hot.start()
+        if persistence is not None:
+            persistence.start()
+        try:
+            yield
+        finally:
+            if persistence is not None:
+                # Drain queued packs/audits before the process exits.
+                persistence.stop()
+            if hot is not None:
+                hot.stop()
+            if adb is not None:
+                await adb.engine.dispose()
+            if aredis is not None:
+                await aredis.aclose()
+
+    app = FastAPI(title="MemOS Memory Controller", version="0.1.0", lifespan=lifespan)
 
     # Allow the Vite dev server to call the API from the browser (CORS).
     # Why: without this, browsers will block requests from http://localhost:3000 to http://localhost:8000.
@@ -82,13 +175,68 @@ def create_app() -> FastAPI:
 
     settings = get_settings()
     db = create_db(settings.database_url)
+    embedder = create_embedder(settings)
     try:
-        ensure_schema(db.engine)
+        ensure_schema(db.engine, embedding_dim=embedder.dim)
     except Exception:
         # Unit tests may run without Postgres; schema will be created by docker init in real deployments.
         pass
     l1 = create_l1(settings.redis_url, settings.l1_window_size)
-    queues = create_queues(settings.redis_url)
+    queues = create_queues(
+        settings.redis_url, settings.condensation_shards, interactive=settings.condensation_interactive_lane
+    )
+    hot = create_hot_index(db, settings, embedder)
+    scheduler = create_scheduler(l1.client, queues, settings)
+    backpressure = QueueBackpressure(
+        lambda: queue_depth(l1.client, queues),
+        base_min_new_messages=settings.summary_refresh_min_new_messages,
+        max_min_new_messages=settings.summary_refresh_max_batch,
+        soft_depth=settings.summary_backpressure_soft_depth,
+        hard_depth=settings.summary_backpressure_hard_depth,
+        cache_ms=settings.summary_backpressure_cache_ms,
+    )
+    persistence = (
+        PersistenceWriter(
+            db,
+            mode=settings.persistence_mode,
+            max_queue=settings.persistence_queue_size,
+            batch_size=settings.persistence_batch_size,
+            flush_interval_ms=settings.persistence_flush_ms,
+        )
+        if settings.persistence_mode in (MODE_ASYNC, MODE_SAMPLED)
+        else None
+    )
+    adb = None
+    aredis = None
+    if settings.api_async:
+        # Imported lazily: the async engine needs `greenlet` (sqlalchemy[asyncio]).
+        from memos_server.async_db import create_async_db
+
+        adb = create_async_db(
+            settings.database_url,
+            pool_size=settings.api_async_pool_size,
+            max_overflow=settings.api_async_max_overflow,
+        )
+        aredis = create_l1_async(settings.redis_url)
+    query_cache = (
+        QueryCache(l1.client, settings.query_cache_ttl_seconds, aclient=aredis) if settings.query_cache_enabled else None
+    )
+    # Everything besides the session's data that shapes a `/v1/query` response.
+    query_fingerprint = config_fingerprint(
+        {
+            "embedder": f"{embedder.name}:{embedder.version}:{embedder.dim}",
+            "l1_window_size": settings.l1_window_size,
+            "retrieval": [
+                settings.retrieval_exact_max_rows,
+                settings.retrieval_hnsw_ef_search,
+                settings.retrieval_hnsw_max_ef_search,
+                settings.retrieval_hybrid_candidates,
+                settings.retrieval_rrf_k,
+                settings.hot_namespaces,
+            ],
+            "summary_refresh": [settings.summary_refresh_min_new_messages, settings.summary_refresh_max_batch],
+        }
+    )
 
     # --- Dependencies (FastAPI DI) ---
     def get_db_session():
@@ -104,13 +252,19 @@ def create_app() -> FastAPI:
     def get_queues() -> Queues:
         return queues
 
-    def _summary_lock_key(namespace: str, session_id: str) -> str:
-        return f"memos:summary_lock:{namespace}:{session_id}"
+    def _publish_ingest(l1_store: L1Redis, records: list[MemoryRecord]) -> None:
+        pipe = l1_store.client.pipeline(transaction=False)
+        _queue_publish(pipe, records)
+        pipe.execute()
 
-    def _try_acquire_summary_lock(l1_store: L1Redis, namespace: str, session_id: str, ttl_seconds: int) -> bool:
-        # Avoid enqueuing duplicate summary jobs for the same session on rapid consecutive queries.
-        key = _summary_lock_key(namespace, session_id)
-        return bool(l1_store.client.set(key, "1", nx=True, ex=ttl_seconds))
+    def _queue_publish(pipe, records: list[MemoryRecord]) -> None:  # type: ignore[no-untyped-def]
+        # One round trip: unsummarized counters (hot session state) + query-cache watermarks.
+        # Also records the ids as pending condensation input (coalescing scheduler).
+        counts = Counter((r.namespace, r.session_id) for r in records)
+        count_unsummarized(pipe, counts)
+        track_pending(pipe, records)
+        for namespace, session_id in counts:
+            bump_watermark(pipe, namespace, session_id)
 
     @app.get("/health", response_model=HealthResponse)
     def health() -> HealthResponse:
@@ -122,7 +276,6 @@ def create_app() -> FastAPI:
     # - L2 (Postgres) stores durable memories + a deterministic fake embedding.
     # This makes the full ingest -> query -> retrieve pipeline real without requiring an external model.
 
-    @app.post("/v1/ingest", response_model=IngestResponse)
     def ingest(
         req: IngestRequest,
         session: Session = Depends(get_db_session),
@@ -133,50 +286,67 @@ def create_app() -> FastAPI:
         append_message(l1_store, req.namespace, req.session_id, req.role.value, req.text, ttl_seconds=3600)
 
         # 2) Write durable memory to Postgres with a deterministic fake embedding
-        memory_id = uuid.uuid4()
-        emb = fake_embedding(req.text)
+        record = new_memory(req.namespace, req.session_id, req.role.value, req.text, req.metadata)
+        audit = audit_row(
+            req.namespace,
+            req.session_id,
+            "INGEST",
+            {"memory_id": record.id, "l1_window": cfg.l1_window_size},
+        )
+        if cfg.ingest_mode == "write_behind":
+            # Durable in the Redis stream; `flusher.py` commits it to Postgres shortly after.
+            enqueue_ingest(l1_store.client, cfg.write_behind_stream, [record], [audit])
+            _publish_ingest(l1_store, [record])
+            return IngestResponse(memory_id=record.id)
+
+        vectors = embedder.embed_many([record.text])
+        insert_memories(session, [record], embedder, vectors=vectors)
+        insert_audit_rows(session, [audit])
+        session.commit()
+        if hot is not None:
+            hot.add([record], vectors)
+        _publish_ingest(l1_store, [record])
 
-        # NOTE: we pass the vector as a string, e.g. '[0.1, -0.2, ...]'
-        # pgvector accepts this format.
-        emb_literal = "[" + ",".join(f"{x:.6f}" for x in emb) + "]"
+        return IngestResponse(memory_id=record.id)
 
-        session.execute(
-            text(
-                """
-                INSERT INTO memories (id, namespace, session_id, role, text, metadata, importance, embedding)
-                VALUES (:id, :namespace, :session_id, :role, :text, CAST(:metadata AS jsonb), :importance, :embedding)
-                """
-            ),
-            {
-                "id": str(memory_id),
-                "namespace": req.namespace,
-                "session_id": req.session_id,
-                "role": req.role.value,
-                "text": req.text,
-                "metadata": json.dumps(req.metadata),
-                "importance": 0.9 if req.role.value == "user" else 0.6,
-                "embedding": emb_literal,
-            },
-        )
+    def ingest_batch(
+        req: IngestBatchRequest,
+        session: Session = Depends(get_db_session),
+        l1_store: L1Redis = Depends(get_l1),
+        cfg: Settings = Depends(get_cfg),
+    ) -> IngestBatchResponse:
+        """Bulk variant of `/v1/ingest` for transcript bursts.
 
-        session.execute(
-            text(
-                """
-                INSERT INTO audit_logs (id, namespace, session_id, event_type, details)
-                VALUES (:id, :namespace, :session_id, :event_type, CAST(:details AS jsonb))
-                """
-            ),
-            {
-                "id": str(uuid.uuid4()),
-                "namespace": req.namespace,
-                "session_id": req.session_id,
-                "event_type": "INGEST",
-                "details": json.dumps({"memory_id": str(memory_id), "l1_window": cfg.l1_window_size}),
-            },
-        )
+        Same semantics as N single ingests, but: one Redis pipeline for every touched
+        L1 window, one multi-row INSERT into `memories`, one `INGEST_BATCH` audit row per
+        session (all tagged with the batch's `batch_id`) and one commit.
+        """
+
+        records = [
+            new_memory(item.namespace, item.session_id, item.role.value, item.text, item.metadata)
+            for item in req.items
+        ]
+
+        append_messages(l1_store, [(r.namespace, r.session_id, r.role, r.text) for r in records], ttl_seconds=3600)
+
+        audits = [
+            audit_row(namespace, session_id, "INGEST_BATCH", details | {"l1_window": cfg.l1_window_size})
+            for namespace, session_id, details in summarize_batch(records)
+        ]
+        if cfg.ingest_mode == "write_behind":
+            enqueue_ingest(l1_store.client, cfg.write_behind_stream, records, audits)
+            _publish_ingest(l1_store, records)
+            return IngestBatchResponse(memory_ids=[r.id for r in records], accepted=len(records))
+
+        vectors = embedder.embed_many([r.text for r in records])
+        insert_memories(session, records, embedder, vectors=vectors)
+        insert_audit_rows(session, audits)
         session.commit()
+        if hot is not None:
+            hot.add(records, vectors)
+        _publish_ingest(l1_store, records)
 
-        return IngestResponse(memory_id=str(memory_id))
+        return IngestBatchResponse(memory_ids=[r.id for r in records], accepted=len(records))
 
     @app.post("/v1/dev/seed")
     def dev_seed(
@@ -184,6 +354,7 @@ def create_app() -> FastAPI:
         session_id: str = "demo-session",
         reset: bool = True,
         session: Session = Depends(get_db_session),
+        l1_store: L1Redis = Depends(get_l1),
     ) -> dict[str, object]:
         """Seed a deterministic demo dataset.
 
@@ -214,50 +385,26 @@ def create_app() -> FastAPI:
 
         demo_messages = get_demo_seed_messages_zh()
 
-        inserted = 0
-        memory_ids: list[str] = []
-        for role, msg in demo_messages:
-            memory_id = str(uuid.uuid4())
-            memory_ids.append(memory_id)
-            emb = fake_embedding(msg)
-            emb_literal = "[" + ",".join(f"{x:.6f}" for x in emb) + "]"
-
-            session.execute(
-                text(
-                    """
-                    INSERT INTO memories (id, namespace, session_id, role, text, metadata, importance, embedding)
-                    VALUES (:id, :namespace, :session_id, :role, :text, CAST(:metadata AS jsonb), :importance, :embedding)
-                    """
-                ),
-                {
-                    "id": memory_id,
-                    "namespace": namespace,
-                    "session_id": session_id,
-                    "role": role,
-                    "text": msg,
-                    "metadata": json.dumps({"seed": True}),
-                    "importance": 0.9 if role == "user" else 0.6,
-                    "embedding": emb_literal,
-                },
-            )
-            inserted += 1
+        records = [new_memory(namespace, session_id, role, msg, {"seed": True}) for role, msg in demo_messages]
+        vectors = embedder.embed_many([r.text for r in records])
+        inserted = insert_memories(session, records, embedder, vectors=vectors)
+        memory_ids = [r.id for r in records]
 
-        session.execute(
-            text(
-                """
-                INSERT INTO audit_logs (id, namespace, session_id, event_type, details)
-                VALUES (:id, :namespace, :session_id, :event_type, CAST(:details AS jsonb))
-                """
-            ),
-            {
-                "id": str(uuid.uuid4()),
-                "namespace": namespace,
-                "session_id": session_id,
-                "event_type": "DEV_SEED",
-                "details": json.dumps({"inserted": inserted, "reset": reset}),
-            },
+        insert_audit_rows(
+            session,
+            [audit_row(namespace, session_id, "DEV_SEED", {"inserted": inserted, "reset": reset})],
         )
         session.commit()
+        if hot is not None:
+            if reset:
+                hot.remove_session(namespace, session_id)
+            hot.add(records, vectors)
+        # Seeding (with or without reset) may change the summary baseline: rebuild state lazily.
+        drop_state(l1_store.client, namespace, session_id)
+        if reset:
+            clear_pending(l1_store.client, namespace, session_id)
+        track_pending(l1_store.client, records)
+        bump_watermarks(l1_store.client, [(namespace, session_id)])
 
         return {
             "ok": True,
@@ -267,50 +414,160 @@ def create_app() -> FastAPI:
             "memory_ids": memory_ids,
         }
 
-    @app.post("/v1/query", response_model=QueryResponse)
-    def query(
+    def _keep_context_pack() -> bool:
+        return settings.persistence_mode != MODE_SAMPLED or random.random() < float(settings.persistence_sample_rate)
+
+    def _persist_query(
+        session: Session,
         req: QueryRequest,
-        session: Session = Depends(get_db_session),
-        l1_store: L1Redis = Depends(get_l1),
-        cfg: Settings = Depends(get_cfg),
-        q: Queues = Depends(get_queues),
+        query_details: dict[str, object],
+        context_pack_id: str | None,
+        context_pack: dict[str, object],
+        *,
+        session_summary_id: str | None,
+        retrieved_memory_ids: list[str],
+    ) -> None:
+        """QUERY audit + context pack (+ its CONTEXT_PACK audit), per MEMOS_PERSISTENCE_MODE."""
+
+        audits = [audit_row(req.namespace, req.session_id, "QUERY", query_details)]
+        packs: list[dict[str, object]] = []
+        if context_pack_id is not None:
+            packs.append(
+                context_pack_row(
+                    req.namespace,
+                    req.session_id,
+                    req.query,
+                    context_pack,
+                    session_summary_id=session_summary_id,
+                    retrieved_memory_ids=retrieved_memory_ids,
+                    context_pack_id=context_pack_id,
+                )
+            )
+            audits.append(
+                audit_row(
+                    req.namespace,
+                    req.session_id,
+                    "CONTEXT_PACK",
+                    {"context_pack_id": context_pack_id, "retrieved": len(retrieved_memory_ids)},
+                )
+            )
+        if persistence is None:
+            write_now(session, packs, audits)
+        else:
+            persistence.submit(session, packs, audits)
+        session.commit()
+
+    def _serve_cached_query(
+        session: Session, req: QueryRequest, cached: QueryResponse, now: int, enqueued: bool, deferred: bool
     ) -> QueryResponse:
-        now = int(time.time() * 1000)
+        # `enqueued` / `deferred`: the refresh policy re-run for this request (a refresh deferred
+        # or held back by backpressure when the entry was stored is retried on hits too). The
+        # entry may come from a query differing only in whitespace/NFC form: echo this one.
+        context_pack = dict(cached.context_pack) | {"query_text": req.query}
+        response = cached.model_copy(
+            update={
+                "id": f"ret-{now}",
+                "cache_hit": True,
+                "session_summary_enqueued": enqueued,
+                "session_summary_deferred": deferred,
+                "context_pack": context_pack,
+            }
+        )
+        if not settings.query_cache_replay_persistence:
+            return response
+
+        context_pack_id = str(uuid.uuid4()) if _keep_context_pack() else None
+        retrieved_memory_ids = [c.id for c in cached.raw_chunks]
+        _persist_query(
+            session,
+            req,
+            {
+                "top_k": req.top_k,
+                "l2_hits": len(retrieved_memory_ids),
+                "cache_hit": True,
+                "cached_context_pack_id": cached.context_pack_id,
+            },
+            context_pack_id,
+            context_pack,
+            session_summary_id=cached.session_summary_id,
+            retrieved_memory_ids=retrieved_memory_ids,
+        )
+        return response.model_copy(update={"context_pack_id": context_pack_id, "context_pack": context_pack})
 
-        # 0) Always include the L1 sliding window as raw context (chronological)
-        l1_msgs = get_window(l1_store, req.namespace, req.session_id)
-        l1_text = "\n".join(f"[{m['role']}] {m['text']}" for m in l1_msgs)
+    def _candidate_k(req: QueryRequest, retrieval_mode: str, cfg: Settings) -> int:
+        # Hybrid mode widens the vector candidate list, then fuses it with full-text hits.
+        return max(req.top_k, int(cfg.retrieval_hybrid_candidates)) if retrieval_mode == MODE_HYBRID else req.top_k
 
-        # 1) L2 vector search using deterministic fake embedding
-        q_emb = fake_embedding(req.query)
-        emb_literal = "[" + ",".join(f"{x:.6f}" for x in q_emb) + "]"
+    def _query_vector(
+        req: QueryRequest, query_text: str, retrieval_mode: str, cfg: Settings
+    ) -> tuple[np.ndarray, list[tuple[str, float]] | None]:
+        """CPU part of the L2 stage: query embedding + hot-index hits (None: use the SQL planner)."""
 
-        rows = session.execute(
-            text(
-                """
-                SELECT id, text, role,
-                       1 - (embedding <=> :q_embedding) AS score
-                FROM memories
-                WHERE namespace = :namespace
-                  AND session_id = :session_id
-                  AND embedding IS NOT NULL
-                ORDER BY embedding <=> :q_embedding
-                LIMIT :k
-                """
-            ),
-            {
-                "q_embedding": emb_literal,
-                "namespace": req.namespace,
-                "session_id": req.session_id,
-                "k": req.top_k,
-            },
-        ).mappings().all()
+        q_emb = to_vector(embedder.embed(query_text), dim=embedder.dim)
+        if hot is None:
+            return q_emb, None
+        return q_emb, hot.search(req.namespace, req.session_id, q_emb, _candidate_k(req, retrieval_mode, cfg))
+
+    def _retrieve(
+        session: Session,
+        req: QueryRequest,
+        query_text: str,
+        retrieval_mode: str,
+        cfg: Settings,
+        vector: tuple[np.ndarray, list[tuple[str, float]] | None] | None = None,
+    ) -> tuple[RetrievalResult, dict[str, str]]:
+        """L2 stage: vector search (hot index or SQL planner), optional hybrid fusion, final texts.
+
+        `vector` is `_query_vector`'s result when the caller computed it already (async path).
+        """
+
+        q_emb, hits = vector if vector is not None else _query_vector(req, query_text, retrieval_mode, cfg)
+        candidate_k = _candidate_k(req, retrieval_mode, cfg)
+
+        retrieval = None
+        if hits is not None:
+            retrieval = fetch_hot_hits(session, req.namespace, req.session_id, hits, candidate_k)
+        if retrieval is None:
+            retrieval = vector_search(
+                session,
+                req.namespace,
+                req.session_id,
+                q_emb,
+                candidate_k,
+                exact_max_rows=int(cfg.retrieval_exact_max_rows),
+                ef_search=int(cfg.retrieval_hnsw_ef_search),
+                max_ef_search=int(cfg.retrieval_hnsw_max_ef_search),
+            )
+        if retrieval_mode == MODE_HYBRID:
+            retrieval = hybrid_search(
+                session,
+                retrieval,
+                req.namespace,
+                req.session_id,
+                query_text,
+                q_emb,
+                req.top_k,
+                candidates=candidate_k,
+                rrf_k=int(cfg.retrieval_rrf_k),
+            )
+
+        # Text is read only for the chunks we return.
+        return retrieval, fetch_texts(session, [str(r["id"]) for r in retrieval.rows])
+
+    def _rank_chunks(query_text: str, retrieval: RetrievalResult, texts: dict[str, str]) -> list[RetrievedChunk]:
+        # Rerank on ingest-time token hashes, over the normalized query text (like retrieval and
+        # the cache key), so queries sharing a cache entry also share their scores.
+        q_hashes = set(token_hashes(query_text))
 
         chunks: list[RetrievedChunk] = []
-        for r in rows:
+        for r in retrieval.rows:
             vector_score = float(r["score"] or 0.0)
-            text_value = str(r["text"])
-            overlap = _score_overlap(req.query, text_value)
+            text_value = texts.get(str(r["id"]), "")
+            if r.get("token_hashes") is not None:
+                overlap = _score_overlap_hashes(q_hashes, r["token_hashes"])
+            else:
+                # Row written before features existed and not yet backfilled.
+                overlap = _score_overlap(query_text, text_value)
             rerank_score = _clamp01(0.75 * vector_score + 0.25 * overlap)
 
             chunks.append(
@@ -323,114 +580,101 @@ def create_app() -> FastAPI:
                         "role": str(r["role"]),
                         "overlap": overlap,
                         "rerank_score": rerank_score,
+                        "token_estimate": int(r.get("token_estimate") or estimate_tokens(text_value)),
                     },
                 )
             )
 
         # Rerank for explainability/debugger: keep the same candidates but reorder by a blended score.
         chunks.sort(key=lambda c: float((c.metadata or {}).get("rerank_score") or 0.0), reverse=True)
+        return chunks
 
-        raw_combined = "\n".join(["[L1]" + "\n" + l1_text] + [f"[L2 score={c.score:.3f}] {c.text}" for c in chunks])
+    def _maybe_enqueue_refresh(req: QueryRequest, cfg: Settings, state: SessionState) -> tuple[bool, bool]:
+        """`(enqueued, deferred)` for the session summary refresh of this query."""
 
-        # 2) Session summary snapshots (industry-aligned episodic condensation).
+        # Session summary snapshots (industry-aligned episodic condensation).
         # - Scope: (namespace, session_id)
-        # - Policy: refresh asynchronously when enough new episodic messages arrived.
-        persisted = latest_condensation(session, req.namespace, req.session_id)
-        condensation_cache_hit = bool(persisted)
-        condensation_enqueued = False
+        # - Policy: refresh asynchronously when enough new episodic messages arrived; the
+        #   threshold grows with the condensation queue depth (backpressure).
+        summary_id = state.summary_id
+        if state.unsummarized <= 0 or (
+            summary_id is not None and state.unsummarized < int(cfg.summary_refresh_min_new_messages)
+        ):
+            return False, False
+        trigger_reason = "bootstrap_summary" if summary_id is None else "new_messages_threshold"
+        # Backpressure reads the bulk lane only: bootstraps on the interactive lane skip it.
+        if scheduler.lane_for(trigger_reason) != LANE_INTERACTIVE:
+            pressure = backpressure.current()
+            if pressure.level == LEVEL_DEFERRED:
+                # Pending ids stay tracked: a later request folds them once the queues drain.
+                backpressure.count(pressure, deferred=True)
+                return False, True
+            if summary_id is not None and state.unsummarized < pressure.min_new_messages:
+                backpressure.count(pressure, deferred=False)
+                return False, False
+
+        # Coalesced per session: False when a job is already queued or running; that job (or
+        # its follow-up) drains every pending message, including this session's new ones.
+        enqueued = scheduler.request(
+            req.namespace,
+            req.session_id,
+            trigger_reason=trigger_reason,
+            trigger_details={
+                "source": "api:/v1/query",
+                "strategy": "rolling_summary_v1",
+                "new_message_count": state.unsummarized,
+            },
+        )
+        return enqueued, False
+
+    def _assemble_query(
+        req: QueryRequest,
+        now: int,
+        l1_msgs: list[dict[str, str]],
+        retrieval: RetrievalResult,
+        chunks: list[RetrievedChunk],
+        state: SessionState,
+        condensation_enqueued: bool,
+        condensation_deferred: bool = False,
+    ) -> tuple[QueryResponse, dict[str, object]]:
+        """Response + context pack + QUERY audit details from the fetched stages."""
+
+        l1_text = "\n".join(f"[{m['role']}] {m['text']}" for m in l1_msgs)
+        raw_combined = "\n".join(["[L1]" + "\n" + l1_text] + [f"[L2 score={c.score:.3f}] {c.text}" for c in chunks])
 
-        if persisted:
-            condensed = persisted.condensed_text
+        # Hot session state (Redis): no Postgres reads unless the hash had to be rebuilt.
+        summary_id = state.summary_id
+        condensation_cache_hit = summary_id is not None
+        if summary_id is not None and state.condensed_text is not None:
+            condensed = state.condensed_text
+            token_condensed = state.token_condensed
         else:
             condensed = raw_combined[:240] + ("..." if len(raw_combined) > 240 else "")
+            token_condensed = estimate_tokens(card_to_plain_text(condensed))
 
         # Token accounting (what an LLM would see)
         token_original = estimate_tokens(raw_combined)
-        token_condensed = estimate_tokens(card_to_plain_text(condensed))
-
-        since = persisted.created_at if persisted else "1970-01-01T00:00:00Z"
-        new_rows = (
-            session.execute(
-                text(
-                    """
-                    SELECT id, role, text, created_at
-                    FROM memories
-                    WHERE namespace = :namespace
-                      AND session_id = :session_id
-                      AND created_at > :since
-                    ORDER BY created_at ASC
-                    LIMIT :limit
-                    """
-                ),
-                {
-                    "namespace": req.namespace,
-                    "session_id": req.session_id,
-                    "since": since,
-                    "limit": int(cfg.summary_refresh_max_batch),
-                },
-            )
-            .mappings()
-            .all()
-        )
-        new_memory_ids = [str(r["id"]) for r in new_rows]
-
-        should_refresh = (not persisted and len(new_memory_ids) > 0) or (
-            persisted and len(new_memory_ids) >= int(cfg.summary_refresh_min_new_messages)
-        )
-
-        if should_refresh and _try_acquire_summary_lock(
-            l1_store, req.namespace, req.session_id, ttl_seconds=int(cfg.summary_refresh_lock_seconds)
-        ):
-            trigger_reason = "bootstrap_summary" if not persisted else "new_messages_threshold"
-            trigger_details = {
-                "source": "api:/v1/query",
-                "strategy": "rolling_summary_v1",
-                "new_message_count": len(new_memory_ids),
-            }
-            q.condensation.enqueue(
-                "memos_server.condensation.run_condensation_job",
-                namespace=req.namespace,
-                session_id=req.session_id,
-                memory_ids=new_memory_ids,
-                prev_summary_id=(persisted.id if persisted else None),
-                prev_summary_text=(persisted.condensed_text if persisted else None),
-                trigger_reason=trigger_reason,
-                trigger_details=trigger_details,
-            )
-            condensation_enqueued = True
-
         similarity = float(chunks[0].score) if chunks else 0.0
 
-        session.execute(
-            text(
-                """
-                INSERT INTO audit_logs (id, namespace, session_id, event_type, details)
-                VALUES (:id, :namespace, :session_id, :event_type, CAST(:details AS jsonb))
-                """
-            ),
-            {
-                "id": str(uuid.uuid4()),
-                "namespace": req.namespace,
-                "session_id": req.session_id,
-                "event_type": "QUERY",
-                "details": json.dumps(
-                    {
-                        "top_k": req.top_k,
-                        "l2_hits": len(chunks),
-                        "condensation_cache_hit": condensation_cache_hit,
-                        "condensation_enqueued": condensation_enqueued,
-                        "rerank": {
-                            "method": "deterministic_overlap_v1",
-                            "weights": {"vector": 0.75, "overlap": 0.25},
-                        },
-                    }
-                ),
+        query_details: dict[str, object] = {
+            "top_k": req.top_k,
+            "l2_hits": len(chunks),
+            "condensation_cache_hit": condensation_cache_hit,
+            "condensation_enqueued": condensation_enqueued,
+            "condensation_deferred": condensation_deferred,
+            "cache_hit": False,
+            "retrieval": retrieval.strategy_used,
+            "retrieval_mode": retrieval.mode,
+            "rerank": {
+                "method": "deterministic_overlap_v1",
+                "weights": {"vector": 0.75, "overlap": 0.25},
             },
-        )
+        }
 
-        # 3) Working memory snapshot: context pack (query-scoped, replayable).
+        # Working memory snapshot: context pack (query-scoped, replayable).
+        # In "sampled" persistence mode unsampled packs are returned inline only (no id).
         prompt_registry, tool_registry = get_procedural_registry()
-        context_pack_id = str(uuid.uuid4())
+        context_pack_id = str(uuid.uuid4()) if _keep_context_pack() else None
         context_pack = {
             "schema": "memos.context_pack.v1",
             "namespace": req.namespace,
@@ -443,47 +687,14 @@ def create_app() -> FastAPI:
             "working_memory": {
                 "l1_window": l1_msgs,
                 "session_summary": condensed,
-                "session_summary_id": (persisted.id if persisted else None),
+                "session_summary_id": summary_id,
             },
             "retrieval": {
                 "raw_chunks": [c.model_dump() for c in chunks],
             },
         }
-        session.execute(
-            text(
-                """
-                INSERT INTO context_packs (id, namespace, session_id, query_text, session_summary_id, retrieved_memory_ids, pack)
-                VALUES (:id, :namespace, :session_id, :query_text, :session_summary_id, :retrieved_memory_ids, CAST(:pack AS jsonb))
-                """
-            ),
-            {
-                "id": context_pack_id,
-                "namespace": req.namespace,
-                "session_id": req.session_id,
-                "query_text": req.query,
-                "session_summary_id": (persisted.id if persisted else None),
-                "retrieved_memory_ids": [c.id for c in chunks],
-                "pack": json.dumps(context_pack, ensure_ascii=False),
-            },
-        )
-        session.execute(
-            text(
-                """
-                INSERT INTO audit_logs (id, namespace, session_id, event_type, details)
-                VALUES (:id, :namespace, :session_id, :event_type, CAST(:details AS jsonb))
-                """
-            ),
-            {
-                "id": str(uuid.uuid4()),
-                "namespace": req.namespace,
-                "session_id": req.session_id,
-                "event_type": "CONTEXT_PACK",
-                "details": json.dumps({"context_pack_id": context_pack_id, "retrieved": len(chunks)}),
-            },
-        )
-        session.commit()
 
-        return QueryResponse(
+        response = QueryResponse(
             id=f"ret-{now}",
             source_tier=MemoryTier.L2_SEMANTIC,
             similarity=similarity,
@@ -495,14 +706,181 @@ def create_app() -> FastAPI:
                 {
                     "method": "deterministic_overlap_v1",
                     "components": {"vector_weight": 0.75, "overlap_weight": 0.25},
-                }
+                },
+                retrieval.debug(),
             ],
-            session_summary_id=(persisted.id if persisted else None),
+            session_summary_id=summary_id,
             session_summary_cache_hit=condensation_cache_hit,
             session_summary_enqueued=condensation_enqueued,
+            session_summary_deferred=condensation_deferred,
             context_pack_id=context_pack_id,
             context_pack=context_pack,
         )
+        return response, query_details
+
+    def _persist_response(session: Session, req: QueryRequest, response: QueryResponse, query_details: dict[str, object]) -> None:
+        _persist_query(
+            session,
+            req,
+            query_details,
+            response.context_pack_id,
+            response.context_pack,
+            session_summary_id=response.session_summary_id,
+            retrieved_memory_ids=[c.id for c in response.raw_chunks],
+        )
+
+    def query(
+        req: QueryRequest,
+        session: Session = Depends(get_db_session),
+        l1_store: L1Redis = Depends(get_l1),
+        cfg: Settings = Depends(get_cfg),
+    ) -> QueryResponse:
+        now = int(time.time() * 1000)
+        query_text = normalize_query(req.query)
+        retrieval_mode = req.retrieval_mode or cfg.retrieval_mode
+
+        # Result cache: the key embeds the session watermark, read before any state is read, so
+        # a write racing with this request can only make the stored entry unreachable. A failed
+        # watermark read (None) bypasses the cache for this request.
+        result_key = None
+        watermark = query_cache.watermark(req.namespace, req.session_id) if query_cache is not None else None
+        if query_cache is not None and watermark is not None:
+            result_key = cache_key(
+                req.namespace, req.session_id, query_text, req.top_k, retrieval_mode, query_fingerprint, watermark
+            )
+            cached = query_cache.get(result_key)
+            if cached is not None:
+                state = load_or_bootstrap(session, l1_store.client, req.namespace, req.session_id)
+                enqueued, deferred = _maybe_enqueue_refresh(req, cfg, state)
+                return _serve_cached_query(session, req, QueryResponse.model_validate(cached), now, enqueued, deferred)
+
+        # 0) Always include the L1 sliding window as raw context (chronological)
+        l1_msgs = get_window(l1_store, req.namespace, req.session_id)
+        # 1) L2 retrieval using the configured embedding provider
+        retrieval, texts = _retrieve(session, req, query_text, retrieval_mode, cfg)
+        chunks = _rank_chunks(query_text, retrieval, texts)
+        # 2) Session summary state + refresh policy
+        state = load_or_bootstrap(session, l1_store.client, req.namespace, req.session_id)
+        enqueued, deferred = _maybe_enqueue_refresh(req, cfg, state)
+        # 3) Response, context pack and its persistence
+        response, query_details = _assemble_query(req, now, l1_msgs, retrieval, chunks, state, enqueued, deferred)
+        _persist_response(session, req, response, query_details)
+
+        if query_cache is not None and result_key is not None:
+            query_cache.put(result_key, response.model_dump(mode="json"))
+        return response
+
+    # --- Async request path (MEMOS_API_ASYNC) ---
+    # Same stages as the sync handlers. Blocking SQL helpers run on async sessions via
+    # `run_sync` (on the event loop thread, so they must not do CPU work); CPU-bound steps
+    # (embedding, hot-index search, ranking) and RQ enqueues go to the threadpool. Settings and queues are
+    # read from the closure: sync FastAPI dependencies would run in the threadpool as well.
+
+    async def _session_state_async(asession: AsyncSession, req: QueryRequest) -> SessionState:
+        state = await load_state_async(aredis, req.namespace, req.session_id)
+        if state is None:
+            fields = await asession.run_sync(bootstrap_fields, req.namespace, req.session_id)
+            state = await store_state_async(aredis, req.namespace, req.session_id, fields)
+        return state
+
+    async def query_async(req: QueryRequest) -> QueryResponse:
+        now = int(time.time() * 1000)
+        query_text = normalize_query(req.query)
+        retrieval_mode = req.retrieval_mode or settings.retrieval_mode
+
+        result_key = None
+        watermark = await query_cache.awatermark(req.namespace, req.session_id) if query_cache is not None else None
+        if query_cache is not None and watermark is not None:
+            result_key = cache_key(
+                req.namespace, req.session_id, query_text, req.top_k, retrieval_mode, query_fingerprint, watermark
+            )
+            cached = await query_cache.aget(result_key)
+            if cached is not None:
+                response = QueryResponse.model_validate(cached)
+                async with adb.sessionmaker() as asession:
+                    state = await _session_state_async(asession, req)
+                    enqueued, deferred = await run_in_threadpool(_maybe_enqueue_refresh, req, settings, state)
+                    return await asession.run_sync(_serve_cached_query, req, response, now, enqueued, deferred)
+
+        # Query embedding + hot-index hits first, off the event loop; then L1 window, the SQL
+        # part of L2 retrieval and session state are independent: fetch them concurrently.
+        # An AsyncSession is not safe for concurrent use, hence one per concurrent stage.
+        vector = await run_in_threadpool(_query_vector, req, query_text, retrieval_mode, settings)
+        async with adb.sessionmaker() as l2_session, adb.sessionmaker() as state_session:
+            l1_msgs, (retrieval, texts), state = await asyncio.gather(
+                get_window_async(aredis, settings.l1_window_size, req.namespace, req.session_id),
+                l2_session.run_sync(_retrieve, req, query_text, retrieval_mode, settings, vector),
+                _session_state_async(state_session, req),
+            )
+            chunks = await run_in_threadpool(_rank_chunks, query_text, retrieval, texts)
+            enqueued, deferred = await run_in_threadpool(_maybe_enqueue_refresh, req, settings, state)
+            response, query_details = _assemble_query(req, now, l1_msgs, retrieval, chunks, state, enqueued, deferred)
+            await l2_session.run_sync(_persist_response, req, response, query_details)
+
+        if query_cache is not None and result_key is not None:
+            await query_cache.aput(result_key, response.model_dump(mode="json"))
+        return response
+
+    async def _publish_ingest_async(records: list[MemoryRecord]) -> None:
+        pipe = aredis.pipeline(transaction=False)
+        _queue_publish(pipe, records)
+        await pipe.execute()
+
+    def _write_ingest(session: Session, records: list[MemoryRecord], vectors, audits: list[dict[str, object]]) -> None:  # type: ignore[no-untyped-def]
+        insert_memories(session, records, embedder, vectors=vectors)
+        insert_audit_rows(session, audits)
+
+    async def _ingest_async(records: list[MemoryRecord], audits: list[dict[str, object]]) -> None:
+        await append_messages_async(
+            aredis,
+            settings.l1_window_size,
+            [(r.namespace, r.session_id, r.role, r.text) for r in records],
+            ttl_seconds=3600,
+        )
+        if settings.ingest_mode == "write_behind":
+            await aredis.xadd(settings.write_behind_stream, ingest_fields(records, audits))
+            await _publish_ingest_async(records)
+            return
+
+        vectors = await run_in_threadpool(embedder.embed_many, [r.text for r in records])
+        async with adb.sessionmaker() as asession:
+            await asession.run_sync(_write_ingest, records, vectors, audits)
+            await asession.commit()
+        if hot is not None:
+            await run_in_threadpool(hot.add, records, vectors)
+        await _publish_ingest_async(records)
+
+    async def ingest_async(req: IngestRequest) -> IngestResponse:
+        record = new_memory(req.namespace, req.session_id, req.role.value, req.text, req.metadata)
+        audit = audit_row(
+            req.namespace,
+            req.session_id,
+            "INGEST",
+            {"memory_id": record.id, "l1_window": settings.l1_window_size},
+        )
+        await _ingest_async([record], [audit])
+        return IngestResponse(memory_id=record.id)
+
+    async def ingest_batch_async(req: IngestBatchRequest) -> IngestBatchResponse:
+        records = [
+            new_memory(item.namespace, item.session_id, item.role.value, item.text, item.metadata)
+            for item in req.items
+        ]
+        audits = [
+            audit_row(namespace, session_id, "INGEST_BATCH", details | {"l1_window": settings.l1_window_size})
+            for namespace, session_id, details in summarize_batch(records)
+        ]
+        await _ingest_async(records, audits)
+        return IngestBatchResponse(memory_ids=[r.id for r in records], accepted=len(records))
+
+    if settings.api_async:
+        app.post("/v1/ingest", response_model=IngestResponse)(ingest_async)
+        app.post("/v1/ingest/batch", response_model=IngestBatchResponse)(ingest_batch_async)
+        app.post("/v1/query", response_model=QueryResponse)(query_async)
+    else:
+        app.post("/v1/ingest", response_model=IngestResponse)(ingest)
+        app.post("/v1/ingest/batch", response_model=IngestBatchResponse)(ingest_batch)
+        app.post("/v1/query", response_model=QueryResponse)(query)
 
     @app.get("/v1/ops/stats", response_model=OpsStatsResponse)
     def ops_stats(session: Session = Depends(get_db_session)) -> OpsStatsResponse:
@@ -541,6 +919,8 @@ def create_app() -> FastAPI:
     def ops_pipeline(
         session: Session = Depends(get_db_session),
         q: Queues = Depends(get_queues),
+        l1_store: L1Redis = Depends(get_l1),
+        cfg: Settings = Depends(get_cfg),
     ) -> OpsPipelineResponse:
         recent = session.execute(
             text(
@@ -553,8 +933,31 @@ def create_app() -> FastAPI:
             )
         ).mappings().all()
 
+        wb = stream_stats(l1_store.client, cfg.write_behind_stream)
+        restarts = pool_restarts(l1_store.client)
+        emb_cache = embedder.cache_stats() if isinstance(embedder, CachedEmbeddingProvider) else None
+
         return OpsPipelineResponse(
-            queues=[{"name": "condensation", "count": int(q.condensation.count)}],
+            queues=[
+                {
+                    "name": queue.name,
+                    "count": int(queue.count),
+                    "workers": int(Worker.count(queue=queue)),
+                    "restarts": restarts.get(queue.name, 0),
+                }
+                for queue in q.all()
+            ],
+            write_behind={"enabled": cfg.ingest_mode == "write_behind", **asdict(wb)},
+            embedding_cache=(asdict(emb_cache) if emb_cache else None),
+            hot_index=(hot.stats() if hot is not None else []),
+            persistence=(asdict(persistence.stats()) if persistence is not None else {"mode": cfg.persistence_mode}),
+            condensation_scheduler=asdict(scheduler.stats()),
+            condensation_backpressure=asdict(backpressure.stats()),
+            condensation_lanes=[asdict(w) for w in lane_waits(l1_store.client)],
+            condensation_backlog=[
+                {"namespace": ns, "session_id": sid, "pending": depth}
+                for ns, sid, depth in backlog_depths(l1_store.client)
+            ],
             recent_condensations=[
                 {
                     "id": str(r["id"]),
@@ -803,8 +1206,10 @@ def create_app() -> FastAPI:
                 },
             )
 
-        # 1) L1 (Redis)
+        # 1) L1 (Redis) + this process's hot index (other API processes catch up on reconcile)
         redis_deleted = clear_session(l1_store, req.namespace, req.session_id)
+        if hot is not None:
+            hot.remove_session(req.namespace, req.session_id)
 
         # 2) L2 (Postgres) - delete in a stable order
         cond_res = session.execute(
@@ -854,6 +1259,9 @@ def create_app() -> FastAPI:
             },
         )
         session.commit()
+        drop_state(l1_store.client, req.namespace, req.session_id)
+        clear_pending(l1_store.client, req.namespace, req.session_id)
+        bump_watermarks(l1_store.client, [(req.namespace, req.session_id)])
 
         return ResetSessionResponse(
             ok=True,
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from memos_server.vector_codec import register_vector_codec_async
+
+
+# Async counterpart of `db.Db` for the async request path (MEMOS_API_ASYNC).
+#
+# Same URL as the sync engine: `postgresql+psycopg://` selects psycopg's async driver under
+# `create_async_engine`. Query-building helpers (`retrieval`, `ingest`, `audit`, ...) stay
+# sync and run through `AsyncSession.run_sync`, so both paths share one SQL implementation
+# while the event loop stays free during I/O.
+
+
+@dataclass(frozen=True)
+class AsyncDb:
+    engine: AsyncEngine
+    sessionmaker: async_sessionmaker[AsyncSession]
+
+
+def create_async_db(database_url: str, *, pool_size: int = 20, max_overflow: int = 20) -> AsyncDb:
+    engine = create_async_engine(database_url, pool_pre_ping=True, pool_size=pool_size, max_overflow=max_overflow)
+    register_vector_codec_async(engine)
+    return AsyncDb(engine=engine, sessionmaker=async_sessionmaker(engine, expire_on_commit=False))
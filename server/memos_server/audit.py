@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import json
+import uuid
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from memos_server.db import bulk_insert
+
+
+def audit_row(namespace: str, session_id: str | None, event_type: str, details: dict[str, Any]) -> dict[str, object]:
+    """Build one `audit_logs` row (details serialized for a jsonb cast)."""
+
+    return {
+        "id": str(uuid.uuid4()),
+        "namespace": namespace,
+        "session_id": session_id,
+        "event_type": event_type,
+        "details": json.dumps(details),
+    }
+
+
+def insert_audit_rows(session: Session, rows: list[dict[str, object]], *, on_conflict: str = "") -> int:
+    return bulk_insert(
+        session,
+        "audit_logs",
+        rows,
+        casts={"details": "jsonb", "created_at": "timestamptz"},
+        on_conflict=on_conflict,
+    )
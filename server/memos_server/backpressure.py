@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+
+# Condensation backpressure for `/v1/query`.
+#
+# Every refresh request adds work to the condensation queues; when workers fall behind, more
+# requests only deepen the backlog. The API therefore reads the queue depth (at most once per
+# `cache_ms` per process, not per request) and:
+# - below `soft_depth`: refreshes at `summary_refresh_min_new_messages` (level "normal")
+# - from `soft_depth`: the threshold grows by the base value per `soft_depth` jobs, up to
+#   `max_min_new_messages` (level "elevated"): fewer, larger refreshes
+# - from `hard_depth`: nothing is enqueued (level "deferred"); the response carries
+#   `session_summary_deferred`. Pending ids stay tracked, so a later request (or a worker's
+#   follow-up) folds them once the queues drain.
+#
+# 0 disables a limit. A failed depth read keeps the last known level.
+
+LEVEL_NORMAL = "normal"
+LEVEL_ELEVATED = "elevated"
+LEVEL_DEFERRED = "deferred"
+
+
+@dataclass(frozen=True)
+class Pressure:
+    level: str
+    depth: int
+    # Effective refresh threshold at this depth.
+    min_new_messages: int
+
+
+@dataclass(frozen=True)
+class BackpressureStats:
+    # Thresholds, current level and per-process counters.
+    level: str
+    queue_depth: int
+    min_new_messages: int
+    base_min_new_messages: int
+    max_min_new_messages: int
+    soft_depth: int
+    hard_depth: int
+    cache_ms: int
+    depth_age_ms: int = 0
+    deferred: int = 0
+    raised: int = 0
+    depth_errors: int = 0
+
+
+class QueueBackpressure:
+    def __init__(
+        self,
+        depth: Callable[[], int],
+        *,
+        base_min_new_messages: int,
+        max_min_new_messages: int,
+        soft_depth: int,
+        hard_depth: int,
+        cache_ms: int,
+    ) -> None:
+        self._depth = depth
+        self.base_min_new_messages = max(1, int(base_min_new_messages))
+        self.max_min_new_messages = max(self.base_min_new_messages, int(max_min_new_messages))
+        self.soft_depth = max(0, int(soft_depth))
+        self.hard_depth = max(0, int(hard_depth))
+        self.cache_ms = max(0, int(cache_ms))
+        self._lock = threading.Lock()
+        self._depth_value = 0
+        self._read_at = 0.0
+        self._deferred = 0
+        self._raised = 0
+        self._errors = 0
+
+    def pressure_at(self, depth: int) -> Pressure:
+        if self.hard_depth and depth >= self.hard_depth:
+            return Pressure(LEVEL_DEFERRED, depth, self.max_min_new_messages)
+        if self.soft_depth and depth >= self.soft_depth:
+            steps = depth // self.soft_depth
+            threshold = min(self.base_min_new_messages * (1 + steps), self.max_min_new_messages)
+            return Pressure(LEVEL_ELEVATED, depth, threshold)
+        return Pressure(LEVEL_NORMAL, depth, self.base_min_new_messages)
+
+    def current(self) -> Pressure:
+        """Pressure at the cached queue depth (re-read once `cache_ms` has passed)."""
+
+        if not (self.soft_depth or self.hard_depth):
+            return Pressure(LEVEL_NORMAL, 0, self.base_min_new_messages)
+        with self._lock:
+            now = time.monotonic()
+            refresh = self._read_at == 0.0 or (now - self._read_at) * 1000 >= self.cache_ms
+            if refresh:
+                # Stamped before reading: concurrent requests keep using the cached value.
+                self._read_at = now
+            depth = self._depth_value
+        if refresh:
+            # Read outside the lock (a Redis round trip): other requests don't wait for it.
+            try:
+                depth = max(0, int(self._depth()))
+            except Exception as exc:
+                with self._lock:
+                    self._errors += 1
+                print(f"[api] warning: condensation queue depth not read: {type(exc).__name__}: {exc}")
+            else:
+                with self._lock:
+                    self._depth_value = depth
+        return self.pressure_at(depth)
+
+    def count(self, pressure: Pressure, *, deferred: bool) -> None:
+        """Record a refresh decision that the pressure changed (deferred or threshold raised)."""
+
+        with self._lock:
+            if deferred:
+                self._deferred += 1
+            elif pressure.min_new_messages > self.base_min_new_messages:
+                self._raised += 1
+
+    def stats(self) -> BackpressureStats:
+        pressure = self.current()
+        with self._lock:
+            age_ms = int((time.monotonic() - self._read_at) * 1000) if self._read_at else 0
+            return BackpressureStats(
+                level=pressure.level,
+                queue_depth=pressure.depth,
+                min_new_messages=pressure.min_new_messages,
+                base_min_new_messages=self.base_min_new_messages,
+                max_min_new_messages=self.max_min_new_messages,
+                soft_depth=self.soft_depth,
+                hard_depth=self.hard_depth,
+                cache_ms=self.cache_ms,
+                depth_age_ms=age_ms,
+                deferred=self._deferred,
+                raised=self._raised,
+                depth_errors=self._errors,
+            )
@@ -1,14 +1,29 @@
 from __future__ import annotations
 
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import json
-import re
+from typing import TYPE_CHECKING, Any
 
+import redis
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from memos_server.extractor import extract_directive_buckets
+from memos_server.audit import audit_row, insert_audit_rows
+from memos_server.db import bulk_insert
+from memos_server.memory_card import (
+    BUCKET_LIMITS,
+    EXCERPT_CHARS,
+    TranscriptScan,
+    joined_scan,
+    memory_buckets,
+    merge_card,
+)
+from memos_server.process_pool import get_process_pool
+from memos_server.query_cache import bump_watermarks
+
+if TYPE_CHECKING:
+    from memos_server.worker_runtime import WorkerContext
 
 
 @dataclass(frozen=True)
@@ -16,6 +31,10 @@ class CondensationResult:
     condensation_id: str
     token_original: int
     token_condensed: int
+    # Messages folded into this snapshot (empty when summarizing raw_text).
+    memory_ids: tuple[str, ...] = ()
+    condensed_text: str = ""
+    created_at: str = ""
 
 
 @dataclass(frozen=True)
@@ -25,6 +44,8 @@ class PersistedCondensation:
     token_original: int
     token_condensed: int
     created_at: str
+    # Newest folded message (created_at for snapshots written before the column existed).
+    covered_until: str | None = None
 
 
 def estimate_tokens(text_value: str) -> int:
@@ -54,115 +75,11 @@ def structured_condense(raw_text: str) -> str:
     Notes:
     - No LLMs here: keep it reproducible for demos and easy to test.
     - Output is JSON so the frontend can render it as sections.
+    - Same engine as rolling refreshes (`memory_card.py`): folding a transcript here at once
+      equals folding it batch by batch into previous cards.
     """
 
-    text_value = raw_text.strip()
-
-    def clean_line(line: str) -> str:
-        s = line.strip()
-        if not s:
-            return ""
-        if s.startswith("[L1]"):
-            return ""
-        s = re.sub(r"^\[L2 score=[-\d.]+\]\s*", "", s)
-        s = re.sub(r"^\[(user|agent|system|tool)\]\s*", "", s)
-        return s.strip()
-
-    cleaned_lines = [clean_line(line) for line in text_value.splitlines()]
-    cleaned_lines = [s for s in cleaned_lines if s]
-
-    def uniq(items: list[str]) -> list[str]:
-        out: list[str] = []
-        seen: set[str] = set()
-        for x in items:
-            k = x.strip()
-            if not k:
-                continue
-            if k in seen:
-                continue
-            seen.add(k)
-            out.append(k)
-        return out
-
-    # Heuristics: extract common "action-like" lines and numeric identifiers.
-    actions: list[str] = []
-    for s in cleaned_lines:
-        if s.startswith("`") and s.endswith("`"):
-            s = s.strip("`").strip()
-        if re.match(r"^(docker|git|npm|pnpm|yarn|python|pip|uvicorn|curl)\b", s):
-            actions.append(s)
-
-    risks: list[str] = []
-    for s in cleaned_lines:
-        if any(k in s for k in ["踩坑", "坑：", "pitfall", "gotcha"]):
-            risks.append(s)
-
-    lowered = text_value.lower()
-    if "cors" in lowered:
-        if "password authentication failed" in lowered or "500" in lowered:
-            risks.append("CORS-like symptom masking backend error (e.g. DB auth / 500)")
-        elif "access-control-allow-origin" in lowered or "access-control-allow-headers" in lowered:
-            risks.append("CORS header/config mismatch")
-    if "connection refused" in lowered or "could not connect" in lowered:
-        risks.append("DB/Redis connection refused")
-    if "localhost" in lowered or "127.0.0.1" in lowered:
-        risks.append("Container vs host networking mismatch (localhost)")
-
-    extracted = extract_directive_buckets(cleaned_lines)
-
-    facts: list[str] = list(extracted.facts)
-    preferences: list[str] = list(extracted.preferences)
-    constraints: list[str] = list(extracted.constraints)
-    decisions: list[str] = list(extracted.decisions)
-
-    # Facts: add stable technical anchors that help debugging and demos.
-    for s in cleaned_lines:
-        if "/v1/" in s:
-            facts.append("API uses versioned prefix (/v1/*)")
-
-        low = s.lower()
-        if "postgres" in low and "5432" in s:
-            facts.append("postgres port 5432")
-        if "redis" in low and "6379" in s:
-            facts.append("redis port 6379")
-        if ("uvicorn" in low or "memos_server.app" in low or "api" in low) and "8000" in s:
-            facts.append("api port 8000")
-        if ("npm" in low or "vite" in low) and "3000" in s:
-            facts.append("web port 3000")
-
-        if "memos" in s.lower() and ("我们在做" in s or "MemOS" in s):
-            facts.append("Project: MemOS (agent memory / context governance)")
-
-        if "pgvector" in s.lower():
-            facts.append("L2 uses Postgres + pgvector for vector search")
-        if "rq" in s.lower() or "worker" in s.lower():
-            facts.append("Async worker processes background jobs (RQ)")
-
-    # Keep concise: avoid overfitting and keep only a few items.
-    facts = uniq(facts)[:8]
-    preferences = uniq(preferences)[:6]
-    constraints = uniq(constraints)[:6]
-    decisions = uniq(decisions)[:6]
-
-    card = {
-        "schema": "memos.memory_card.v2",
-        "facts": facts,
-        "preferences": preferences,
-        "constraints": constraints,
-        "decisions": decisions,
-        "risks": risks,
-        "actions": actions[:20],
-        # Backwards-compatible aliases for older UI / stored rows.
-        "pitfalls": risks,
-        "commands": actions[:20],
-    }
-
-    # Avoid inflating size: only keep a tiny excerpt when raw context is large.
-    if len(text_value) > 800:
-        card["raw_excerpt"] = simple_condense(text_value, max_chars=180)
-
-    # Keep output compact and readable in DB (no ASCII escaping).
-    return json.dumps(card, ensure_ascii=False, separators=(",", ":"))
+    return merge_card(None, raw_text.strip())
 
 
 def card_to_plain_text(card_json: str) -> str:
@@ -202,15 +119,90 @@ def _card_to_plain_text(card_json: str) -> str:  # noqa: D401
     return card_to_plain_text(card_json)
 
 
+# Per-message columns for folding. Text is read only for rows without stored buckets (written
+# before ingest-time enrichment), which `scan_messages` enriches on the way.
+_MESSAGE_COLUMNS = f"""
+    id, role, created_at,
+    COALESCE(text_length, length(text)) AS text_length,
+    left(text, {EXCERPT_CHARS}) AS head,
+    CASE WHEN buckets IS NULL THEN text END AS text
+"""
+
+# Rows past `:prev_summary_id`'s coverage, as a `(created_at, id)` cursor: rows written by one
+# multi-row insert or write-behind flush share `created_at`, and a chunk may end inside such a
+# tie group. Snapshots written before `covered_id` existed compare on created_at alone (max
+# uuid); without a snapshot every row matches.
+_PAST_COVERAGE = """
+(created_at, id) > (
+    SELECT COALESCE(c.covered_until, c.created_at, 'epoch'::timestamptz),
+           COALESCE(c.covered_id, 'ffffffff-ffff-ffff-ffff-ffffffffffff'::uuid)
+    FROM (SELECT 1) AS one
+    LEFT JOIN condensations AS c ON c.id = CAST(:prev_summary_id AS uuid)
+)
+"""
+
+
+def _fetch_new_messages(
+    session: Session,
+    namespace: str,
+    session_id: str,
+    prev_summary_id: str | None,
+    *,
+    limit: int,
+) -> list[dict[str, str]]:
+    """Oldest messages past `prev_summary_id`'s coverage (all messages without one)."""
+
+    rows = (
+        session.execute(
+            text(
+                f"""
+                SELECT {_MESSAGE_COLUMNS}
+                FROM memories
+                WHERE namespace = :namespace
+                  AND session_id = :session_id
+                  AND {_PAST_COVERAGE}
+                ORDER BY created_at ASC, id
+                LIMIT :limit
+                """
+            ),
+            {"namespace": namespace, "session_id": session_id, "prev_summary_id": prev_summary_id, "limit": int(limit)},
+        )
+        .mappings()
+        .all()
+    )
+    return [_message(r) for r in rows]
+
+
 def _fetch_messages(session: Session, memory_ids: list[str]) -> list[dict[str, str]]:
     rows = (
         session.execute(
             text(
+                f"""
+                SELECT {_MESSAGE_COLUMNS}
+                FROM memories
+                WHERE id = ANY(CAST(:ids AS uuid[]))
+                ORDER BY created_at ASC, id
                 """
-                SELECT id, role, text, created_at
+            ),
+            {"ids": memory_ids},
+        )
+        .mappings()
+        .all()
+    )
+    return [_message(r) for r in rows]
+
+
+def fetch_session_messages(session: Session, memory_ids: list[str]) -> dict[tuple[str, str], list[dict[str, str]]]:
+    """`_fetch_messages` for ids of many sessions in one query, grouped per session (oldest first)."""
+
+    rows = (
+        session.execute(
+            text(
+                f"""
+                SELECT namespace, session_id, {_MESSAGE_COLUMNS}
                 FROM memories
                 WHERE id = ANY(CAST(:ids AS uuid[]))
-                ORDER BY created_at ASC
+                ORDER BY namespace, session_id, created_at ASC, id
                 """
             ),
             {"ids": memory_ids},
@@ -218,12 +210,347 @@ def _fetch_messages(session: Session, memory_ids: list[str]) -> list[dict[str, s
         .mappings()
         .all()
     )
-    out: list[dict[str, str]] = []
+    out: dict[tuple[str, str], list[dict[str, str]]] = {}
     for r in rows:
-        out.append({"id": str(r["id"]), "role": str(r["role"]), "text": str(r["text"])})
+        out.setdefault((str(r["namespace"]), str(r["session_id"])), []).append(_message(r))
     return out
 
 
+def _message(row: Any) -> dict[str, Any]:
+    msg = {
+        "id": str(row["id"]),
+        "role": str(row["role"]),
+        "created_at": str(row["created_at"]),
+        "text_length": int(row["text_length"]),
+        "head": str(row["head"]),
+    }
+    if row["text"] is not None:
+        msg["text"] = str(row["text"])
+    return msg
+
+
+def store_memory_buckets(session: Session, rows: list[dict[str, Any]]) -> None:
+    """Write `memories.buckets` (`memory_card.memory_buckets`) for rows with id, role and text."""
+
+    if not rows:
+        return
+    session.execute(
+        text(
+            """
+            UPDATE memories AS m
+            SET buckets = v.buckets
+            FROM unnest(CAST(:ids AS uuid[]), CAST(:buckets AS jsonb[])) AS v(id, buckets)
+            WHERE m.id = v.id
+            """
+        ),
+        {
+            "ids": [str(r["id"]) for r in rows],
+            "buckets": [json.dumps(memory_buckets(str(r["role"]), str(r["text"])), ensure_ascii=False) for r in rows],
+        },
+    )
+
+
+def scan_messages(
+    session: Session, groups: dict[tuple[str, str], list[dict[str, Any]]]
+) -> dict[tuple[str, str], TranscriptScan]:
+    """Per session: the scan of its fetched messages joined as a transcript.
+
+    The buckets stored at ingest are aggregated in SQL: per bucket, items in first-seen order
+    over the messages (created_at, id), deduplicated, cut at the largest bucket limit. Messages
+    fetched without stored buckets are enriched first (same transaction).
+    """
+
+    messages = [m for msgs in groups.values() for m in msgs]
+    if not messages:
+        return {}
+    store_memory_buckets(session, [m for m in messages if "text" in m])
+    rows = (
+        session.execute(
+            text(
+                """
+                WITH picked AS (
+                    SELECT namespace, session_id, buckets,
+                           row_number() OVER (PARTITION BY namespace, session_id ORDER BY created_at, id) AS n
+                    FROM memories
+                    WHERE id = ANY(CAST(:ids AS uuid[]))
+                ),
+                items AS (
+                    SELECT p.namespace, p.session_id, b.bucket, e.item, min(ARRAY[p.n, e.ord]) AS first_seen
+                    FROM picked AS p
+                    CROSS JOIN LATERAL jsonb_each(p.buckets) AS b(bucket, items)
+                    CROSS JOIN LATERAL jsonb_array_elements_text(b.items) WITH ORDINALITY AS e(item, ord)
+                    GROUP BY p.namespace, p.session_id, b.bucket, e.item
+                )
+                SELECT namespace, session_id, bucket, item
+                FROM (
+                    SELECT *, row_number() OVER (PARTITION BY namespace, session_id, bucket ORDER BY first_seen) AS rank
+                    FROM items
+                ) AS ranked
+                WHERE rank <= :limit
+                ORDER BY namespace, session_id, bucket, rank
+                """
+            ),
+            {"ids": [m["id"] for m in messages], "limit": max(BUCKET_LIMITS.values())},
+        )
+        .mappings()
+        .all()
+    )
+    buckets: dict[tuple[str, str], dict[str, list[str]]] = {}
+    for r in rows:
+        key = (str(r["namespace"]), str(r["session_id"]))
+        buckets.setdefault(key, {}).setdefault(str(r["bucket"]), []).append(str(r["item"]))
+    return {
+        key: joined_scan([(m["role"], m["text_length"], m["head"]) for m in msgs], buckets.get(key, {}))
+        for key, msgs in groups.items()
+        if msgs
+    }
+
+
+def count_unsummarized_rows(session: Session, namespace: str, session_id: str, prev_summary_id: str | None) -> int:
+    """Messages past `prev_summary_id`'s coverage (the created_at-based backlog)."""
+
+    return int(
+        session.execute(
+            text(
+                f"""
+                SELECT COUNT(*) FROM memories
+                WHERE namespace = :namespace
+                  AND session_id = :session_id
+                  AND {_PAST_COVERAGE}
+                """
+            ),
+            {"namespace": namespace, "session_id": session_id, "prev_summary_id": prev_summary_id},
+        ).scalar()
+        or 0
+    )
+
+
+_VERSION = "memos.session_summary.v1"
+
+
+@dataclass(frozen=True)
+class SnapshotInput:
+    """What one snapshot folds: the previous summary and the new transcript or its scan (picklable)."""
+
+    prev_summary: str | None
+    transcript: str
+    scan: TranscriptScan | None = None
+
+
+def snapshot_input(
+    messages: list[dict[str, Any]],
+    raw_text: str | None,
+    prev_summary_text: str | None,
+    found: TranscriptScan | None = None,
+) -> SnapshotInput:
+    """The messages (or `raw_text`) being folded into the previous summary; `found` is the
+    messages' scan (`scan_messages`), otherwise their text is scanned."""
+
+    if found is not None:
+        return SnapshotInput(prev_summary=prev_summary_text, transcript="", scan=found)
+    if messages:
+        transcript = "\n".join(f"[{m['role']}] {m['text']}" for m in messages)
+    else:
+        transcript = (raw_text or "").strip()
+    return SnapshotInput(prev_summary=prev_summary_text, transcript=transcript)
+
+
+def condense_card(inp: SnapshotInput) -> tuple[str, int, int]:
+    """The CPU-bound part of a snapshot: card + token estimates (module-level for process pools).
+
+    The new transcript is merged into the previous card's buckets (`memory_card.merge_card`);
+    only `token_original` still accounts for the previous summary as plain text.
+    """
+
+    condensed = merge_card(inp.prev_summary, inp.scan or inp.transcript)
+    prev_hint = card_to_plain_text(inp.prev_summary).strip() if inp.prev_summary else ""
+    chars = inp.scan.chars if inp.scan else len(inp.transcript.strip())
+    # `estimate_tokens` of prev_hint and the transcript joined by a newline.
+    original = len(prev_hint) + chars + (1 if prev_hint and chars else 0)
+    return condensed, max(1, original // 4), estimate_tokens(card_to_plain_text(condensed))
+
+
+def condense_many(inputs: list[SnapshotInput], workers: int = 1) -> list[tuple[str, int, int]]:
+    """`condense_card` for many snapshots, in input order; `workers > 1` uses a process pool."""
+
+    if workers <= 1 or len(inputs) < 2:
+        return [condense_card(inp) for inp in inputs]
+    chunksize = max(1, len(inputs) // (workers * 4))
+    return list(get_process_pool("condensation", workers).map(condense_card, inputs, chunksize=chunksize))
+
+
+@dataclass(frozen=True)
+class SnapshotDraft:
+    """A snapshot ready to insert: its `condensations` row, audit row and result (no created_at yet)."""
+
+    row: dict[str, object]
+    audit: dict[str, object]
+    result: CondensationResult
+
+
+def draft_snapshot(
+    *,
+    namespace: str,
+    session_id: str,
+    messages: list[dict[str, str]],
+    card: tuple[str, int, int],
+    prev_summary_id: str | None,
+    trigger_reason: str,
+    trigger_details: dict[str, object],
+    memory_ids: list[str] | None = None,
+) -> SnapshotDraft:
+    """`card` is `condense_card(snapshot_input(...))`; `memory_ids` defaults to the messages' ids."""
+
+    condensation_id = str(uuid.uuid4())
+    if memory_ids is None:
+        memory_ids = [m["id"] for m in messages]
+    condensed, token_original, token_condensed = card
+
+    details = dict(trigger_details)
+    details.setdefault("schema", _VERSION)
+    if prev_summary_id:
+        details["prev_summary_id"] = prev_summary_id
+    if memory_ids:
+        details["new_memory_ids"] = list(memory_ids)
+
+    return SnapshotDraft(
+        row={
+            "id": condensation_id,
+            "namespace": namespace,
+            "session_id": session_id,
+            "version": _VERSION,
+            "trigger_reason": trigger_reason,
+            "trigger_details": json.dumps(details),
+            "source_memory_ids": (memory_ids or []),
+            "condensed_text": condensed,
+            "token_original": token_original,
+            "token_condensed": token_condensed,
+            # Messages are ordered by (created_at, id): the last one bounds what this snapshot covers.
+            "covered_until": (messages[-1]["created_at"] if messages else None),
+            "covered_id": (messages[-1]["id"] if messages else None),
+        },
+        audit=audit_row(namespace, session_id, "CONDENSATION", {"kind": "session_summary", "version": _VERSION}),
+        result=CondensationResult(
+            condensation_id=condensation_id,
+            token_original=token_original,
+            token_condensed=token_condensed,
+            memory_ids=tuple(m["id"] for m in messages),
+            condensed_text=condensed,
+        ),
+    )
+
+
+def write_snapshot(
+    session: Session,
+    *,
+    namespace: str,
+    session_id: str,
+    messages: list[dict[str, str]],
+    raw_text: str | None = None,
+    prev_summary_id: str | None,
+    prev_summary_text: str | None,
+    trigger_reason: str,
+    trigger_details: dict[str, object],
+    memory_ids: list[str] | None = None,
+) -> CondensationResult:
+    """Fold `messages` (or `raw_text`) into the previous summary; insert snapshot + audit.
+
+    The caller commits. `memory_ids` defaults to the folded messages' ids.
+    """
+
+    found = scan_messages(session, {(namespace, session_id): messages}).get((namespace, session_id))
+    draft = draft_snapshot(
+        namespace=namespace,
+        session_id=session_id,
+        messages=messages,
+        card=condense_card(snapshot_input(messages, raw_text, prev_summary_text, found)),
+        prev_summary_id=prev_summary_id,
+        trigger_reason=trigger_reason,
+        trigger_details=trigger_details,
+        memory_ids=memory_ids,
+    )
+    created_at = session.execute(
+        text(
+            """
+            INSERT INTO condensations
+                                (
+                                    id,
+                                    namespace,
+                                    session_id,
+                                    version,
+                                    trigger_reason,
+                                    trigger_details,
+                                    source_memory_ids,
+                                    condensed_text,
+                                    token_original,
+                                    token_condensed,
+                                    covered_until,
+                                    covered_id
+                                )
+            VALUES
+                                (
+                                    :id,
+                                    :namespace,
+                                    :session_id,
+                                    :version,
+                                    :trigger_reason,
+                                    CAST(:trigger_details AS jsonb),
+                                    :source_memory_ids,
+                                    :condensed_text,
+                                    :token_original,
+                                    :token_condensed,
+                                    CAST(:covered_until AS timestamptz),
+                                    CAST(:covered_id AS uuid)
+                                )
+            RETURNING created_at
+            """
+        ),
+        draft.row,
+    ).scalar()
+    insert_audit_rows(session, [draft.audit])
+    return replace(draft.result, created_at=str(created_at))
+
+
+def write_snapshots(session: Session, drafts: list[SnapshotDraft]) -> list[CondensationResult]:
+    """Batch variant of `write_snapshot`: multi-row inserts for all drafts. The caller commits.
+
+    Every row of one transaction gets the same `created_at` (`now()` is the transaction start),
+    so drafts must belong to distinct sessions.
+    """
+
+    if not drafts:
+        return []
+    bulk_insert(
+        session,
+        "condensations",
+        [d.row for d in drafts],
+        casts={"trigger_details": "jsonb", "source_memory_ids": "uuid[]", "covered_until": "timestamptz", "covered_id": "uuid"},
+    )
+    insert_audit_rows(session, [d.audit for d in drafts])
+    created_at = str(session.execute(text("SELECT now()")).scalar())
+    return [replace(d.result, created_at=created_at) for d in drafts]
+
+
+def publish_snapshot(client: redis.Redis, namespace: str, session_id: str, result: CondensationResult) -> None:
+    """After commit: point hot session state at the snapshot, then invalidate cached query results."""
+
+    from memos_server.session_state import record_summary
+
+    try:
+        record_summary(
+            client,
+            namespace,
+            session_id,
+            summary_id=result.condensation_id,
+            created_at=result.created_at,
+            condensed_text=result.condensed_text,
+            summarized=len(result.memory_ids),
+        )
+        bump_watermarks(client, [(namespace, session_id)])
+    except redis.RedisError as exc:
+        print(f"[worker] warning: session state not updated: {type(exc).__name__}: {exc}")
+
+
 def run_condensation_job(
     *,
     database_url: str | None = None,
@@ -235,20 +562,24 @@ def run_condensation_job(
     prev_summary_text: str | None = None,
     trigger_reason: str | None = None,
     trigger_details: dict[str, object] | None = None,
-) -> CondensationResult:
+    skip_if_empty: bool = False,
+    ctx: WorkerContext | None = None,
+) -> CondensationResult | None:
     """RQ worker job: write a session-summary snapshot into `condensations`.
 
     Why this exists:
     - Condensation can be slow (LLM call / heavy processing). It must not block the API.
     - Persisting the result lets the UI show token savings and lets future queries reuse it.
-    """
 
-    from memos_server.env import init_env
+    `skip_if_empty`: return None instead of writing a snapshot when none of `memory_ids` exist
+    yet (the scheduler retries them later).
 
-    from memos_server.db import create_db
-    from memos_server.settings import get_settings
+    Resources (settings, engine, Redis) come from the worker process context (`ctx`).
+    """
+
+    from memos_server.worker_runtime import get_worker_context
 
-    init_env()
+    ctx = ctx or get_worker_context()
 
     # IMPORTANT: Don't rely on potentially stale/incorrect URLs embedded in queued jobs.
     # The effective runtime configuration should come from the current environment
@@ -256,7 +587,7 @@ def run_condensation_job(
     #
     # We keep `database_url` as an optional argument for backwards compatibility with
     # already-enqueued jobs, but we prefer the current settings.
-    settings = get_settings()
+    settings = ctx.settings
     effective_db_url = settings.database_url
     if database_url and database_url != effective_db_url:
         # Emit a lightweight warning to make misalignment obvious during demos.
@@ -265,17 +596,12 @@ def run_condensation_job(
             f"job={database_url!r} runtime={effective_db_url!r} (using runtime)"
         )
 
-    db = create_db(effective_db_url)
-
-    version = "memos.session_summary.v1"
     if trigger_reason is None:
         trigger_reason = "rolling_summary_refresh"
     if trigger_details is None:
         trigger_details = {"source": "api:/v1/query", "strategy": "rolling_summary_v1"}
 
-    condensation_id = str(uuid.uuid4())
-
-    with Session(db.engine) as session:
+    with Session(ctx.db.engine) as session:
         # Prefer DB fetch for determinism when memory ids are available.
         messages: list[dict[str, str]] = []
         if memory_ids:
@@ -283,94 +609,33 @@ def run_condensation_job(
                 messages = _fetch_messages(session, memory_ids)
             except Exception:
                 messages = []
-
-        prev_hint = ""
-        if prev_summary_text:
-            prev_hint = card_to_plain_text(prev_summary_text)
-
-        if messages:
-            episodic = "\n".join(f"[{m['role']}] {m['text']}" for m in messages)
-        else:
-            episodic = (raw_text or "").strip()
-
-        combined = "\n".join([p for p in [prev_hint.strip(), episodic.strip()] if p])
-        condensed = structured_condense(combined)
-        token_original = estimate_tokens(combined)
-        token_condensed = estimate_tokens(card_to_plain_text(condensed))
-
-        details = dict(trigger_details)
-        details.setdefault("schema", version)
-        if prev_summary_id:
-            details["prev_summary_id"] = prev_summary_id
-        if memory_ids:
-            details["new_memory_ids"] = list(memory_ids)
-
-        session.execute(
-            text(
-                """
-                INSERT INTO condensations
-                                    (
-                                        id,
-                                        namespace,
-                                        session_id,
-                                        version,
-                                        trigger_reason,
-                                        trigger_details,
-                                        source_memory_ids,
-                                        condensed_text,
-                                        token_original,
-                                        token_condensed
-                                    )
-                VALUES
-                                    (
-                                        :id,
-                                        :namespace,
-                                        :session_id,
-                                        :version,
-                                        :trigger_reason,
-                                        CAST(:trigger_details AS jsonb),
-                                        :source_memory_ids,
-                                        :condensed_text,
-                                        :token_original,
-                                        :token_condensed
-                                    )
-                """
-            ),
-            {
-                "id": condensation_id,
-                "namespace": namespace,
-                "session_id": session_id,
-                "version": version,
-                "trigger_reason": trigger_reason,
-                "trigger_details": json.dumps(details),
-                "source_memory_ids": (memory_ids or []),
-                "condensed_text": condensed,
-                "token_original": token_original,
-                "token_condensed": token_condensed,
-            },
-        )
-        session.execute(
-            text(
-                """
-                INSERT INTO audit_logs (id, namespace, session_id, event_type, details)
-                VALUES (:id, :namespace, :session_id, :event_type, CAST(:details AS jsonb))
-                """
-            ),
-            {
-                "id": str(uuid.uuid4()),
-                "namespace": namespace,
-                "session_id": session_id,
-                "event_type": "CONDENSATION",
-                "details": json.dumps({"kind": "session_summary", "version": version}),
-            },
+            if skip_if_empty:
+                if not messages:
+                    return None
+                memory_ids = [m["id"] for m in messages]
+        elif raw_text is None:
+            # Enqueued from hot session state: select the unsummarized messages here.
+            messages = _fetch_new_messages(
+                session, namespace, session_id, prev_summary_id, limit=int(settings.summary_refresh_max_batch)
+            )
+            memory_ids = [m["id"] for m in messages]
+
+        result = write_snapshot(
+            session,
+            namespace=namespace,
+            session_id=session_id,
+            messages=messages,
+            raw_text=raw_text,
+            prev_summary_id=prev_summary_id,
+            prev_summary_text=prev_summary_text,
+            trigger_reason=trigger_reason,
+            trigger_details=trigger_details,
+            memory_ids=memory_ids,
         )
         session.commit()
 
-    return CondensationResult(
-        condensation_id=condensation_id,
-        token_original=token_original,
-        token_condensed=token_condensed,
-    )
+    publish_snapshot(ctx.redis, namespace, session_id, result)
+    return result
 
 
 def latest_condensation(session: Session, namespace: str, session_id: str) -> PersistedCondensation | None:
@@ -378,7 +643,8 @@ def latest_condensation(session: Session, namespace: str, session_id: str) -> Pe
         session.execute(
             text(
                 """
-                SELECT id, condensed_text, token_original, token_condensed, created_at
+                SELECT id, condensed_text, token_original, token_condensed, created_at,
+                       COALESCE(covered_until, created_at) AS covered_until
                 FROM condensations
                 WHERE namespace = :namespace AND session_id = :session_id
                 ORDER BY created_at DESC
@@ -398,4 +664,43 @@ def latest_condensation(session: Session, namespace: str, session_id: str) -> Pe
         token_original=int(row["token_original"]),
         token_condensed=int(row["token_condensed"]),
         created_at=str(row["created_at"]),
+        covered_until=str(row["covered_until"]),
     )
+
+
+def latest_condensations(
+    session: Session, sessions: list[tuple[str, str]]
+) -> dict[tuple[str, str], PersistedCondensation]:
+    """`latest_condensation` for many sessions in one query."""
+
+    if not sessions:
+        return {}
+    rows = (
+        session.execute(
+            text(
+                """
+                SELECT DISTINCT ON (c.namespace, c.session_id)
+                       c.namespace, c.session_id, c.id, c.condensed_text, c.token_original,
+                       c.token_condensed, c.created_at, COALESCE(c.covered_until, c.created_at) AS covered_until
+                FROM condensations c
+                JOIN unnest(CAST(:namespaces AS text[]), CAST(:session_ids AS text[])) AS s(namespace, session_id)
+                  ON c.namespace = s.namespace AND c.session_id = s.session_id
+                ORDER BY c.namespace, c.session_id, c.created_at DESC
+                """
+            ),
+            {"namespaces": [ns for ns, _ in sessions], "session_ids": [sid for _, sid in sessions]},
+        )
+        .mappings()
+        .all()
+    )
+    return {
+        (str(r["namespace"]), str(r["session_id"])): PersistedCondensation(
+            id=str(r["id"]),
+            condensed_text=str(r["condensed_text"]),
+            token_original=int(r["token_original"]),
+            token_condensed=int(r["token_condensed"]),
+            created_at=str(r["created_at"]),
+            covered_until=str(r["covered_until"]),
+        )
+        for r in rows
+    }
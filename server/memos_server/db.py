@@ -6,6 +6,8 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
+from memos_server.vector_codec import register_vector_codec
+
 
 @dataclass(frozen=True)
 class Db:
@@ -15,10 +17,12 @@ class Db:
 def create_db(database_url: str) -> Db:
     # pool_pre_ping helps avoid stale connections during local dev.
     engine = create_engine(database_url, pool_pre_ping=True)
+    # Bind embeddings as binary pgvector values (see vector_codec).
+    register_vector_codec(engine)
     return Db(engine=engine)
 
 
-def ensure_schema(engine: Engine) -> None:
+def ensure_schema(engine: Engine, embedding_dim: int | None = None) -> None:
     """Ensure required tables/columns exist for local dev.
 
     This repo intentionally avoids heavy migration frameworks for MVP/demo.
@@ -26,6 +30,9 @@ def ensure_schema(engine: Engine) -> None:
     after pulling new changes.
     """
 
+    if embedding_dim is not None:
+        ensure_embedding_dim(engine, embedding_dim)
+
     with Session(engine) as session:
         # --- Condensations (session summary snapshots) ---
         # Older local DBs might still have `version` as INTEGER; align it to TEXT.
@@ -63,6 +70,11 @@ def ensure_schema(engine: Engine) -> None:
             session.execute(
                 text("ALTER TABLE condensations ADD COLUMN IF NOT EXISTS trigger_details JSONB NOT NULL DEFAULT '{}'::jsonb")
             )
+            # Newest message folded into the snapshot (catch-up chains commit several snapshots
+            # whose created_at is later than the messages still waiting).
+            session.execute(text("ALTER TABLE condensations ADD COLUMN IF NOT EXISTS covered_until TIMESTAMPTZ"))
+            # Its id: messages sharing created_at (one multi-row insert) are ordered by id.
+            session.execute(text("ALTER TABLE condensations ADD COLUMN IF NOT EXISTS covered_id UUID"))
         except Exception:
             pass
 
@@ -93,7 +105,161 @@ def ensure_schema(engine: Engine) -> None:
         )
         session.commit()
 
+    ensure_memory_features(engine)
+
+
+# Indexes used by the retrieval planner (see `retrieval.py`). Fresh databases get them from
+# the init SQL; existing ones are migrated by `python migrate.py` (`build_memory_indexes`),
+# never at API startup: building them locks `memories` against ingest for the whole build.
+MEMORY_INDEXES = (
+    ("idx_memories_namespace_session_created_at", "ON memories(namespace, session_id, created_at DESC)"),
+    ("idx_memories_embedding_hnsw", "ON memories USING hnsw (embedding vector_cosine_ops)"),
+    ("idx_memories_lexical", "ON memories USING gin (lexical)"),
+)
+
+
+def build_memory_indexes(engine: Engine) -> list[str]:
+    """Create missing `MEMORY_INDEXES` with `CREATE INDEX CONCURRENTLY` (ingest keeps running).
+
+    CONCURRENTLY can't run inside a transaction, so this uses an autocommit connection. A
+    build that failed or was interrupted leaves an INVALID index behind, which is dropped and
+    rebuilt. Returns the names of the indexes built.
+    """
+
+    built: list[str] = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, definition in MEMORY_INDEXES:
+            valid = conn.execute(
+                text(
+                    """
+                    SELECT i.indisvalid FROM pg_index i
+                    WHERE i.indexrelid = to_regclass(:name)
+                    """
+                ),
+                {"name": name},
+            ).scalar()
+            if valid:
+                continue
+            if valid is not None:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            try:
+                conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}"))
+            except Exception as exc:
+                # pgvector < 0.5 has no HNSW; keep the existing ivfflat index.
+                print(f"[db] warning: index {name} not created: {type(exc).__name__}: {exc}")
+                continue
+            built.append(name)
+
+        hnsw = conn.execute(
+            text("SELECT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass('idx_memories_embedding_hnsw')")
+        ).scalar()
+        if hnsw:
+            # Superseded by HNSW: ivfflat built on an empty table has untrained lists, and two
+            # ANN indexes double the write cost.
+            conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS idx_memories_embedding_cosine"))
+    return built
+
+
+def ensure_memory_features(engine: Engine) -> None:
+    """Ingest-time feature columns (see `ingest.memory_features`, `memory_card.memory_buckets`).
+
+    DDL only: the GIN full-text index (`MEMORY_INDEXES`) and the backfill of rows written
+    before these columns existed are done by `migrate.py`.
+    """
+
+    with Session(engine) as session:
+        session.execute(text("ALTER TABLE memories ADD COLUMN IF NOT EXISTS lexical tsvector"))
+        session.execute(text("ALTER TABLE memories ADD COLUMN IF NOT EXISTS token_hashes INTEGER[]"))
+        session.execute(text("ALTER TABLE memories ADD COLUMN IF NOT EXISTS token_estimate INTEGER"))
+        session.execute(text("ALTER TABLE memories ADD COLUMN IF NOT EXISTS text_length INTEGER"))
+        session.execute(text("ALTER TABLE memories ADD COLUMN IF NOT EXISTS buckets JSONB"))
+        session.commit()
+
+
+def ensure_embedding_dim(engine: Engine, dim: int) -> None:
+    """Align `memories.embedding` (init SQL: `vector(32)`) with the configured embedding dim.
+
+    Safe only while no vectors are stored: vectors of different dims are not comparable, so a
+    populated table is left untouched and a warning asks for a reset/re-embed instead.
+    """
+
+    with Session(engine) as session:
+        current = session.execute(
+            text(
+                """
+                SELECT format_type(a.atttypid, a.atttypmod) AS t
+                FROM pg_attribute a
+                WHERE a.attrelid = to_regclass('memories') AND a.attname = 'embedding' AND NOT a.attisdropped
+                """
+            )
+        ).scalar()
+        wanted = f"vector({int(dim)})"
+        if current is None or str(current) == wanted:
+            return
+
+        has_vectors = session.execute(text("SELECT EXISTS (SELECT 1 FROM memories WHERE embedding IS NOT NULL)")).scalar()
+        if has_vectors:
+            print(
+                f"[db] warning: memories.embedding is {current} but MEMOS_EMBEDDING_DIM={dim}; "
+                "existing vectors must be re-embedded (or the session data reset) before switching dims"
+            )
+            return
+
+        # Dependent vector indexes are rebuilt by ALTER TYPE (cheap: the column is empty).
+        session.execute(text(f"ALTER TABLE memories ALTER COLUMN embedding TYPE {wanted}"))
+        session.commit()
+
 
 def run_health_check(db: Db) -> None:
     with Session(db.engine) as session:
         session.execute(text("SELECT 1"))
+
+
+def bulk_insert(
+    session: Session,
+    table: str,
+    rows: list[dict[str, object]],
+    *,
+    casts: dict[str, str] | None = None,
+    on_conflict: str = "",
+    max_params: int = 30_000,
+) -> int:
+    """Insert many rows with multi-row `INSERT ... VALUES (...), (...)` statements.
+
+    Why: one statement per chunk instead of one round trip per row. Columns are taken
+    from the first row, so every row must carry the same keys. `casts` maps a column to
+    a SQL type for values sent as text (e.g. `{"metadata": "jsonb"}`).
+
+    Chunking keeps each statement well under Postgres' 65535 bind-parameter limit.
+    """
+
+    if not rows:
+        return 0
+
+    columns = list(rows[0].keys())
+    casts = casts or {}
+    per_chunk = max(1, max_params // len(columns))
+    column_sql = ", ".join(columns)
+
+    inserted = 0
+    for start in range(0, len(rows), per_chunk):
+        chunk = rows[start : start + per_chunk]
+        params: dict[str, object] = {}
+        values_sql: list[str] = []
+        for i, row in enumerate(chunk):
+            slots: list[str] = []
+            for col in columns:
+                name = f"{col}_{i}"
+                params[name] = row[col]
+                slot = f":{name}"
+                if col in casts:
+                    slot = f"CAST({slot} AS {casts[col]})"
+                slots.append(slot)
+            values_sql.append("(" + ", ".join(slots) + ")")
+
+        sql = f"INSERT INTO {table} ({column_sql}) VALUES " + ", ".join(values_sql)
+        if on_conflict:
+            sql += " " + on_conflict
+        res = session.execute(text(sql), params)
+        inserted += int(res.rowcount or 0)
+    return inserted
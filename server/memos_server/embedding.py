@@ -1,7 +1,19 @@
 from __future__ import annotations
 
 import hashlib
-from typing import List
+import math
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Protocol, Sequence
+
+import numpy as np
+
+from memos_server.lexical import tokenize
+from memos_server.process_pool import get_process_pool
+
+if TYPE_CHECKING:
+    from memos_server.settings import Settings
 
 
 EMBEDDING_DIM = 32
@@ -28,3 +40,203 @@ def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
         val = int.from_bytes(buf[i : i + 2], "big")
         out.append((val / 65535.0) * 2.0 - 1.0)
     return out
+
+
+def fake_embeddings(texts: Sequence[str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Vectorized `fake_embedding` for batches: float64 array of shape (len(texts), dim).
+
+    Bit-identical to the scalar version: the per-text digest expansion is done with
+    `np.tile` over the concatenated digests and decoded with one `np.frombuffer(..., ">u2")`,
+    then scaled with the same float64 operations.
+    """
+
+    n = len(texts)
+    if n == 0:
+        return np.empty((0, dim), dtype=np.float64)
+
+    digests = b"".join(hashlib.sha256(t.encode("utf-8")).digest() for t in texts)
+    raw = np.frombuffer(digests, dtype=np.uint8).reshape(n, 32)
+    reps = (dim * 2 // 32) + 1
+    buf = np.tile(raw, (1, reps))[:, : dim * 2]
+    vals = np.frombuffer(np.ascontiguousarray(buf).tobytes(), dtype=">u2").reshape(n, dim)
+    return (vals / 65535.0) * 2.0 - 1.0
+
+
+class EmbeddingProvider(Protocol):
+    """Text -> vector model used for L2 (pgvector) retrieval.
+
+    `name`/`version`/`dim` identify the vector space: vectors from different triples are not
+    comparable (and must not share cache entries).
+    """
+
+    name: str
+    version: str
+    dim: int
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed one text as a float32 array of shape (dim,)."""
+        ...
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed a batch as a float32 array of shape (len(texts), dim)."""
+        ...
+
+
+@dataclass(frozen=True)
+class HashEmbeddingProvider:
+    """The MVP `fake_embedding` as a provider (deterministic, not semantic)."""
+
+    dim: int = EMBEDDING_DIM
+    name: str = "hash"
+    version: str = "sha256_v1"
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        return fake_embeddings(texts, self.dim).astype(np.float32)
+
+
+def _projection_features(text: str) -> Counter[str]:
+    """Bag of features: the lexical tokens (lowercase words plus CJK unigrams and bigrams)."""
+
+    return Counter(tokenize(text))
+
+
+@lru_cache(maxsize=65_536)
+def _feature_slots(feature: str, dim: int, hashes: int) -> tuple[np.ndarray, np.ndarray]:
+    """Sparse random projection of one feature: `hashes` (index, ±1) pairs in [0, dim)."""
+
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=4 * hashes, person=b"memos-proj-v1").digest()
+    words = np.frombuffer(digest, dtype=">u4").astype(np.int64)
+    idx = words % dim
+    signs = np.where((words >> 31) & 1, -1.0, 1.0).astype(np.float32)
+    return idx, signs
+
+
+@dataclass(frozen=True)
+class HashedProjectionEmbeddingProvider:
+    """Local CPU embedder: hashed TF features + sparse random projection (no network, no model files).
+
+    How it works:
+    - features: words + CJK unigrams/bigrams, weighted with sublinear TF (1 + log tf)
+    - each feature is projected into `hashes` signed slots of the output vector (feature
+      hashing / sparse Johnson-Lindenstrauss), then the vector is L2-normalized
+
+    Unlike `HashEmbeddingProvider`, texts sharing vocabulary land close in cosine space, which
+    makes L2 retrieval meaningful while staying deterministic across processes and hosts.
+    """
+
+    dim: int = EMBEDDING_DIM
+    hashes: int = 4
+    name: str = "hashed_projection"
+    version: str = "tf_blake2b_v1"
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            row = out[i]
+            for feature, tf in _projection_features(t).items():
+                idx, signs = _feature_slots(feature, self.dim, self.hashes)
+                np.add.at(row, idx, signs * (1.0 + math.log(tf)))
+            norm = float(np.linalg.norm(row))
+            if norm > 0.0:
+                row /= norm
+            else:
+                # No features (e.g. punctuation only): fall back to the hash vector so cosine
+                # distance stays defined.
+                row[:] = fake_embedding(t, self.dim)
+        return out
+
+
+def _embed_chunk(provider: EmbeddingProvider, texts: list[str]) -> np.ndarray:
+    # Module-level so it can be pickled into pool workers.
+    return provider.embed_many(texts)
+
+
+@dataclass(frozen=True)
+class ParallelEmbeddingProvider:
+    """Fan large batches out to a process pool; small batches stay in-process.
+
+    Embedding is CPU-bound Python, so threads don't help; chunks are sent to worker processes
+    and reassembled in input order.
+    """
+
+    inner: EmbeddingProvider
+    workers: int
+    min_batch: int = 256
+
+    @property
+    def name(self) -> str:
+        return self.inner.name
+
+    @property
+    def version(self) -> str:
+        return self.inner.version
+
+    @property
+    def dim(self) -> int:
+        return self.inner.dim
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.inner.embed(text)
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        items = list(texts)
+        if self.workers <= 1 or len(items) < self.min_batch:
+            return self.inner.embed_many(items)
+
+        chunk = max(1, math.ceil(len(items) / self.workers))
+        parts = [items[i : i + chunk] for i in range(0, len(items), chunk)]
+        pool = get_process_pool("embedding", self.workers)
+        results = list(pool.map(_embed_chunk, [self.inner] * len(parts), parts))
+        return np.concatenate(results, axis=0) if results else np.empty((0, self.dim), dtype=np.float32)
+
+
+_PROVIDERS = {
+    "hash": HashEmbeddingProvider,
+    "hashed_projection": HashedProjectionEmbeddingProvider,
+}
+
+
+def create_embedder(settings: Settings) -> EmbeddingProvider:
+    """Build the configured provider (`MEMOS_EMBEDDING_PROVIDER`, `MEMOS_EMBEDDING_DIM`).
+
+    Layering: cache -> process pool -> provider, so only cache misses reach the pool.
+    """
+
+    try:
+        provider_cls = _PROVIDERS[settings.embedding_provider]
+    except KeyError:
+        raise ValueError(
+            f"unknown embedding provider {settings.embedding_provider!r}; expected one of {sorted(_PROVIDERS)}"
+        ) from None
+
+    provider: EmbeddingProvider = provider_cls(dim=int(settings.embedding_dim))
+    workers = int(settings.embedding_workers)
+    if workers > 1:
+        provider = ParallelEmbeddingProvider(
+            inner=provider,
+            workers=workers,
+            min_batch=int(settings.embedding_parallel_min_batch),
+        )
+
+    if int(settings.embedding_cache_size) > 0 or settings.embedding_cache_shared:
+        from memos_server.embedding_cache import CachedEmbeddingProvider
+
+        shared = None
+        if settings.embedding_cache_shared:
+            import redis
+
+            # Raw bytes client: vectors are cached as float32 buffers.
+            shared = redis.Redis.from_url(settings.redis_url)
+        provider = CachedEmbeddingProvider(
+            provider,
+            maxsize=int(settings.embedding_cache_size),
+            shared=shared,
+            ttl_seconds=int(settings.embedding_cache_ttl_seconds),
+        )
+    return provider
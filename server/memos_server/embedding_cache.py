@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Generic, Sequence, TypeVar
+
+import numpy as np
+import redis
+
+if TYPE_CHECKING:
+    from memos_server.embedding import EmbeddingProvider
+
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LruCache(Generic[K, V]):
+    """Small thread-safe bounded LRU (FastAPI runs sync endpoints on a threadpool)."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = max(0, int(maxsize))
+        self._data: OrderedDict[K, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@dataclass(frozen=True)
+class EmbeddingCacheStats:
+    provider: str
+    size: int
+    maxsize: int
+    shared_enabled: bool
+    local_hits: int
+    shared_hits: int
+    misses: int
+    shared_errors: int
+
+
+class CachedEmbeddingProvider:
+    """Two-level embedding cache in front of any `EmbeddingProvider`.
+
+    - L1: in-process bounded LRU (per API/worker process)
+    - L2 (optional): shared Redis string per vector (raw float32 bytes, TTL)
+
+    Keys are `(provider, model version, dim, sha256(text))`, so switching models or dims
+    never serves stale vectors. Shared-cache failures degrade to recomputation.
+    """
+
+    def __init__(
+        self,
+        inner: EmbeddingProvider,
+        *,
+        maxsize: int,
+        shared: redis.Redis | None = None,
+        ttl_seconds: int = 86_400,
+    ) -> None:
+        self.inner = inner
+        self._local: LruCache[str, np.ndarray] = LruCache(maxsize)
+        self._shared = shared
+        self._ttl_seconds = int(ttl_seconds)
+        self._lock = threading.Lock()
+        self._local_hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._shared_errors = 0
+
+    @property
+    def name(self) -> str:
+        return self.inner.name
+
+    @property
+    def version(self) -> str:
+        return self.inner.version
+
+    @property
+    def dim(self) -> int:
+        return self.inner.dim
+
+    def cache_key(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"memos:emb:{self.name}:{self.version}:{self.dim}:{digest}"
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        items = list(texts)
+        out = np.empty((len(items), self.dim), dtype=np.float32)
+        keys = [self.cache_key(t) for t in items]
+
+        # key -> output rows still missing (duplicates in one batch are computed once)
+        missing: dict[str, list[int]] = {}
+        local_hits = 0
+        for i, key in enumerate(keys):
+            cached = self._local.get(key)
+            if cached is not None:
+                out[i] = cached
+                local_hits += 1
+            else:
+                missing.setdefault(key, []).append(i)
+
+        shared_hits = self._fill_from_shared(out, missing)
+
+        computed: dict[str, np.ndarray] = {}
+        if missing:
+            miss_keys = list(missing)
+            vectors = self.inner.embed_many([items[missing[k][0]] for k in miss_keys])
+            for key, vec in zip(miss_keys, vectors):
+                # Copy: a row view would keep the whole batch array alive in the LRU.
+                vec = np.array(vec, dtype=np.float32)
+                computed[key] = vec
+                self._local.put(key, vec)
+                for i in missing[key]:
+                    out[i] = vec
+            self._store_shared(computed)
+
+        with self._lock:
+            self._local_hits += local_hits
+            self._shared_hits += shared_hits
+            self._misses += len(computed)
+        return out
+
+    def _fill_from_shared(self, out: np.ndarray, missing: dict[str, list[int]]) -> int:
+        if self._shared is None or not missing:
+            return 0
+        keys = list(missing)
+        try:
+            raw_values = self._shared.mget(keys)
+        except redis.RedisError:
+            self._count_shared_error()
+            return 0
+
+        hits = 0
+        expected = self.dim * 4
+        for key, raw in zip(keys, raw_values):
+            if not raw or len(raw) != expected:
+                continue
+            vec = np.frombuffer(raw, dtype="<f4").astype(np.float32)
+            self._local.put(key, vec)
+            for i in missing.pop(key):
+                out[i] = vec
+            hits += 1
+        return hits
+
+    def _store_shared(self, computed: dict[str, np.ndarray]) -> None:
+        if self._shared is None or not computed:
+            return
+        try:
+            pipe = self._shared.pipeline(transaction=False)
+            for key, vec in computed.items():
+                pipe.set(key, vec.astype("<f4").tobytes(), ex=self._ttl_seconds)
+            pipe.execute()
+        except redis.RedisError:
+            self._count_shared_error()
+
+    def _count_shared_error(self) -> None:
+        with self._lock:
+            self._shared_errors += 1
+
+    def cache_stats(self) -> EmbeddingCacheStats:
+        with self._lock:
+            return EmbeddingCacheStats(
+                provider=f"{self.name}:{self.version}:{self.dim}",
+                size=len(self._local),
+                maxsize=self._local.maxsize,
+                shared_enabled=self._shared is not None,
+                local_hits=self._local_hits,
+                shared_hits=self._shared_hits,
+                misses=self._misses,
+                shared_errors=self._shared_errors,
+            )
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-import re
+
+from memos_server.line_classifier import default_classifier
 
 
 @dataclass(frozen=True)
@@ -12,26 +13,14 @@ class ExtractedBuckets:
     decisions: list[str]
 
 
-_SPLIT_CLAUSES_RE = re.compile(r"[；;]\s*")
-
-
-def _split_clauses(text: str) -> list[str]:
-    value = (text or "").strip()
-    if not value:
-        return []
-    parts = [p.strip() for p in _SPLIT_CLAUSES_RE.split(value)]
-    return [p for p in parts if p]
-
+def extract_line_directive(s: str) -> tuple[str, list[str]] | None:
+    """Bucket name and items of one cleaned line (None when it carries no directive).
 
-_PREF_RE = re.compile(r"^(?:我的偏好|偏好|我希望|我倾向于|我更喜欢|希望能|希望)[:：]\s*(.+)$")
-_PREF_SENTENCE_RE = re.compile(r"^(?:我希望|我倾向于|我更喜欢|希望能|希望).+$")
-_CONSTRAINT_LABEL_RE = re.compile(r"^(?:约束|限制)[:：]\s*(.+)$")
-_DECISION_LABEL_RE = re.compile(r"^(?:决策|决定|选择|我选)[:：]\s*(.+)$")
-_DECISION_SENTENCE_RE = re.compile(r"^(?:我选[AB]|我选择).+$")
-_FACT_LABEL_RE = re.compile(r"^(?:事实)[:：]\s*(.+)$")
+    Lines are independent of each other, so buckets can be built incrementally. The rules
+    are the directive table of `line_classifier` (one compiled alternation).
+    """
 
-# Directive-like sentences without explicit labels.
-_CONSTRAINT_SENTENCE_RE = re.compile(r"^(?:必须|不要|不能|不许|禁止|保留)(?:\s*|：|:)?(.+)?$")
+    return default_classifier().directive(s)
 
 
 def extract_directive_buckets(cleaned_lines: list[str]) -> ExtractedBuckets:
@@ -42,48 +31,17 @@ def extract_directive_buckets(cleaned_lines: list[str]) -> ExtractedBuckets:
     This avoids overfitting / accidental matches caused by naive substring checks.
     """
 
-    facts: list[str] = []
-    preferences: list[str] = []
-    constraints: list[str] = []
-    decisions: list[str] = []
-
+    buckets: dict[str, list[str]] = {"facts": [], "preferences": [], "constraints": [], "decisions": []}
     for s in cleaned_lines:
-        m = _FACT_LABEL_RE.match(s)
-        if m:
-            facts.extend(_split_clauses(m.group(1)))
-            continue
-
-        m = _PREF_RE.match(s)
-        if m:
-            preferences.extend(_split_clauses(m.group(1)))
-            continue
-        if _PREF_SENTENCE_RE.match(s):
-            preferences.append(s)
-            continue
-
-        m = _CONSTRAINT_LABEL_RE.match(s)
-        if m:
-            constraints.extend(_split_clauses(m.group(1)))
-            continue
-
-        m = _DECISION_LABEL_RE.match(s)
-        if m:
-            decisions.extend(_split_clauses(m.group(1)))
-            continue
-        if _DECISION_SENTENCE_RE.match(s):
-            decisions.append(s)
-            continue
-
-        # Fallback: only treat a line as a constraint when it *starts* with a modal.
-        m = _CONSTRAINT_SENTENCE_RE.match(s)
-        if m:
-            constraints.append(s)
+        found = extract_line_directive(s)
+        if found and found[0] in buckets:
+            buckets[found[0]].extend(found[1])
 
     return ExtractedBuckets(
-        facts=_uniq(facts),
-        preferences=_uniq(preferences),
-        constraints=_uniq(constraints),
-        decisions=_uniq(decisions),
+        facts=_uniq(buckets["facts"]),
+        preferences=_uniq(buckets["preferences"]),
+        constraints=_uniq(buckets["constraints"]),
+        decisions=_uniq(buckets["decisions"]),
     )
 
 
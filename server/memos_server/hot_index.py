@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from memos_server.ann_index import HnswIndex
+from memos_server.db import Db
+from memos_server.embedding import EmbeddingProvider
+from memos_server.ingest import MemoryRecord
+from memos_server.settings import Settings
+from memos_server.vector_codec import from_db
+
+
+# Hot-namespace L2 accelerator: an in-process HNSW index per configured namespace.
+#
+# Lifecycle per namespace:
+# - load: snapshot file if present (then catch up from its watermark), else full build from `memories`
+# - ingest: API-side incremental adds (sync ingest mode; write-behind rows arrive via reconcile)
+# - reconcile: every N seconds, add rows newer than the `created_at` watermark and rebuild when
+#   Postgres holds fewer rows than the index (deletes/resets from other processes)
+# - evict: when the memory budget is exceeded, the least recently queried namespace is
+#   snapshotted and dropped; queries fall back to SQL and trigger a background reload
+# - oversized: a namespace that alone exceeds the budget is dropped (or its build abandoned)
+#   and not reloaded until restart; it is served from SQL
+#
+# `search()` returns None whenever the index cannot answer, so callers always have the SQL path.
+
+# Rows may commit with a `created_at` older than the watermark (write-behind stamps accept time),
+# so each reconcile re-reads a small window behind it; already indexed ids are skipped.
+_RECONCILE_OVERLAP = timedelta(minutes=5)
+_PAGE_SIZE = 5000
+
+
+@dataclass
+class _NamespaceIndex:
+    index: HnswIndex
+    watermark: datetime | None
+    last_used: float
+
+
+class HotIndexManager:
+    def __init__(
+        self,
+        db: Db,
+        *,
+        namespaces: list[str],
+        dim: int,
+        vector_space: str,
+        memory_budget_bytes: int,
+        snapshot_dir: str = "",
+        reconcile_seconds: float = 30.0,
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+    ) -> None:
+        self.db = db
+        self.namespaces = list(dict.fromkeys(namespaces))
+        self.dim = int(dim)
+        self.vector_space = vector_space
+        self.memory_budget_bytes = int(memory_budget_bytes)
+        self.snapshot_dir = snapshot_dir
+        self.reconcile_seconds = float(reconcile_seconds)
+        self.m = int(m)
+        self.ef_construction = int(ef_construction)
+        self.ef_search = int(ef_search)
+
+        self._states: dict[str, _NamespaceIndex] = {}
+        self._wanted: set[str] = set(self.namespaces)
+        self._oversized: set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # --- lifecycle ---
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="memos-hot-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+        for ns, state in list(self._states.items()):
+            self._snapshot(ns, state)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            for ns in sorted(self._wanted):
+                if self._stop.is_set():
+                    return
+                try:
+                    self._load(ns)
+                except Exception as exc:
+                    print(f"[hot-index] load failed namespace={ns!r}: {type(exc).__name__}: {exc}")
+                finally:
+                    self._wanted.discard(ns)
+            for ns in list(self._states):
+                if self._stop.is_set():
+                    return
+                try:
+                    self._reconcile(ns)
+                except Exception as exc:
+                    print(f"[hot-index] reconcile failed namespace={ns!r}: {type(exc).__name__}: {exc}")
+            self._wake.wait(self.reconcile_seconds)
+            self._wake.clear()
+
+    # --- request path ---
+
+    def search(self, namespace: str, session_id: str, query: np.ndarray, k: int) -> list[tuple[str, float]] | None:
+        """`(memory_id, cosine score)` best first, or None to use the SQL path."""
+
+        state = self._states.get(namespace)
+        if state is None:
+            if namespace in self.namespaces and namespace not in self._wanted and namespace not in self._oversized:
+                # Evicted (or still loading): reload in the background.
+                self._wanted.add(namespace)
+                self._wake.set()
+            return None
+        state.last_used = time.monotonic()
+        return state.index.search(query, k, group=session_id, ef=self.ef_search)
+
+    def add(self, records: list[MemoryRecord], vectors: np.ndarray) -> None:
+        for r, vec in zip(records, vectors):
+            state = self._states.get(r.namespace)
+            if state is not None:
+                state.index.add(r.id, vec, r.session_id)
+
+    def remove_session(self, namespace: str, session_id: str) -> None:
+        state = self._states.get(namespace)
+        if state is not None:
+            state.index.remove_group(session_id)
+
+    def stats(self) -> list[dict[str, Any]]:
+        out: list[dict[str, Any]] = []
+        for ns in self.namespaces:
+            state = self._states.get(ns)
+            out.append(
+                {
+                    "namespace": ns,
+                    "loaded": state is not None,
+                    "oversized": ns in self._oversized,
+                    "vectors": len(state.index) if state else 0,
+                    "bytes": state.index.nbytes() if state else 0,
+                    "watermark": (state.watermark.isoformat() if state and state.watermark else None),
+                }
+            )
+        return out
+
+    # --- build / reconcile ---
+
+    def _load(self, ns: str) -> None:
+        if ns in self._states:
+            return
+        state = self._load_snapshot(ns)
+        if state is None:
+            state = _NamespaceIndex(index=self._new_index(), watermark=None, last_used=time.monotonic())
+            fits = self._fill(ns, state, since=None)
+            action = "built"
+        else:
+            fits = self._fill(ns, state, since=state.watermark)
+            action = "restored"
+        if not fits:
+            self._oversized.add(ns)
+            print(
+                f"[hot-index] namespace={ns!r} exceeds the memory budget alone "
+                f"({self.memory_budget_bytes} bytes): serving it from SQL"
+            )
+            return
+        print(f"[hot-index] {action} namespace={ns!r} vectors={len(state.index)}")
+        with self._lock:
+            self._states[ns] = state
+        self._enforce_budget(keep=ns)
+
+    def _new_index(self) -> HnswIndex:
+        return HnswIndex(self.dim, m=self.m, ef_construction=self.ef_construction)
+
+    def _fill(self, ns: str, state: _NamespaceIndex, since: datetime | None) -> bool:
+        """Add rows with created_at > since (minus the overlap window), paging by (created_at, id).
+
+        Returns False (stopping early) once the index alone exceeds the memory budget.
+        """
+
+        cursor_at = (since - _RECONCILE_OVERLAP) if since is not None else datetime(1970, 1, 1)
+        cursor_id = "00000000-0000-0000-0000-000000000000"
+        with Session(self.db.engine) as session:
+            while True:
+                rows = (
+                    session.execute(
+                        text(
+                            """
+                            SELECT id, session_id, embedding, created_at
+                            FROM memories
+                            WHERE namespace = :namespace
+                              AND embedding IS NOT NULL
+                              AND (created_at, id) > (:cursor_at, CAST(:cursor_id AS uuid))
+                            ORDER BY created_at, id
+                            LIMIT :limit
+                            """
+                        ),
+                        {"namespace": ns, "cursor_at": cursor_at, "cursor_id": cursor_id, "limit": _PAGE_SIZE},
+                    )
+                    .mappings()
+                    .all()
+                )
+                for r in rows:
+                    vec = from_db(r["embedding"])
+                    if vec is not None and vec.shape[0] == self.dim:
+                        state.index.add(str(r["id"]), vec, str(r["session_id"]))
+                    created_at = r["created_at"]
+                    if state.watermark is None or created_at > state.watermark:
+                        state.watermark = created_at
+                if state.index.nbytes() > self.memory_budget_bytes:
+                    return False
+                if len(rows) < _PAGE_SIZE:
+                    return True
+                cursor_at, cursor_id = rows[-1]["created_at"], str(rows[-1]["id"])
+
+    def _reconcile(self, ns: str) -> None:
+        state = self._states.get(ns)
+        if state is None:
+            return
+        self._fill(ns, state, since=state.watermark)
+
+        with Session(self.db.engine) as session:
+            db_count = session.execute(
+                text("SELECT COUNT(*) FROM memories WHERE namespace = :namespace AND embedding IS NOT NULL"),
+                {"namespace": ns},
+            ).scalar()
+        if len(state.index) > int(db_count or 0):
+            # Rows were deleted elsewhere (e.g. a session reset handled by another API process).
+            fresh = _NamespaceIndex(index=self._new_index(), watermark=None, last_used=state.last_used)
+            self._fill(ns, fresh, since=None)
+            with self._lock:
+                self._states[ns] = fresh
+            print(f"[hot-index] rebuilt namespace={ns!r} vectors={len(fresh.index)} (index ahead of db)")
+        self._enforce_budget(keep=ns)
+
+    def _enforce_budget(self, keep: str) -> None:
+        """Evict least recently queried namespaces (`keep` last) until the budget holds."""
+
+        evicted: list[tuple[str, _NamespaceIndex]] = []
+        with self._lock:
+            while self._states:
+                total = sum(s.index.nbytes() for s in self._states.values())
+                if total <= self.memory_budget_bytes:
+                    break
+                others = [ns for ns in self._states if ns != keep]
+                victim = min(others, key=lambda ns: self._states[ns].last_used) if others else keep
+                if victim == keep:
+                    # Over budget on its own: reloading it would only be evicted again.
+                    self._oversized.add(victim)
+                evicted.append((victim, self._states.pop(victim)))
+        # Snapshots write to disk: outside the lock, so searches aren't held up.
+        for ns, state in evicted:
+            self._snapshot(ns, state)
+            print(f"[hot-index] evicted namespace={ns!r} (memory budget{', oversized' if ns in self._oversized else ''})")
+
+    # --- snapshots ---
+
+    def _snapshot_path(self, ns: str) -> str | None:
+        if not self.snapshot_dir:
+            return None
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", ns)[:64]
+        digest = hashlib.sha1(f"{ns}\x00{self.vector_space}".encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.snapshot_dir, f"{slug}-{digest}.npz")
+
+    def _snapshot(self, ns: str, state: _NamespaceIndex) -> None:
+        path = self._snapshot_path(ns)
+        if path is None:
+            return
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            state.index.save(
+                path,
+                meta={
+                    "namespace": ns,
+                    "vector_space": self.vector_space,
+                    "watermark": (state.watermark.isoformat() if state.watermark else None),
+                },
+            )
+        except Exception as exc:
+            print(f"[hot-index] snapshot failed namespace={ns!r}: {type(exc).__name__}: {exc}")
+
+    def _load_snapshot(self, ns: str) -> _NamespaceIndex | None:
+        path = self._snapshot_path(ns)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            index, meta = HnswIndex.load(path)
+        except Exception as exc:
+            print(f"[hot-index] ignoring unreadable snapshot {path!r}: {type(exc).__name__}: {exc}")
+            return None
+        if meta.get("vector_space") != self.vector_space or index.dim != self.dim:
+            return None
+        raw_wm = meta.get("watermark")
+        watermark = datetime.fromisoformat(str(raw_wm)) if raw_wm else None
+        return _NamespaceIndex(index=index, watermark=watermark, last_used=time.monotonic())
+
+
+def create_hot_index(db: Db, settings: Settings, embedder: EmbeddingProvider) -> HotIndexManager | None:
+    namespaces = [ns.strip() for ns in settings.hot_namespaces.split(",") if ns.strip()]
+    if not namespaces:
+        return None
+    return HotIndexManager(
+        db,
+        namespaces=namespaces,
+        dim=embedder.dim,
+        # Snapshots are only valid for the vector space they were built in.
+        vector_space=f"{embedder.name}:{embedder.version}:{embedder.dim}",
+        memory_budget_bytes=int(settings.hot_index_memory_budget_mb) * 1024 * 1024,
+        snapshot_dir=settings.hot_index_snapshot_dir,
+        reconcile_seconds=float(settings.hot_index_reconcile_seconds),
+        m=int(settings.hot_index_m),
+        ef_construction=int(settings.hot_index_ef_construction),
+        ef_search=int(settings.hot_index_ef_search),
+    )
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import json
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from memos_server.db import bulk_insert
+from memos_server.embedding import EmbeddingProvider
+from memos_server.condensation import estimate_tokens, store_memory_buckets
+from memos_server.lexical import token_hashes, tsvector_literal
+from memos_server.memory_card import memory_buckets
+from memos_server.vector_codec import to_vector
+
+
+@dataclass(frozen=True)
+class MemoryRecord:
+    """A memory ready to be written to L1/L2 (id assigned up front)."""
+
+    id: str
+    namespace: str
+    session_id: str
+    role: str
+    text: str
+    metadata: dict[str, Any] = field(default_factory=dict)
+    # ISO timestamp; set when the row is written later than it was accepted (write-behind).
+    created_at: str | None = None
+
+
+def new_memory(
+    namespace: str,
+    session_id: str,
+    role: str,
+    text: str,
+    metadata: dict[str, Any] | None = None,
+) -> MemoryRecord:
+    return MemoryRecord(
+        id=str(uuid.uuid4()),
+        namespace=namespace,
+        session_id=session_id,
+        role=role,
+        text=text,
+        metadata=dict(metadata or {}),
+    )
+
+
+def importance_for_role(role: str) -> float:
+    # User-authored messages carry directives/preferences; weight them higher.
+    return 0.9 if role == "user" else 0.6
+
+
+_FEATURE_CASTS = {"lexical": "tsvector", "token_hashes": "integer[]", "buckets": "jsonb"}
+
+
+def memory_features(text_value: str) -> dict[str, object]:
+    """Per-memory retrieval/rerank features derived from the text once, at write time."""
+
+    return {
+        "lexical": tsvector_literal(text_value),
+        "token_hashes": token_hashes(text_value),
+        "token_estimate": estimate_tokens(text_value),
+        "text_length": len(text_value),
+    }
+
+
+def insert_memories(
+    session: Session,
+    records: list[MemoryRecord],
+    embedder: EmbeddingProvider,
+    *,
+    on_conflict: str = "",
+    vectors: np.ndarray | None = None,
+) -> int:
+    """Embed (one batch call) and write memories using multi-row INSERTs.
+
+    The caller owns the transaction (commit/rollback). `created_at` must be set on all
+    records or on none of them. Pass `vectors` when the caller already embedded the texts
+    (e.g. to also feed the in-process hot index).
+    """
+
+    if not records:
+        return 0
+
+    if vectors is None:
+        vectors = embedder.embed_many([r.text for r in records])
+    rows: list[dict[str, object]] = []
+    for r, emb in zip(records, vectors):
+        rows.append(
+            {
+                "id": r.id,
+                "namespace": r.namespace,
+                "session_id": r.session_id,
+                "role": r.role,
+                "text": r.text,
+                "metadata": json.dumps(r.metadata),
+                "importance": importance_for_role(r.role),
+                "embedding": to_vector(emb, dim=embedder.dim),
+                **memory_features(r.text),
+                # Card buckets + signals, aggregated by condensation instead of re-reading text.
+                "buckets": json.dumps(memory_buckets(r.role, r.text), ensure_ascii=False),
+            }
+        )
+        if r.created_at is not None:
+            rows[-1]["created_at"] = r.created_at
+    return bulk_insert(
+        session,
+        "memories",
+        rows,
+        casts={"metadata": "jsonb", "created_at": "timestamptz", **_FEATURE_CASTS},
+        on_conflict=on_conflict,
+    )
+
+
+def summarize_batch(records: list[MemoryRecord]) -> list[tuple[str, str, dict[str, Any]]]:
+    """`(namespace, session_id, details)` of the audit rows of one ingest batch.
+
+    One row per session in the batch (first-seen order), so namespace-filtered audit queries
+    see every batch that wrote to them; `batch_id`/`batch_count` tie the rows of a batch together.
+    """
+
+    by_session: dict[tuple[str, str], list[str]] = {}
+    for r in records:
+        by_session.setdefault((r.namespace, r.session_id), []).append(r.id)
+    batch_id = str(uuid.uuid4())
+    return [
+        (
+            namespace,
+            session_id,
+            {"count": len(ids), "memory_ids": ids, "batch_id": batch_id, "batch_count": len(records)},
+        )
+        for (namespace, session_id), ids in by_session.items()
+    ]
+
+
+def store_memory_features(session: Session, rows: list[dict[str, Any]]) -> None:
+    """Write `memory_features` columns for rows with id and text (one UPDATE)."""
+
+    if not rows:
+        return
+    features = [memory_features(str(r["text"])) for r in rows]
+    session.execute(
+        text(
+            """
+            UPDATE memories AS m
+            SET lexical = CAST(v.lexical AS tsvector),
+                token_hashes = CAST(v.token_hashes AS integer[]),
+                token_estimate = v.token_estimate,
+                text_length = v.text_length
+            FROM unnest(
+                CAST(:ids AS uuid[]),
+                CAST(:lexical AS text[]),
+                CAST(:token_hashes AS text[]),
+                CAST(:token_estimate AS integer[]),
+                CAST(:text_length AS integer[])
+            ) AS v(id, lexical, token_hashes, token_estimate, text_length)
+            WHERE m.id = v.id
+            """
+        ),
+        {
+            "ids": [str(r["id"]) for r in rows],
+            "lexical": [f["lexical"] for f in features],
+            # Jagged arrays can't be unnested: each row's hashes travel as an array literal.
+            "token_hashes": ["{" + ",".join(str(int(h)) for h in f["token_hashes"]) + "}" for f in features],  # type: ignore[attr-defined]
+            "token_estimate": [f["token_estimate"] for f in features],
+            "text_length": [f["text_length"] for f in features],
+        },
+    )
+
+
+def backfill_memory_features(engine: Engine, *, batch_size: int = 500) -> int:
+    """Fill `memory_features` columns for rows written before they existed. Returns rows updated.
+
+    Run by `migrate.py`. Rows are claimed with `FOR UPDATE SKIP LOCKED`, so concurrent runs
+    split the table instead of rewriting the same rows.
+    """
+
+    updated = 0
+    while True:
+        with Session(engine) as session:
+            rows = (
+                session.execute(
+                    text(
+                        """
+                        SELECT id, text FROM memories
+                        WHERE lexical IS NULL OR token_hashes IS NULL
+                        LIMIT :limit
+                        FOR UPDATE SKIP LOCKED
+                        """
+                    ),
+                    {"limit": int(batch_size)},
+                )
+                .mappings()
+                .all()
+            )
+            if not rows:
+                return updated
+            store_memory_features(session, [dict(r) for r in rows])
+            session.commit()
+            updated += len(rows)
+
+
+def backfill_memory_buckets(engine: Engine, *, batch_size: int = 500) -> int:
+    """Enrich rows written before `memories.buckets` existed (one UPDATE per batch). Returns rows updated.
+
+    Run by `migrate.py`, like `backfill_memory_features` (SKIP LOCKED batches). Condensation
+    also enriches such rows when it folds them, so this may run while serving.
+    """
+
+    updated = 0
+    while True:
+        with Session(engine) as session:
+            rows = (
+                session.execute(
+                    text(
+                        """
+                        SELECT id, role, text FROM memories
+                        WHERE buckets IS NULL
+                        LIMIT :limit
+                        FOR UPDATE SKIP LOCKED
+                        """
+                    ),
+                    {"limit": int(batch_size)},
+                )
+                .mappings()
+                .all()
+            )
+            if not rows:
+                return updated
+            store_memory_buckets(session, [dict(r) for r in rows])
+            session.commit()
+            updated += len(rows)
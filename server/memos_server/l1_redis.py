@@ -2,8 +2,10 @@ from __future__ import annotations
 
 import json
 from dataclasses import dataclass
+from typing import Any
 
 import redis
+import redis.asyncio
 
 
 @dataclass(frozen=True)
@@ -17,6 +19,12 @@ def create_l1(redis_url: str, window_size: int) -> L1Redis:
     return L1Redis(client=client, window_size=window_size)
 
 
+def create_l1_async(redis_url: str) -> redis.asyncio.Redis:
+    """Async client for the same keys (async request path); same decoding as `create_l1`."""
+
+    return redis.asyncio.Redis.from_url(redis_url, decode_responses=True)
+
+
 def _key(namespace: str, session_id: str) -> str:
     return f"memos:l1:{namespace}:{session_id}"
 
@@ -46,9 +54,62 @@ def append_message(l1: L1Redis, namespace: str, session_id: str, role: str, text
     pipe.execute()
 
 
+def append_messages(
+    l1: L1Redis,
+    messages: list[tuple[str, str, str, str]],
+    ttl_seconds: int = 3600,
+) -> None:
+    """Append many `(namespace, session_id, role, text)` messages in one Redis pipeline.
+
+    Messages are pushed in input order per session, so the resulting window matches
+    calling `append_message` once per message.
+    """
+
+    if not messages:
+        return
+
+    pipe = l1.client.pipeline()
+    _queue_appends(pipe, l1.window_size, messages, ttl_seconds)
+    pipe.execute()
+
+
+async def append_messages_async(
+    client: redis.asyncio.Redis,
+    window_size: int,
+    messages: list[tuple[str, str, str, str]],
+    ttl_seconds: int = 3600,
+) -> None:
+    """`append_messages` on a `redis.asyncio` client (async request path)."""
+
+    if not messages:
+        return
+
+    pipe = client.pipeline()
+    _queue_appends(pipe, window_size, messages, ttl_seconds)
+    await pipe.execute()
+
+
+def _queue_appends(pipe: Any, window_size: int, messages: list[tuple[str, str, str, str]], ttl_seconds: int) -> None:
+    payloads: dict[str, list[str]] = {}
+    for namespace, session_id, role, text in messages:
+        payloads.setdefault(_key(namespace, session_id), []).append(json.dumps({"role": role, "text": text}))
+
+    for k, items in payloads.items():
+        pipe.lpush(k, *items)
+        pipe.ltrim(k, 0, window_size - 1)
+        pipe.expire(k, ttl_seconds)
+
+
 def get_window(l1: L1Redis, namespace: str, session_id: str) -> list[dict[str, str]]:
     k = _key(namespace, session_id)
-    items = l1.client.lrange(k, 0, l1.window_size - 1)
+    return _parse_window(l1.client.lrange(k, 0, l1.window_size - 1))
+
+
+async def get_window_async(client: redis.asyncio.Redis, window_size: int, namespace: str, session_id: str) -> list[dict[str, str]]:
+    return _parse_window(await client.lrange(_key(namespace, session_id), 0, window_size - 1))
+
+
+def _parse_window(items: list[str]) -> list[dict[str, str]]:
     # lpush makes newest first; reverse to chronological
     out: list[dict[str, str]] = []
     for raw in reversed(items):
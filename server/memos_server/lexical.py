@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import defaultdict
+
+
+# Lexical (full-text) side of L2 retrieval.
+#
+# Tokenizer: lowercase ASCII words plus CJK character unigrams and bigrams. CJK text has no
+# spaces, so a word regex either drops it (`[a-z0-9_]+`) or keeps whole sentences as one
+# token; overlapping bigrams are the usual dictionary-free compromise (unigrams keep
+# single-character queries matchable).
+#
+# Index: `memories.lexical` is a `tsvector` built from *our* tokens (a quoted lexeme list cast
+# to tsvector), not from `to_tsvector()`, whose parser does not segment CJK. Queries use the
+# same tokenizer, OR-ed into a `tsquery`, ranked with `ts_rank` (length-normalized TF).
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+|[㐀-䶿一-鿿豈-﫿]+")
+_CJK_START = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+
+# tsvector limits: lexeme < 2 KiB, positions 1..16383.
+_MAX_LEXEME_BYTES = 2046
+_MAX_POSITION = 16383
+# Keeps the tsquery (and its GIN probes) bounded for long queries.
+_MAX_QUERY_TERMS = 64
+
+
+def tokenize(text_value: str) -> list[str]:
+    """Tokens in text order (repeats kept): words, then each CJK run's unigrams and bigrams."""
+
+    out: list[str] = []
+    for run in _TOKEN_RE.findall(text_value.lower()):
+        if _CJK_START.match(run):
+            out.extend(run)
+            out.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            out.append(run)
+    return out
+
+
+def token_set(text_value: str) -> set[str]:
+    return set(tokenize(text_value))
+
+
+def token_hashes(text_value: str) -> list[int]:
+    """Sorted distinct signed 32-bit token hashes (`memories.token_hashes`, rerank overlap).
+
+    Stored at ingest so rerank never re-tokenizes candidate texts; 32-bit collisions only
+    ever inflate the overlap feature, and are rare at message-sized vocabularies.
+    """
+
+    return sorted({_hash32(t) for t in tokenize(text_value)})
+
+
+def _hash32(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "big", signed=True)
+
+
+def _quote(lexeme: str) -> str:
+    return "'" + lexeme.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def tsvector_literal(text_value: str) -> str:
+    """`'tok':1,4 'other':2 ...` for `CAST(... AS tsvector)` (positions feed `ts_rank`)."""
+
+    positions: dict[str, list[int]] = defaultdict(list)
+    for pos, tok in enumerate(tokenize(text_value), start=1):
+        if len(tok.encode("utf-8")) > _MAX_LEXEME_BYTES:
+            continue
+        positions[tok].append(min(pos, _MAX_POSITION))
+    return " ".join(f"{_quote(tok)}:{','.join(map(str, sorted(set(p))))}" for tok, p in positions.items())
+
+
+def tsquery_literal(text_value: str) -> str | None:
+    """OR query over the distinct query tokens, or None when nothing is searchable."""
+
+    terms = list(dict.fromkeys(tokenize(text_value)))[:_MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return " | ".join(_quote(t) for t in terms)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+
+# Single-pass line classifier for memory cards.
+#
+# Each cleaned transcript line is assigned to all of its buckets with three compiled scans:
+# - actions: one anchored alternation of command prefixes (`docker ...`, `git ...`)
+# - directives: one anchored alternation of every directive rule ("事实：", "我希望...", ...);
+#   alternatives keep the old rule priority, the first matching rule wins
+# - keywords: one alternation of every anchor/marker keyword, searched over the lowercased
+#   line (overlapping occurrences included); marker and anchor rules are then decided from
+#   the set of keywords hit, looking only at rules that mention a hit keyword
+#
+# The default rule table reproduces the previous hand-written checks. Deployments can extend
+# it with a JSON file (`MEMOS_CARD_RULES_PATH`), see `load_rules`.
+
+_SPLIT_CLAUSES_RE = re.compile(r"[；;]\s*")
+
+
+def split_clauses(text: str) -> list[str]:
+    value = (text or "").strip()
+    if not value:
+        return []
+    parts = [p.strip() for p in _SPLIT_CLAUSES_RE.split(value)]
+    return [p for p in parts if p]
+
+
+BUCKETS = ("facts", "preferences", "constraints", "decisions", "risks", "actions")
+
+
+@dataclass(frozen=True)
+class Keyword:
+    text: str
+    ignore_case: bool = True
+
+
+@dataclass(frozen=True)
+class KeywordRule:
+    """Fires when every group has at least one keyword in the line.
+
+    `item=None` puts the line itself into `bucket` (markers such as "踩坑"); otherwise the
+    fixed `item` (anchors such as "postgres port 5432").
+    """
+
+    bucket: str
+    groups: tuple[tuple[Keyword, ...], ...]
+    item: str | None = None
+
+
+@dataclass(frozen=True)
+class DirectiveRule:
+    """`split`: `prefix[:：] body`, body split into clauses; `line`: the whole line."""
+
+    bucket: str
+    prefix: str
+    kind: str = "line"
+    # Regex after the prefix for `line` rules (the line must match prefix + rest entirely).
+    rest: str = ".+"
+
+
+@dataclass(frozen=True)
+class Rules:
+    actions: tuple[str, ...]
+    directives: tuple[DirectiveRule, ...]
+    # Markers are emitted before directives, anchors after them (old bucket order).
+    markers: tuple[KeywordRule, ...]
+    anchors: tuple[KeywordRule, ...]
+
+
+def _kw(*texts: str, ignore_case: bool = True) -> tuple[Keyword, ...]:
+    return tuple(Keyword(t, ignore_case) for t in texts)
+
+
+DEFAULT_RULES = Rules(
+    actions=("docker", "git", "npm", "pnpm", "yarn", "python", "pip", "uvicorn", "curl"),
+    directives=(
+        DirectiveRule("facts", r"(?:事实)", "split"),
+        DirectiveRule("preferences", r"(?:我的偏好|偏好|我希望|我倾向于|我更喜欢|希望能|希望)", "split"),
+        DirectiveRule("preferences", r"(?:我希望|我倾向于|我更喜欢|希望能|希望)"),
+        DirectiveRule("constraints", r"(?:约束|限制)", "split"),
+        DirectiveRule("decisions", r"(?:决策|决定|选择|我选)", "split"),
+        DirectiveRule("decisions", r"(?:我选[AB]|我选择)"),
+        # Fallback: only treat a line as a constraint when it *starts* with a modal.
+        DirectiveRule("constraints", r"(?:必须|不要|不能|不许|禁止|保留)", rest=".*"),
+    ),
+    markers=(KeywordRule("risks", (_kw("踩坑", "坑：", "pitfall", "gotcha", ignore_case=False),)),),
+    anchors=(
+        KeywordRule("facts", (_kw("/v1/", ignore_case=False),), "API uses versioned prefix (/v1/*)"),
+        KeywordRule("facts", (_kw("postgres"), _kw("5432")), "postgres port 5432"),
+        KeywordRule("facts", (_kw("redis"), _kw("6379")), "redis port 6379"),
+        KeywordRule("facts", (_kw("uvicorn", "memos_server.app", "api"), _kw("8000")), "api port 8000"),
+        KeywordRule("facts", (_kw("npm", "vite"), _kw("3000")), "web port 3000"),
+        KeywordRule(
+            "facts",
+            (_kw("memos"), _kw("我们在做") + _kw("MemOS", ignore_case=False)),
+            "Project: MemOS (agent memory / context governance)",
+        ),
+        KeywordRule("facts", (_kw("pgvector"),), "L2 uses Postgres + pgvector for vector search"),
+        KeywordRule("facts", (_kw("rq", "worker"),), "Async worker processes background jobs (RQ)"),
+    ),
+)
+
+
+@dataclass
+class LineClassifier:
+    rules: Rules = DEFAULT_RULES
+    _keywords: list[Keyword] = field(default_factory=list, repr=False)
+
+    def __post_init__(self) -> None:
+        rules = self.rules
+        self._action_re = re.compile(r"^(?:" + "|".join(re.escape(a) for a in rules.actions) + r")\b")
+
+        parts = []
+        for i, rule in enumerate(rules.directives):
+            if rule.kind == "split":
+                parts.append(f"(?P<d{i}>{rule.prefix}[:：]\\s*(?P<b{i}>.+))")
+            else:
+                parts.append(f"(?P<d{i}>{rule.prefix}{rule.rest})")
+        self._directive_re = re.compile("^(?:" + "|".join(parts) + ")$") if parts else None
+
+        keyword_rules = list(rules.markers) + list(rules.anchors)
+        index: dict[Keyword, int] = {}
+        for rule in keyword_rules:
+            for group in rule.groups:
+                for kw in group:
+                    index.setdefault(kw, len(index))
+        self._keywords = list(index)
+        # Keyword id -> rules (markers first) that mention it; rule -> group keyword-id sets.
+        self._rules_by_kw: dict[int, list[int]] = {}
+        self._rule_groups: list[list[set[int]]] = []
+        for r, rule in enumerate(keyword_rules):
+            groups = [{index[kw] for kw in group} for group in rule.groups]
+            self._rule_groups.append(groups)
+            for kw_id in set().union(*groups):
+                self._rules_by_kw.setdefault(kw_id, []).append(r)
+        self._keyword_rules = keyword_rules
+        self._n_markers = len(rules.markers)
+
+        # One alternation over the lowercased keyword texts, longest first: each search returns
+        # the longest keyword at the leftmost start position; the next search starts one
+        # character later, so overlapping occurrences are found too, and other keywords that
+        # start at the same position are recovered from `_expand`. Case-sensitive keywords
+        # are confirmed against the original line.
+        by_text: dict[str, list[int]] = {}
+        for i, kw in enumerate(self._keywords):
+            by_text.setdefault(kw.text.lower(), []).append(i)
+        texts = sorted(by_text, key=len, reverse=True)
+        self._keyword_re = re.compile("|".join(re.escape(t) for t in texts)) if texts else None
+        # Matched text -> (keyword id, text to confirm in the original line or None).
+        self._expand = {
+            t: tuple(
+                (i, None if self._keywords[i].ignore_case else self._keywords[i].text)
+                for o in [t, *(o for o in texts if o != t and t.startswith(o))]
+                for i in by_text[o]
+            )
+            for t in texts
+        }
+        # Hit set -> (marker items, anchor items); `None` item = the line itself.
+        self._fired: dict[frozenset[int], tuple[tuple[tuple[str, str | None], ...], ...]] = {}
+
+    def _keyword_hits(self, line: str) -> frozenset[int]:
+        if self._keyword_re is None:
+            return frozenset()
+        low = line.lower()
+        # `lower()` keeps positions unless a character expands (rare): then confirm by search.
+        aligned = len(low) == len(line)
+        search = self._keyword_re.search
+        hits: set[int] = set()
+        m = search(low)
+        while m is not None:
+            start = m.start()
+            for i, confirm in self._expand[m.group()]:
+                if confirm is None or (line.startswith(confirm, start) if aligned else confirm in line):
+                    hits.add(i)
+            m = search(low, start + 1)
+        return frozenset(hits)
+
+    def _rules_fired(self, hits: frozenset[int]) -> tuple[tuple[tuple[str, str | None], ...], ...]:
+        fired = self._fired.get(hits)
+        if fired is None:
+            candidates = sorted({r for kw_id in hits for r in self._rules_by_kw[kw_id]})
+            rules = [r for r in candidates if all(group & hits for group in self._rule_groups[r])]
+            fired = tuple(
+                tuple((self._keyword_rules[r].bucket, self._keyword_rules[r].item) for r in rules if marker == (r < self._n_markers))
+                for marker in (True, False)
+            )
+            if len(self._fired) >= 4096:
+                self._fired.clear()
+            self._fired[hits] = fired
+        return fired
+
+    def directive(self, line: str) -> tuple[str, list[str]] | None:
+        if self._directive_re is None:
+            return None
+        m = self._directive_re.match(line)
+        if not m:
+            return None
+        i = int(m.lastgroup[1:])  # type: ignore[index]
+        rule = self.rules.directives[i]
+        return rule.bucket, (split_clauses(m.group(f"b{i}")) if rule.kind == "split" else [line])
+
+    def classify(self, line: str) -> list[tuple[str, str]]:
+        """(bucket, item) pairs of one cleaned line, in bucket-stable order."""
+
+        items: list[tuple[str, str]] = []
+        action = line.strip("`").strip() if line.startswith("`") and line.endswith("`") else line
+        if self._action_re.match(action):
+            items.append(("actions", action))
+
+        hits = self._keyword_hits(line)
+        markers, anchors = self._rules_fired(hits) if hits else ((), ())
+        for bucket, item in markers:
+            items.append((bucket, line if item is None else item))
+        found = self.directive(line)
+        if found:
+            items.extend((found[0], item) for item in found[1])
+        for bucket, item in anchors:
+            items.append((bucket, line if item is None else item))
+        return items
+
+
+def _keywords(raw: Any, ignore_case: bool) -> tuple[Keyword, ...]:
+    out = []
+    for kw in raw:
+        if isinstance(kw, dict):
+            out.append(Keyword(str(kw["text"]), bool(kw.get("ignore_case", ignore_case))))
+        else:
+            out.append(Keyword(str(kw), ignore_case))
+    return tuple(out)
+
+
+def _keyword_rule(raw: dict[str, Any]) -> KeywordRule:
+    ignore_case = bool(raw.get("ignore_case", True))
+    if "all" in raw:
+        groups = tuple(_keywords(group, ignore_case) for group in raw["all"])
+    else:
+        groups = (_keywords(raw["any"], ignore_case),)
+    return KeywordRule(str(raw["bucket"]), groups, raw.get("item"))
+
+
+def load_rules(path: str | Path, base: Rules = DEFAULT_RULES) -> Rules:
+    """Extend `base` with the rules of a JSON file; every section is optional:
+
+        {
+          "actions": ["kubectl", "helm"],
+          "directives": [{"bucket": "decisions", "prefix": "(?:定了)", "kind": "split"}],
+          "markers": [{"bucket": "risks", "any": ["注意："], "ignore_case": false}],
+          "anchors": [{"bucket": "facts", "item": "kafka port 9092", "all": [["kafka"], ["9092"]]}]
+        }
+
+    Keywords are strings or `{"text": ..., "ignore_case": ...}`. New directives are tried after
+    the built-in ones.
+    """
+
+    raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    for section in ("directives", "markers", "anchors"):
+        for rule in raw.get(section, []):
+            if rule.get("bucket") not in BUCKETS:
+                raise ValueError(f"{path}: unknown bucket {rule.get('bucket')!r} in {section}; expected one of {BUCKETS}")
+    return Rules(
+        actions=base.actions + tuple(str(a) for a in raw.get("actions", [])),
+        directives=base.directives
+        + tuple(
+            DirectiveRule(str(d["bucket"]), str(d["prefix"]), str(d.get("kind", "line")), str(d.get("rest", ".+")))
+            for d in raw.get("directives", [])
+        ),
+        markers=base.markers + tuple(_keyword_rule(r) for r in raw.get("markers", [])),
+        anchors=base.anchors + tuple(_keyword_rule(r) for r in raw.get("anchors", [])),
+    )
+
+
+@lru_cache(maxsize=1)
+def default_classifier() -> LineClassifier:
+    """Process-wide classifier: built-in rules plus `MEMOS_CARD_RULES_PATH`, if set."""
+
+    from memos_server.settings import get_settings
+
+    path = get_settings().card_rules_path
+    return LineClassifier(load_rules(path) if path else DEFAULT_RULES)
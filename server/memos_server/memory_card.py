@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+
+from memos_server.line_classifier import default_classifier
+
+
+# Incremental memory-card engine.
+#
+# A card is folded forward one batch of messages at a time: only the new lines are scanned and
+# their items are merged into the previous card's buckets (keyed dedup, first seen wins, fixed
+# bucket sizes). Every extraction rule is line-local, and the text-wide signals (CORS symptom,
+# connection refused, localhost, transcript size) are kept as card state, so folding a
+# transcript in any number of batches yields the same card as folding it at once.
+#
+# Text-wide state lives under `merge_state`; `card_to_plain_text` and the UI ignore it.
+# Line rules (actions, markers, directives, fact anchors) live in `line_classifier.py`.
+#
+# A batch is folded from its `TranscriptScan` (buckets, signals, length, head). Ingest stores
+# each memory's scan (`memory_buckets`, `memories.buckets`), so condensation can fold stored
+# scans without reading or re-classifying the message text.
+
+CARD_SCHEMA = "memos.memory_card.v2"
+_KNOWN_SCHEMAS = ("memos.memory_card.v1", CARD_SCHEMA)
+
+BUCKET_LIMITS = {"facts": 8, "preferences": 6, "constraints": 6, "decisions": 6, "risks": 8, "actions": 20}
+
+# Transcripts longer than this keep a short excerpt of their beginning.
+_EXCERPT_MIN_CHARS = 800
+EXCERPT_CHARS = 180
+
+_L2_PREFIX_RE = re.compile(r"^\[L2 score=[-\d.]+\]\s*")
+_ROLE_PREFIX_RE = re.compile(r"^\[(user|agent|system|tool)\]\s*")
+
+_RISK_CORS_BACKEND = "CORS-like symptom masking backend error (e.g. DB auth / 500)"
+_RISK_CORS_HEADER = "CORS header/config mismatch"
+_RISK_REFUSED = "DB/Redis connection refused"
+_RISK_LOCALHOST = "Container vs host networking mismatch (localhost)"
+_SIGNAL_RISKS = (_RISK_CORS_BACKEND, _RISK_CORS_HEADER, _RISK_REFUSED, _RISK_LOCALHOST)
+
+# Signal -> substrings (lowercased text) that raise it.
+_SIGNALS = {
+    "cors": ("cors",),
+    "backend_error": ("password authentication failed", "500"),
+    "cors_header": ("access-control-allow-origin", "access-control-allow-headers"),
+    "refused": ("connection refused", "could not connect"),
+    "localhost": ("localhost", "127.0.0.1"),
+}
+
+
+def clean_line(line: str) -> str:
+    s = line.strip()
+    if not s or s.startswith("[L1]"):
+        return ""
+    s = _L2_PREFIX_RE.sub("", s)
+    s = _ROLE_PREFIX_RE.sub("", s)
+    return s.strip()
+
+
+@dataclass(frozen=True)
+class TranscriptScan:
+    """What a transcript contributes to a card; enough to fold it without the text."""
+
+    chars: int
+    head: str
+    # Per bucket: items first seen first, deduplicated, at most the bucket limit (an item past
+    # the limit can never enter a card: the limit-many items before it fill it first).
+    buckets: dict[str, list[str]]
+    signals: frozenset[str] = frozenset()
+
+
+def scan(transcript: str) -> TranscriptScan:
+    lowered = transcript.lower()
+    signals = frozenset(signal for signal, needles in _SIGNALS.items() if any(n in lowered for n in needles))
+
+    buckets: dict[str, list[str]] = {name: [] for name in BUCKET_LIMITS}
+    seen: dict[str, set[str]] = {name: set() for name in BUCKET_LIMITS}
+    classifier = default_classifier()
+    for line in transcript.splitlines():
+        s = clean_line(line)
+        if not s:
+            continue
+        for bucket, item in classifier.classify(s):
+            key = item.strip()
+            if key and key not in seen[bucket] and len(buckets[bucket]) < BUCKET_LIMITS[bucket]:
+                seen[bucket].add(key)
+                buckets[bucket].append(key)
+    return TranscriptScan(chars=len(transcript), head=transcript[:EXCERPT_CHARS], buckets=buckets, signals=signals)
+
+
+def memory_line(role: str, text: str) -> str:
+    """A message as one transcript entry (messages are joined by newlines)."""
+
+    return f"[{role}] {text}"
+
+
+def memory_buckets(role: str, text: str) -> dict[str, list[str]]:
+    """Ingest-time enrichment stored in `memories.buckets`: the message's non-empty buckets
+    plus its `signals`."""
+
+    found = scan(memory_line(role, text))
+    out = {name: items for name, items in found.buckets.items() if items}
+    if found.signals:
+        out["signals"] = sorted(found.signals)
+    return out
+
+
+def joined_scan(lines: list[tuple[str, int, str]], buckets: dict[str, list[str]]) -> TranscriptScan:
+    """The scan of messages joined as a transcript, from per-message `(role, text length, text
+    head)` and their aggregated buckets (`signals` included, see `memory_buckets`)."""
+
+    head = "\n".join(memory_line(role, part) for role, _, part in lines)[:EXCERPT_CHARS]
+    chars = sum(len(memory_line(role, "")) + n for role, n, _ in lines) + max(0, len(lines) - 1)
+    return TranscriptScan(
+        chars=chars,
+        head=head,
+        buckets={name: items for name, items in buckets.items() if name in BUCKET_LIMITS},
+        signals=frozenset(buckets.get("signals", ())),
+    )
+
+
+@dataclass
+class MemoryCard:
+    buckets: dict[str, list[str]] = field(default_factory=lambda: {name: [] for name in BUCKET_LIMITS})
+    signals: set[str] = field(default_factory=set)
+    # Transcript length so far and its first `EXCERPT_CHARS` characters.
+    source_chars: int = 0
+    head: str = ""
+    _seen: dict[str, set[str]] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_json(cls, card_json: str) -> MemoryCard | None:
+        """Rebuild the merge state of a stored card; None if `card_json` is not a card."""
+
+        try:
+            obj = json.loads(card_json)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(obj, dict) or obj.get("schema") not in _KNOWN_SCHEMAS:
+            return None
+
+        card = cls()
+        state = obj.get("merge_state")
+        for name in BUCKET_LIMITS:
+            items = obj.get(name)
+            if not isinstance(items, list):
+                continue
+            if name == "risks" and isinstance(state, dict):
+                # Signal risks are re-derived from `signals` when rendering.
+                items = [x for x in items if x not in _SIGNAL_RISKS]
+            for item in items:
+                card._add(name, str(item))
+        if isinstance(state, dict):
+            card.signals = {str(s) for s in state.get("signals") or []}
+            card.source_chars = int(state.get("source_chars") or 0)
+            card.head = str(state.get("head") or "")
+        elif obj.get("raw_excerpt"):
+            # Cards written before incremental merging: keep their excerpt as it was.
+            card.head = str(obj["raw_excerpt"]).removesuffix("...")
+            card.source_chars = _EXCERPT_MIN_CHARS + 1
+        return card
+
+    def _add(self, bucket: str, item: str) -> None:
+        key = item.strip()
+        items = self.buckets[bucket]
+        if not key or len(items) >= BUCKET_LIMITS[bucket]:
+            return
+        seen = self._seen.setdefault(bucket, set(items))
+        if key in seen:
+            return
+        seen.add(key)
+        items.append(key)
+
+    def fold(self, transcript: str) -> None:
+        """Merge one more piece of transcript (batches are joined by newlines)."""
+
+        if not transcript.strip():
+            return
+        self.fold_scan(scan(transcript if self.source_chars else transcript.lstrip()))
+
+    def fold_scan(self, found: TranscriptScan) -> None:
+        if self.source_chars:
+            self.source_chars += 1
+            if len(self.head) < EXCERPT_CHARS:
+                self.head = (self.head + "\n" + found.head)[:EXCERPT_CHARS]
+        else:
+            self.head = found.head
+        self.source_chars += found.chars
+        self.signals.update(found.signals)
+        for name in BUCKET_LIMITS:
+            for item in found.buckets.get(name, ()):
+                self._add(name, item)
+
+    def _signal_risks(self) -> list[str]:
+        risks: list[str] = []
+        if "cors" in self.signals:
+            if "backend_error" in self.signals:
+                risks.append(_RISK_CORS_BACKEND)
+            elif "cors_header" in self.signals:
+                risks.append(_RISK_CORS_HEADER)
+        if "refused" in self.signals:
+            risks.append(_RISK_REFUSED)
+        if "localhost" in self.signals:
+            risks.append(_RISK_LOCALHOST)
+        return risks
+
+    def to_json(self) -> str:
+        risks = self.buckets["risks"] + [r for r in self._signal_risks() if r not in self.buckets["risks"]]
+        card: dict[str, object] = {
+            "schema": CARD_SCHEMA,
+            "facts": self.buckets["facts"],
+            "preferences": self.buckets["preferences"],
+            "constraints": self.buckets["constraints"],
+            "decisions": self.buckets["decisions"],
+            "risks": risks,
+            "actions": self.buckets["actions"],
+            # Backwards-compatible aliases for older UI / stored rows.
+            "pitfalls": risks,
+            "commands": self.buckets["actions"],
+        }
+        # Avoid inflating size: only keep a tiny excerpt when raw context is large.
+        if self.source_chars > _EXCERPT_MIN_CHARS:
+            card["raw_excerpt"] = self.head.rstrip() + "..."
+        card["merge_state"] = {"signals": sorted(self.signals), "source_chars": self.source_chars, "head": self.head}
+        # Keep output compact and readable in DB (no ASCII escaping).
+        return json.dumps(card, ensure_ascii=False, separators=(",", ":"))
+
+
+def merge_card(prev_summary: str | None, transcript: str | TranscriptScan) -> str:
+    """Fold `transcript` (or its scan) into the previous summary; a summary that is not a card
+    (legacy plain text) is folded in as transcript first."""
+
+    card = MemoryCard.from_json(prev_summary) if prev_summary else None
+    if card is None:
+        card = MemoryCard()
+        if prev_summary:
+            card.fold(prev_summary)
+    if isinstance(transcript, TranscriptScan):
+        card.fold_scan(transcript)
+    else:
+        card.fold(transcript)
+    return card.to_json()
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from memos_server.audit import insert_audit_rows
+from memos_server.db import Db, bulk_insert
+from memos_server.write_behind import utc_now_iso
+
+
+# Query-path persistence (context packs + their audit events).
+#
+# Modes (MEMOS_PERSISTENCE_MODE):
+# - "sync": written in the request transaction before responding (default; strongest)
+# - "async": handed to a bounded in-process queue; a background thread batch-inserts them.
+#   Ids are assigned up front, so the response's `context_pack_id` resolves via
+#   `/v1/ops/context_packs` once the next batch commits (typically < flush interval).
+# - "sampled": like async, but only a sample of context packs is kept (QUERY audits always).
+#
+# A full queue never drops work: the request writes synchronously instead (backpressure).
+# Packs still queued when the process dies are lost; use "sync" where that matters.
+
+MODE_SYNC = "sync"
+MODE_ASYNC = "async"
+MODE_SAMPLED = "sampled"
+
+_MAX_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class PersistenceStats:
+    mode: str
+    queued: int = 0
+    written_packs: int = 0
+    written_audits: int = 0
+    batches: int = 0
+    sync_fallbacks: int = 0
+    failed_batches: int = 0
+    last_batch_ms: float = 0.0
+
+
+def context_pack_row(
+    namespace: str,
+    session_id: str,
+    query_text: str,
+    pack: dict[str, Any],
+    *,
+    session_summary_id: str | None,
+    retrieved_memory_ids: list[str],
+    context_pack_id: str | None = None,
+) -> dict[str, object]:
+    """Build one `context_packs` row (pack serialized for a jsonb cast)."""
+
+    return {
+        "id": context_pack_id or str(uuid.uuid4()),
+        "namespace": namespace,
+        "session_id": session_id,
+        "query_text": query_text,
+        "session_summary_id": session_summary_id,
+        "retrieved_memory_ids": list(retrieved_memory_ids),
+        "pack": json.dumps(pack, ensure_ascii=False),
+    }
+
+
+def insert_context_packs(session: Session, rows: list[dict[str, object]]) -> int:
+    return bulk_insert(
+        session,
+        "context_packs",
+        rows,
+        casts={
+            "session_summary_id": "uuid",
+            "retrieved_memory_ids": "uuid[]",
+            "pack": "jsonb",
+            "created_at": "timestamptz",
+        },
+    )
+
+
+def write_now(session: Session, packs: list[dict[str, object]], audits: list[dict[str, object]]) -> None:
+    """Synchronous path: insert into the caller's transaction (caller commits)."""
+
+    insert_context_packs(session, packs)
+    insert_audit_rows(session, audits)
+
+
+class PersistenceWriter:
+    """Bounded queue + one background thread that batch-inserts packs and audits."""
+
+    def __init__(self, db: Db, *, mode: str, max_queue: int, batch_size: int, flush_interval_ms: int) -> None:
+        self.db = db
+        self.mode = mode
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_s = max(1, int(flush_interval_ms)) / 1000.0
+        self._queue: queue.Queue[tuple[list[dict[str, object]], list[dict[str, object]]]] = queue.Queue(
+            maxsize=max(1, int(max_queue))
+        )
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._written_packs = 0
+        self._written_audits = 0
+        self._batches = 0
+        self._sync_fallbacks = 0
+        self._failed_batches = 0
+        self._last_batch_ms = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="memos-persistence", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop after draining the queue (best effort within `timeout`)."""
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def submit(self, session: Session, packs: list[dict[str, object]], audits: list[dict[str, object]]) -> None:
+        """Queue rows for the writer; on a full queue, write them in `session` (caller commits)."""
+
+        # Stamp accept time so rows keep request order even though they are written later.
+        now = utc_now_iso()
+        packs = [dict(p) | {"created_at": now} for p in packs]
+        audits = [dict(a) | {"created_at": now} for a in audits]
+        try:
+            self._queue.put_nowait((packs, audits))
+        except queue.Full:
+            with self._lock:
+                self._sync_fallbacks += 1
+            write_now(session, packs, audits)
+
+    def _run(self) -> None:
+        while True:
+            packs: list[dict[str, object]] = []
+            audits: list[dict[str, object]] = []
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(packs) + len(audits) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    p, a = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                packs.extend(p)
+                audits.extend(a)
+            if packs or audits:
+                self._write_batch(packs, audits)
+            elif self._stop.is_set():
+                return
+
+    def _write_batch(self, packs: list[dict[str, object]], audits: list[dict[str, object]]) -> None:
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            started = time.perf_counter()
+            try:
+                with Session(self.db.engine) as session:
+                    write_now(session, packs, audits)
+                    session.commit()
+            except Exception as exc:
+                print(
+                    f"[persistence] batch failed attempt={attempt} packs={len(packs)} audits={len(audits)}: "
+                    f"{type(exc).__name__}: {exc}"
+                )
+                if attempt < _MAX_ATTEMPTS:
+                    time.sleep(0.2 * attempt)
+                    continue
+                with self._lock:
+                    self._failed_batches += 1
+                return
+            with self._lock:
+                self._written_packs += len(packs)
+                self._written_audits += len(audits)
+                self._batches += 1
+                self._last_batch_ms = (time.perf_counter() - started) * 1000.0
+            return
+
+    def stats(self) -> PersistenceStats:
+        with self._lock:
+            return PersistenceStats(
+                mode=self.mode,
+                queued=self._queue.qsize(),
+                written_packs=self._written_packs,
+                written_audits=self._written_audits,
+                batches=self._batches,
+                sync_fallbacks=self._sync_fallbacks,
+                failed_batches=self._failed_batches,
+                last_batch_ms=round(self._last_batch_ms, 3),
+            )
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Shared process pools for CPU-bound fan-out (`embedding.ParallelEmbeddingProvider`,
+# `condensation.condense_many`).
+#
+# One pool per name, created on first use and kept for the life of the process. Asking for a
+# different worker count replaces the pool; the old one is shut down first (without waiting
+# for running tasks) so its processes don't leak.
+#
+# `spawn`: pool workers don't inherit the parent's threads, sockets or DB/Redis connections
+# (and it works on Windows).
+
+_POOLS: dict[str, tuple[int, ProcessPoolExecutor]] = {}
+_LOCK = threading.Lock()
+
+
+def get_process_pool(name: str, workers: int) -> ProcessPoolExecutor:
+    """The `name` pool with `workers` processes (replacing one of another size)."""
+
+    with _LOCK:
+        current = _POOLS.get(name)
+        if current is not None and current[0] == workers:
+            return current[1]
+        if current is not None:
+            # Tasks already submitted to the old pool still finish; its processes exit after.
+            current[1].shutdown(wait=False)
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _POOLS[name] = (workers, pool)
+        return pool
+
+
+def shutdown_process_pools() -> None:
+    """Shut every pool down (tests, process exit)."""
+
+    with _LOCK:
+        pools = [pool for _, pool in _POOLS.values()]
+        _POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Any, Iterable
+
+import redis
+import redis.asyncio
+
+
+# `/v1/query` result cache.
+#
+# Invalidation is exact, not TTL-based: every write that can change a session's query result
+# (ingest, write-behind flush, seed, reset, condensation snapshot) bumps a per-session counter,
+# and the counter value is part of the cache key. Old entries become unreachable and age out
+# via their TTL (memory bound only).
+#
+# The key also covers everything else the response depends on: normalized query text, top_k,
+# retrieval mode and a fingerprint of the retrieval/embedding configuration.
+
+_WS_RE = re.compile(r"\s+")
+
+
+def watermark_key(namespace: str, session_id: str) -> str:
+    return f"memos:session_wm:{namespace}:{session_id}"
+
+
+def bump_watermark(pipe: Any, namespace: str, session_id: str) -> None:
+    """Queue a watermark bump on a Redis client or pipeline (callers batch with their writes)."""
+
+    pipe.incr(watermark_key(namespace, session_id))
+
+
+def bump_watermarks(client: redis.Redis, sessions: Iterable[tuple[str, str]]) -> None:
+    pipe = client.pipeline(transaction=False)
+    for namespace, session_id in set(sessions):
+        bump_watermark(pipe, namespace, session_id)
+    pipe.execute()
+
+
+def normalize_query(query: str) -> str:
+    """NFC + collapsed whitespace. `/v1/query` embeds this form, so equal keys mean equal inputs."""
+
+    return _WS_RE.sub(" ", unicodedata.normalize("NFC", query)).strip()
+
+
+def config_fingerprint(parts: dict[str, object]) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(
+    namespace: str,
+    session_id: str,
+    query: str,
+    top_k: int,
+    retrieval_mode: str,
+    fingerprint: str,
+    watermark: int,
+) -> str:
+    digest = hashlib.sha256(
+        json.dumps([query, int(top_k), retrieval_mode, fingerprint], ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    return f"memos:qcache:{namespace}:{session_id}:{int(watermark)}:{digest}"
+
+
+class QueryCache:
+    """Stores serialized `QueryResponse` payloads. Redis errors degrade to cache misses.
+
+    `aclient` (optional, `redis.asyncio`) backs the `a*` methods used by the async request path.
+    `watermark`/`awatermark` return None when Redis fails: the request bypasses the cache.
+    """
+
+    def __init__(self, client: redis.Redis, ttl_seconds: int, aclient: redis.asyncio.Redis | None = None) -> None:
+        self.client = client
+        self.aclient = aclient
+        self.ttl_seconds = int(ttl_seconds)
+
+    def watermark(self, namespace: str, session_id: str) -> int | None:
+        try:
+            return int(self.client.get(watermark_key(namespace, session_id)) or 0)
+        except redis.RedisError:
+            return None
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        try:
+            raw = self.client.get(key)
+        except redis.RedisError:
+            return None
+        return json.loads(raw) if raw else None
+
+    def put(self, key: str, payload: dict[str, Any]) -> None:
+        try:
+            self.client.set(key, json.dumps(payload, ensure_ascii=False), ex=self.ttl_seconds)
+        except redis.RedisError:
+            pass
+
+    def _async_client(self) -> redis.asyncio.Redis:
+        if self.aclient is None:
+            raise RuntimeError("QueryCache was created without an async Redis client (aclient)")
+        return self.aclient
+
+    async def awatermark(self, namespace: str, session_id: str) -> int | None:
+        aclient = self._async_client()
+        try:
+            return int(await aclient.get(watermark_key(namespace, session_id)) or 0)
+        except redis.RedisError:
+            return None
+
+    async def aget(self, key: str) -> dict[str, Any] | None:
+        aclient = self._async_client()
+        try:
+            raw = await aclient.get(key)
+        except redis.RedisError:
+            return None
+        return json.loads(raw) if raw else None
+
+    async def aput(self, key: str, payload: dict[str, Any]) -> None:
+        aclient = self._async_client()
+        try:
+            await aclient.set(key, json.dumps(payload, ensure_ascii=False), ex=self.ttl_seconds)
+        except redis.RedisError:
+            pass
@@ -1,17 +1,97 @@
 from __future__ import annotations
 
+import zlib
 from dataclasses import dataclass
 
 import redis
 from rq import Queue
 
 
+# Session-affinity sharding (worker pool, `worker.py --pool`).
+#
+# With `MEMOS_CONDENSATION_SHARDS=N` (N > 1) condensation jobs are routed to `condensation:{i}`
+# with i = crc32("{namespace}:{session_id}") % N, and the pool runs one worker per shard. All
+# jobs of one session land on the same worker, in order, so per-session work is never spread
+# across processes and a busy session cannot hold up the other shards.
+#
+# The plain `condensation` queue stays the route for N == 1 and keeps draining jobs enqueued
+# before sharding was enabled (shard 0 also listens to it).
+#
+# Priority lanes: the queues above form the "bulk" lane (threshold refreshes, follow-ups,
+# catch-up and batch jobs). Bootstrap summaries of sessions an agent is querying right now go
+# to the unsharded "interactive" lane, `condensation:interactive`, which every worker drains
+# first; after `burst` interactive jobs in a row a worker takes one bulk job before returning
+# to the interactive queue, so a steady stream of bootstraps cannot starve the bulk lane
+# (`LaneOrder`).
+
+QUEUE_NAME = "condensation"
+INTERACTIVE_QUEUE_NAME = f"{QUEUE_NAME}:interactive"
+
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+
+
+def shard_index(namespace: str, session_id: str, shards: int) -> int:
+    """Stable across processes/restarts (unlike `hash()`), so API and workers agree."""
+
+    if shards <= 1:
+        return 0
+    return zlib.crc32(f"{namespace}:{session_id}".encode("utf-8")) % int(shards)
+
+
+def shard_queue_name(index: int, shards: int) -> str:
+    return QUEUE_NAME if shards <= 1 else f"{QUEUE_NAME}:{int(index)}"
+
+
 @dataclass(frozen=True)
 class Queues:
     condensation: Queue
+    # Shard queues in shard order; empty when sharding is off (everything uses `condensation`).
+    shards: tuple[Queue, ...] = ()
+    # Interactive lane; None when disabled (every job goes to the bulk lane).
+    interactive: Queue | None = None
+
+    def for_session(self, namespace: str, session_id: str) -> Queue:
+        if not self.shards:
+            return self.condensation
+        return self.shards[shard_index(namespace, session_id, len(self.shards))]
+
+    def bulk(self) -> list[Queue]:
+        return [self.condensation, *self.shards]
+
+    def all(self) -> list[Queue]:
+        """Every condensation queue a worker may consume (ops reporting)."""
+
+        return ([self.interactive] if self.interactive is not None else []) + self.bulk()
+
+
+class LaneOrder:
+    """Dequeue order of a worker listening to the interactive queue and bulk queues.
+
+    Interactive first; once `burst` interactive jobs ran in a row, the bulk queues come first
+    for one dequeue (which may still return an interactive job when the bulk lane is empty).
+    """
+
+    def __init__(self, queues: list[Queue], *, burst: int) -> None:
+        self.interactive = [q for q in queues if q.name == INTERACTIVE_QUEUE_NAME]
+        self.bulk = [q for q in queues if q.name != INTERACTIVE_QUEUE_NAME]
+        self.burst = max(1, int(burst))
+        self.streak = 0
+
+    def initial(self) -> list[Queue]:
+        return self.interactive + self.bulk
+
+    def after(self, queue_name: str) -> list[Queue]:
+        """Order for the next dequeue, given the queue the last job came from."""
+
+        self.streak = self.streak + 1 if queue_name == INTERACTIVE_QUEUE_NAME else 0
+        if self.streak >= self.burst and self.bulk:
+            self.streak = 0
+            return self.bulk + self.interactive
+        return self.interactive + self.bulk
 
 
-def create_queues(redis_url: str) -> Queues:
+def create_queues(redis_url: str, shards: int = 1, *, interactive: bool = True) -> Queues:
     """Create RQ queues.
 
     Why: we want background work (condensation) to run outside request/response.
@@ -19,4 +99,13 @@ def create_queues(redis_url: str) -> Queues:
     """
 
     conn = redis.Redis.from_url(redis_url)
-    return Queues(condensation=Queue("condensation", connection=conn, default_timeout=60))
+    shards = max(1, int(shards))
+    return Queues(
+        condensation=Queue(QUEUE_NAME, connection=conn, default_timeout=60),
+        shards=(
+            tuple(Queue(shard_queue_name(i, shards), connection=conn, default_timeout=60) for i in range(shards))
+            if shards > 1
+            else ()
+        ),
+        interactive=(Queue(INTERACTIVE_QUEUE_NAME, connection=conn, default_timeout=60) if interactive else None),
+    )
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from memos_server.lexical import tsquery_literal
+
+
+# Retrieval planner for per-session L2 search.
+#
+# Why: `/v1/query` filters on (namespace, session_id) but orders by `embedding <=> :q`.
+# - Small sessions: an exact scan over the session's rows (composite index) is cheap and
+#   always returns `top_k` rows.
+# - Large sessions: a full exact sort gets expensive, so we use the HNSW index. A global ANN
+#   index post-filters candidates, which can yield fewer than `top_k` rows; we probe
+#   iteratively (pgvector >= 0.8 iterative scans, otherwise growing `hnsw.ef_search`) and fall
+#   back to the exact scan if the session still comes up short.
+# - Hot namespaces: an in-process HNSW index (`hot_index.py`) answers first; Postgres only
+#   fetches the winning rows by primary key.
+# - Hybrid mode: vector candidates are fused with full-text candidates (`memories.lexical`)
+#   by reciprocal rank fusion, so exact keyword matches the embedding misses can be recalled.
+
+STRATEGY_EXACT = "exact_session_scan"
+STRATEGY_ANN = "ann_hnsw"
+STRATEGY_HOT = "hot_hnsw"
+
+MODE_VECTOR = "vector"
+MODE_HYBRID = "hybrid"
+
+# Candidates carry ingest-time rerank features instead of `text` (up to 20k chars per row);
+# `fetch_texts` reads text for the final top_k only.
+_CANDIDATE_COLUMNS = "id, role, token_hashes, token_estimate, text_length"
+
+_EXACT_SQL = f"""
+    WITH s AS MATERIALIZED (
+        SELECT {_CANDIDATE_COLUMNS}, embedding
+        FROM memories
+        WHERE namespace = :namespace
+          AND session_id = :session_id
+          AND embedding IS NOT NULL
+    )
+    SELECT {_CANDIDATE_COLUMNS}, 1 - (embedding <=> :q_embedding) AS score
+    FROM s
+    ORDER BY embedding <=> :q_embedding
+    LIMIT :k
+"""
+
+_ANN_SQL = f"""
+    SELECT {_CANDIDATE_COLUMNS},
+           1 - (embedding <=> :q_embedding) AS score
+    FROM memories
+    WHERE namespace = :namespace
+      AND session_id = :session_id
+      AND embedding IS NOT NULL
+    ORDER BY embedding <=> :q_embedding
+    LIMIT :k
+"""
+
+_LEXICAL_SQL = f"""
+    SELECT {_CANDIDATE_COLUMNS},
+           1 - (embedding <=> :q_embedding) AS score,
+           ts_rank(lexical, CAST(:tsquery AS tsquery), 1) AS lexical_score
+    FROM memories
+    WHERE namespace = :namespace
+      AND session_id = :session_id
+      AND lexical @@ CAST(:tsquery AS tsquery)
+    ORDER BY lexical_score DESC
+    LIMIT :k
+"""
+
+# engine url -> pgvector extension version
+_PGVECTOR_VERSIONS: dict[str, tuple[int, ...]] = {}
+
+
+@dataclass(frozen=True)
+class RetrievalPlan:
+    strategy: str
+    # Rows with embeddings in the session, capped at `exact_max_rows + 1`.
+    session_rows: int
+
+
+@dataclass
+class RetrievalResult:
+    plan: RetrievalPlan
+    rows: list[dict[str, Any]] = field(default_factory=list)
+    strategy_used: str = STRATEGY_EXACT
+    ef_search: int = 0
+    rounds: int = 0
+    iterative_scan: bool = False
+    mode: str = MODE_VECTOR
+    lexical_candidates: int = 0
+    rrf_k: int = 0
+
+    def debug(self) -> dict[str, Any]:
+        """`rerank_debug` entry describing how candidates were retrieved."""
+
+        method = f"retrieval:{self.strategy_used}"
+        components = {
+            "session_rows": float(self.plan.session_rows),
+            "candidates": float(len(self.rows)),
+            "ef_search": float(self.ef_search),
+            "rounds": float(self.rounds),
+            "iterative_scan": 1.0 if self.iterative_scan else 0.0,
+        }
+        if self.mode == MODE_HYBRID:
+            method = f"retrieval:hybrid_rrf+{self.strategy_used}"
+            components["lexical_candidates"] = float(self.lexical_candidates)
+            components["rrf_k"] = float(self.rrf_k)
+        return {"method": method, "components": components}
+
+
+def pgvector_version(session: Session) -> tuple[int, ...]:
+    key = str(session.get_bind().url)
+    cached = _PGVECTOR_VERSIONS.get(key)
+    if cached is not None:
+        return cached
+    raw = session.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+    version = tuple(int(p) for p in str(raw or "0").split(".") if p.isdigit())
+    _PGVECTOR_VERSIONS[key] = version
+    return version
+
+
+def plan_retrieval(session: Session, namespace: str, session_id: str, *, exact_max_rows: int) -> RetrievalPlan:
+    # Bounded count: stops after exact_max_rows + 1 index entries instead of counting the session.
+    n = session.execute(
+        text(
+            """
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM memories
+                WHERE namespace = :namespace
+                  AND session_id = :session_id
+                  AND embedding IS NOT NULL
+                LIMIT :cap
+            ) s
+            """
+        ),
+        {"namespace": namespace, "session_id": session_id, "cap": int(exact_max_rows) + 1},
+    ).scalar()
+    n = int(n or 0)
+    return RetrievalPlan(strategy=(STRATEGY_EXACT if n <= exact_max_rows else STRATEGY_ANN), session_rows=n)
+
+
+def _run(session: Session, sql: str, params: dict[str, Any]) -> list[dict[str, Any]]:
+    return [dict(r) for r in session.execute(text(sql), params).mappings().all()]
+
+
+def fetch_hot_hits(
+    session: Session,
+    namespace: str,
+    session_id: str,
+    hits: list[tuple[str, float]],
+    top_k: int,
+) -> RetrievalResult | None:
+    """Resolve in-process index hits `(memory_id, score)` to rows, keeping the index order.
+
+    Returns None when fewer than `top_k` hits resolve (index behind a delete, or a short
+    session), so the caller falls back to `vector_search`.
+    """
+
+    if len(hits) < top_k:
+        return None
+    found = session.execute(
+        text(
+            f"""
+            SELECT {_CANDIDATE_COLUMNS}
+            FROM memories
+            WHERE id = ANY(CAST(:ids AS uuid[]))
+              AND namespace = :namespace
+              AND session_id = :session_id
+            """
+        ),
+        {"ids": [memory_id for memory_id, _ in hits], "namespace": namespace, "session_id": session_id},
+    ).mappings().all()
+    by_id = {str(r["id"]): r for r in found}
+    rows = [dict(by_id[memory_id]) | {"id": memory_id, "score": score} for memory_id, score in hits if memory_id in by_id]
+    if len(rows) < top_k:
+        return None
+    return RetrievalResult(
+        plan=RetrievalPlan(strategy=STRATEGY_HOT, session_rows=len(hits)),
+        rows=rows[:top_k],
+        strategy_used=STRATEGY_HOT,
+        rounds=1,
+    )
+
+
+def vector_search(
+    session: Session,
+    namespace: str,
+    session_id: str,
+    q_embedding: np.ndarray,
+    top_k: int,
+    *,
+    exact_max_rows: int,
+    ef_search: int,
+    max_ef_search: int,
+) -> RetrievalResult:
+    """Plan and run the per-session L2 search. Rows: candidate columns + score (best first)."""
+
+    plan = plan_retrieval(session, namespace, session_id, exact_max_rows=exact_max_rows)
+    params = {"q_embedding": q_embedding, "namespace": namespace, "session_id": session_id, "k": int(top_k)}
+    result = RetrievalResult(plan=plan)
+
+    if plan.strategy == STRATEGY_ANN:
+        # SET LOCAL semantics (is_local=true): settings end with the request's transaction.
+        if pgvector_version(session) >= (0, 8):
+            session.execute(text("SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true)"))
+            result.iterative_scan = True
+
+        ef = max(int(ef_search), int(top_k))
+        while True:
+            session.execute(text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(ef)})
+            result.rows = _run(session, _ANN_SQL, params)
+            result.rounds += 1
+            result.ef_search = ef
+            result.strategy_used = STRATEGY_ANN
+            if len(result.rows) >= top_k or ef >= max_ef_search:
+                break
+            ef = min(ef * 2, int(max_ef_search))
+
+        if len(result.rows) >= top_k:
+            # relaxed_order may return slightly out-of-order rows.
+            result.rows.sort(key=lambda r: float(r["score"] or 0.0), reverse=True)
+            return result
+
+    result.rows = _run(session, _EXACT_SQL, params)
+    result.strategy_used = STRATEGY_EXACT
+    result.rounds += 1
+    return result
+
+
+def lexical_search(
+    session: Session,
+    namespace: str,
+    session_id: str,
+    query_text: str,
+    q_embedding: np.ndarray,
+    k: int,
+) -> list[dict[str, Any]]:
+    """Full-text candidates (GIN on `memories.lexical`). Rows: candidate columns + score, lexical_score."""
+
+    tsquery = tsquery_literal(query_text)
+    if tsquery is None:
+        return []
+    params = {
+        "tsquery": tsquery,
+        "q_embedding": q_embedding,
+        "namespace": namespace,
+        "session_id": session_id,
+        "k": int(k),
+    }
+    return _run(session, _LEXICAL_SQL, params)
+
+
+def rrf_fuse(ranked_lists: list[list[dict[str, Any]]], top_k: int, *, rrf_k: int = 60) -> list[dict[str, Any]]:
+    """Reciprocal rank fusion: score(d) = sum(1 / (rrf_k + rank)). Ties keep first-seen order."""
+
+    fused: dict[str, float] = {}
+    rows: dict[str, dict[str, Any]] = {}
+    for ranked in ranked_lists:
+        for rank, row in enumerate(ranked, start=1):
+            key = str(row["id"])
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            rows.setdefault(key, dict(row))
+    order = sorted(fused, key=lambda key: fused[key], reverse=True)[:top_k]
+    return [rows[key] | {"rrf_score": fused[key]} for key in order]
+
+
+def hybrid_search(
+    session: Session,
+    vector_result: RetrievalResult,
+    namespace: str,
+    session_id: str,
+    query_text: str,
+    q_embedding: np.ndarray,
+    top_k: int,
+    *,
+    candidates: int,
+    rrf_k: int = 60,
+) -> RetrievalResult:
+    """Fuse `vector_result` (fetched with `candidates` rows) with full-text candidates."""
+
+    lexical_rows = lexical_search(session, namespace, session_id, query_text, q_embedding, candidates)
+    vector_result.rows = rrf_fuse([vector_result.rows, lexical_rows], top_k, rrf_k=rrf_k)
+    vector_result.mode = MODE_HYBRID
+    vector_result.lexical_candidates = len(lexical_rows)
+    vector_result.rrf_k = int(rrf_k)
+    return vector_result
+
+
+def fetch_texts(session: Session, memory_ids: list[str]) -> dict[str, str]:
+    """`text` for the final chunks only (one primary-key lookup)."""
+
+    if not memory_ids:
+        return {}
+    found = session.execute(
+        text("SELECT id, text FROM memories WHERE id = ANY(CAST(:ids AS uuid[]))"),
+        {"ids": [str(i) for i in memory_ids]},
+    ).mappings().all()
+    return {str(r["id"]): str(r["text"]) for r in found}
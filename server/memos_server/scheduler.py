@@ -0,0 +1,836 @@
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+import redis
+from rq import Queue
+from sqlalchemy.orm import Session
+
+from memos_server.condensation import (
+    CondensationResult,
+    _fetch_messages,
+    _fetch_new_messages,
+    condense_many,
+    count_unsummarized_rows,
+    draft_snapshot,
+    fetch_session_messages,
+    latest_condensation,
+    latest_condensations,
+    publish_snapshot,
+    scan_messages,
+    snapshot_input,
+    write_snapshot,
+    write_snapshots,
+)
+from memos_server.queue import LANE_BULK, LANE_INTERACTIVE, Queues
+
+if TYPE_CHECKING:
+    from memos_server.worker_runtime import WorkerContext
+
+
+# Coalescing condensation scheduler (one job per session at a time).
+#
+# Keys per (namespace, session_id):
+# - pending (ZSET): memory ids not yet folded into a snapshot, scored by ingest order
+#   (`at_ms * 1000 + position in the ingest call`, so ties keep input order).
+#   Filled by ingest/seed, drained atomically by the job when it starts.
+# - inflight (string + TTL): present while a job is queued, deferred or running. Requests that
+#   find it set are coalesced into that job instead of enqueuing another one.
+# - meta (hash): `last_ingest_ms`, used to debounce bursts; `trigger`, the reason/details of the
+#   scheduled job.
+#
+# Debounce: a job scheduled while the session is still ingesting is delayed until ingest has
+# been quiet for `quiet_ms`; when it starts during a burst it re-schedules itself, at most until
+# `max_wait_ms` after the first request. Busy sessions therefore wait longer and fold more
+# messages per job; idle sessions are summarized right away.
+#
+# The inflight TTL (max wait + run budget) bounds the damage of a crashed worker: the marker
+# expires and the next request schedules again. A catch-up chain renews it after every
+# committed chunk, and jobs are enqueued with `job_timeout` (RQ's 60s default would kill
+# long chains). Sessions without pending ids (rows ingested
+# before the scheduler existed) fall back to the job's created_at-based selection.
+#
+# Jobs (including deferrals and follow-ups) go to the session's shard queue when sharding is
+# on (see `queue.py`), so one session's jobs always run on the same pool worker.
+#
+# Job payloads are references only: `(namespace, session_id, token, first_requested_ms)` as
+# positional args with a short description (RQ otherwise stores a repr of every kwarg next to
+# the pickled data). The job resolves the rest itself: trigger from `meta`, message ids from
+# `pending`, previous summary from `condensations`. Jobs enqueued with the old keyword payload
+# (`trigger_reason` / `trigger_details`) still run. `benchmarks/bench_job_payload.py` compares
+# the payload sizes.
+#
+# Lanes (see `queue.py`): `bootstrap_summary` jobs go to the interactive queue when it is
+# enabled and skip the debounce (the agent is waiting for a first summary); everything else
+# is bulk. Each job start records its wait (first request -> start) per lane, kept as the last
+# `_WAIT_SAMPLES` samples for `/v1/ops/pipeline` percentiles.
+#
+# Batch fallback: once a queue holds `batch_queue_depth` jobs, per-job overhead (fetch, two
+# INSERTs, commit per session) dominates. New work for that queue is then appended to a
+# per-queue batch list instead, and a single `run_batch_condensation` job (at most one queued
+# per queue, marker key) folds up to `batch_size` sessions with one message fetch and
+# multi-row inserts in one transaction. Batched sessions skip the debounce: a queue that deep
+# already delays them longer than the quiet window.
+
+JOB_FUNC = "memos_server.scheduler.run_scheduled_condensation"
+INTERACTIVE_TRIGGERS = frozenset({"bootstrap_summary"})
+# Positional arguments of `JOB_FUNC` (also the batch-list entry layout).
+JOB_ARGS = ("namespace", "session_id", "token", "first_requested_ms")
+BATCH_JOB_FUNC = "memos_server.scheduler.run_batch_condensation"
+
+_STATS_KEY = "memos:condense:stats"
+# Pending scores: ms * _SEQ_PER_MS + sequence (< 2**53 for any realistic clock).
+_SEQ_PER_MS = 1000
+# Per-session backlog depth (pending + drained but not yet folded), for `/v1/ops/pipeline`.
+# Maintained with increments next to each change, so it is approximate under races.
+_BACKLOG_KEY = "memos:condense:backlog"
+_WAIT_SAMPLES = 1000
+# Pending ids whose rows still don't exist after this long (e.g. dead-lettered write-behind
+# entries) are dropped instead of being retried forever.
+_MISSING_GRACE_MS = 10 * 60 * 1000
+
+# Delete the inflight marker only if it still belongs to this job (it may have expired and
+# been re-acquired by a newer request).
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Extend the inflight marker only while this job still owns it.
+_RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def batch_key(queue_name: str) -> str:
+    return f"memos:condense:batch:{queue_name}"
+
+
+def batch_marker_key(queue_name: str) -> str:
+    return f"memos:condense:batch_job:{queue_name}"
+
+
+def wait_key(lane: str) -> str:
+    return f"memos:condense:wait:{lane}"
+
+
+def pending_key(namespace: str, session_id: str) -> str:
+    return f"memos:condense:pending:{namespace}:{session_id}"
+
+
+def inflight_key(namespace: str, session_id: str) -> str:
+    return f"memos:condense:inflight:{namespace}:{session_id}"
+
+
+def meta_key(namespace: str, session_id: str) -> str:
+    return f"memos:condense:meta:{namespace}:{session_id}"
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _backlog_member(namespace: str, session_id: str) -> str:
+    return json.dumps([namespace, session_id], ensure_ascii=False)
+
+
+@dataclass(frozen=True)
+class SchedulerStats:
+    requested: int = 0
+    scheduled: int = 0
+    coalesced: int = 0
+    deferred: int = 0
+    runs: int = 0
+    drained_messages: int = 0
+    catch_up_runs: int = 0
+    # Requests routed to batch jobs (queue depth over the batch threshold) / batch jobs run.
+    batched: int = 0
+    batch_runs: int = 0
+    # Jobs scheduled on the interactive lane.
+    interactive: int = 0
+
+
+@dataclass(frozen=True)
+class LaneWait:
+    # Wait from first request to job start over the lane's recent jobs.
+    lane: str
+    samples: int = 0
+    p50_ms: int = 0
+    p90_ms: int = 0
+    p99_ms: int = 0
+    max_ms: int = 0
+
+
+def lane_waits(client: redis.Redis) -> list[LaneWait]:
+    out = []
+    for lane in (LANE_INTERACTIVE, LANE_BULK):
+        waits = sorted(int(w) for w in client.lrange(wait_key(lane), 0, -1) or [])
+        if not waits:
+            out.append(LaneWait(lane))
+            continue
+
+        def pct(p: float) -> int:
+            return waits[min(len(waits) - 1, int(p * len(waits)))]
+
+        out.append(LaneWait(lane, len(waits), pct(0.5), pct(0.9), pct(0.99), waits[-1]))
+    return out
+
+
+def track_pending(pipe: Any, records: Iterable[Any], at_ms: int | None = None) -> None:
+    """Queue pending-id + last-ingest updates on a Redis client or pipeline (ingest path)."""
+
+    at_ms = now_ms() if at_ms is None else int(at_ms)
+    by_session: dict[tuple[str, str], dict[str, int]] = {}
+    for r in records:
+        members = by_session.setdefault((r.namespace, r.session_id), {})
+        members[r.id] = at_ms * _SEQ_PER_MS + min(len(members), _SEQ_PER_MS - 1)
+    for (namespace, session_id), members in by_session.items():
+        pipe.zadd(pending_key(namespace, session_id), members)
+        pipe.hset(meta_key(namespace, session_id), "last_ingest_ms", at_ms)
+        pipe.zincrby(_BACKLOG_KEY, len(members), _backlog_member(namespace, session_id))
+
+
+def clear_pending(client: redis.Redis, namespace: str, session_id: str) -> None:
+    """Forget pending ids (session reset). A running job finishes on what it already drained."""
+
+    pipe = client.pipeline()
+    pipe.delete(pending_key(namespace, session_id), meta_key(namespace, session_id))
+    pipe.zrem(_BACKLOG_KEY, _backlog_member(namespace, session_id))
+    pipe.execute()
+
+
+def queue_depth(client: redis.Redis, queues: Queues) -> int:
+    """Bulk-lane work not started yet: queued jobs plus sessions waiting in batch lists."""
+
+    pipe = client.pipeline(transaction=False)
+    for queue in queues.bulk():
+        pipe.llen(queue.key)
+        pipe.llen(batch_key(queue.name))
+    return sum(int(n or 0) for n in pipe.execute())
+
+
+def backlog_depths(client: redis.Redis, limit: int = 20) -> list[tuple[str, str, int]]:
+    """Deepest condensation backlogs first: `(namespace, session_id, messages)`."""
+
+    out: list[tuple[str, str, int]] = []
+    for member, score in client.zrevrange(_BACKLOG_KEY, 0, max(1, int(limit)) - 1, withscores=True):
+        namespace, session_id = json.loads(member)
+        out.append((str(namespace), str(session_id), int(score)))
+    return out
+
+
+class CondensationScheduler:
+    """Schedules `run_scheduled_condensation`; `client` must decode responses (L1 client)."""
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        queue: Queue,
+        *,
+        quiet_ms: int,
+        max_wait_ms: int,
+        run_budget_seconds: int,
+        min_new_messages: int,
+        route: Callable[[str, str], Queue] | None = None,
+        interactive: Queue | None = None,
+        batch_queue_depth: int = 0,
+        batch_size: int = 50,
+        job_timeout_seconds: int | None = None,
+    ) -> None:
+        self.client = client
+        self.queue = queue
+        # Session-affinity sharding: picks the shard queue per session (`Queues.for_session`).
+        self.route = route
+        # Interactive lane queue; None routes every job to the bulk lane.
+        self.interactive = interactive
+        # 0 disables the batch fallback.
+        self.batch_queue_depth = max(0, int(batch_queue_depth))
+        self.batch_size = max(1, int(batch_size))
+        self.quiet_ms = max(0, int(quiet_ms))
+        self.max_wait_ms = max(self.quiet_ms, int(max_wait_ms))
+        self.inflight_ttl_ms = self.max_wait_ms + max(1, int(run_budget_seconds)) * 1000
+        self.min_new_messages = max(1, int(min_new_messages))
+        # RQ `job_timeout` of scheduled jobs; None keeps the queue default.
+        self.job_timeout = None if job_timeout_seconds is None else max(1, int(job_timeout_seconds))
+        self._release = client.register_script(_RELEASE_LUA)
+        self._renew = client.register_script(_RENEW_LUA)
+
+    def request(
+        self,
+        namespace: str,
+        session_id: str,
+        *,
+        trigger_reason: str,
+        trigger_details: dict[str, object],
+        first_requested_ms: int | None = None,
+    ) -> bool:
+        """Schedule a job unless one is already queued/running. Returns True if one was enqueued."""
+
+        token = uuid.uuid4().hex
+        pipe = self.client.pipeline()
+        pipe.set(inflight_key(namespace, session_id), token, nx=True, px=self.inflight_ttl_ms)
+        pipe.hget(meta_key(namespace, session_id), "last_ingest_ms")
+        pipe.hincrby(_STATS_KEY, "requested", 1)
+        acquired, last_ingest, _ = pipe.execute()
+        if not acquired:
+            self.client.hincrby(_STATS_KEY, "coalesced", 1)
+            return False
+
+        now = now_ms()
+        lane = self.lane_for(trigger_reason)
+        pipe = self.client.pipeline()
+        pipe.hset(meta_key(namespace, session_id), "trigger", _trigger_json(trigger_reason, trigger_details))
+        pipe.hincrby(_STATS_KEY, "scheduled", 1)
+        if lane == LANE_INTERACTIVE:
+            pipe.hincrby(_STATS_KEY, "interactive", 1)
+        pipe.execute()
+        self._enqueue(
+            0 if lane == LANE_INTERACTIVE else self._debounce_ms(now, last_ingest),
+            lane=lane,
+            namespace=namespace,
+            session_id=session_id,
+            token=token,
+            first_requested_ms=now if first_requested_ms is None else int(first_requested_ms),
+        )
+        return True
+
+    def lane_for(self, trigger_reason: str) -> str:
+        if self.interactive is not None and trigger_reason in INTERACTIVE_TRIGGERS:
+            return LANE_INTERACTIVE
+        return LANE_BULK
+
+    def record_wait(self, lane: str, first_requested_ms: int) -> None:
+        """Job start: sample the wait since the first request on `lane`."""
+
+        pipe = self.client.pipeline()
+        pipe.lpush(wait_key(lane), max(0, now_ms() - int(first_requested_ms)))
+        pipe.ltrim(wait_key(lane), 0, _WAIT_SAMPLES - 1)
+        pipe.execute()
+
+    def trigger(self, namespace: str, session_id: str) -> tuple[str, dict[str, object]]:
+        """`(trigger_reason, trigger_details)` of the session's scheduled job."""
+
+        raw = self.client.hget(meta_key(namespace, session_id), "trigger")
+        if not raw:
+            # Meta cleared meanwhile (session reset): same defaults as `run_condensation_job`.
+            return "rolling_summary_refresh", {"source": "scheduler", "strategy": "rolling_summary_v1"}
+        obj = json.loads(raw)
+        return str(obj["reason"]), dict(obj.get("details") or {})
+
+    def remember_trigger(self, namespace: str, session_id: str, trigger_reason: str, trigger_details: dict[str, object]) -> None:
+        """Store the trigger of a job enqueued with the old keyword payload (re-enqueues are slim)."""
+
+        self.client.hset(meta_key(namespace, session_id), "trigger", _trigger_json(trigger_reason, trigger_details))
+
+    def _debounce_ms(self, now: int, last_ingest: object) -> int:
+        idle = now - int(last_ingest or 0)
+        return 0 if idle >= self.quiet_ms else self.quiet_ms - idle
+
+    def queue_for(self, namespace: str, session_id: str) -> Queue:
+        return self.route(namespace, session_id) if self.route is not None else self.queue
+
+    def _enqueue(self, delay_ms: int, lane: str = LANE_BULK, **kwargs: Any) -> None:
+        args = tuple(kwargs[name] for name in JOB_ARGS)
+        description = f"condense {kwargs['namespace']}/{kwargs['session_id']}"
+        if lane == LANE_INTERACTIVE and self.interactive is not None:
+            # Never batched or debounced: interactive jobs are few and wanted now.
+            self.interactive.enqueue(JOB_FUNC, args=args, description=description, **self._job_options())
+            return
+        queue = self.queue_for(str(kwargs["namespace"]), str(kwargs["session_id"]))
+        if self.batch_queue_depth and int(queue.count) >= self.batch_queue_depth:
+            self._enqueue_batch(queue, args)
+        elif delay_ms <= 0:
+            queue.enqueue(JOB_FUNC, args=args, description=description, **self._job_options())
+        else:
+            # Needs a worker started with the RQ scheduler (`worker.py` does).
+            queue.enqueue_in(
+                timedelta(milliseconds=delay_ms), JOB_FUNC, args=args, description=description, **self._job_options()
+            )
+
+    def _job_options(self) -> dict[str, Any]:
+        return {} if self.job_timeout is None else {"job_timeout": self.job_timeout}
+
+    def _enqueue_batch(self, queue: Queue, args: tuple[Any, ...]) -> None:
+        # Push first, then claim the marker: `end_batch` clears the marker before checking the
+        # list, so an entry pushed concurrently is either seen there or schedules a new job.
+        pipe = self.client.pipeline()
+        pipe.rpush(batch_key(queue.name), json.dumps(args, ensure_ascii=False))
+        pipe.set(batch_marker_key(queue.name), "1", nx=True, px=self.inflight_ttl_ms)
+        pipe.hincrby(_STATS_KEY, "batched", 1)
+        claimed = pipe.execute()[1]
+        if claimed:
+            queue.enqueue(BATCH_JOB_FUNC, queue_name=queue.name, **self._job_options())
+
+    def take_batch(self, queue_name: str) -> list[dict[str, Any]]:
+        """Batch job start: pop up to `batch_size` session entries (one per session), as job
+        kwargs with the trigger resolved."""
+
+        raw = self.client.lpop(batch_key(queue_name), self.batch_size) or []
+        self.client.hincrby(_STATS_KEY, "batch_runs", 1)
+        entries: dict[tuple[str, str], dict[str, Any]] = {}
+        for item in raw:
+            entry = json.loads(item)
+            if isinstance(entry, list):
+                entry = dict(zip(JOB_ARGS, entry))
+            # A duplicate carries an older token whose marker expired; the newest entry wins.
+            entries[(str(entry["namespace"]), str(entry["session_id"]))] = entry
+        for (namespace, session_id), entry in entries.items():
+            # Entries pushed before slim payloads carry their trigger.
+            if "trigger_reason" not in entry:
+                entry["trigger_reason"], entry["trigger_details"] = self.trigger(namespace, session_id)
+        return list(entries.values())
+
+    def end_batch(self, queue: Queue) -> bool:
+        """Batch job end: schedule the next batch job if entries are left. Returns True if so."""
+
+        self.client.delete(batch_marker_key(queue.name))
+        if not int(self.client.llen(batch_key(queue.name)) or 0):
+            return False
+        if not self.client.set(batch_marker_key(queue.name), "1", nx=True, px=self.inflight_ttl_ms):
+            return False
+        queue.enqueue(BATCH_JOB_FUNC, queue_name=queue.name, **self._job_options())
+        return True
+
+    def defer_if_busy(self, namespace: str, session_id: str, job_kwargs: dict[str, Any], lane: str = LANE_BULK) -> bool:
+        """Job start: re-schedule (same token) while the session is still ingesting (bulk lane)."""
+
+        if lane == LANE_INTERACTIVE:
+            return False
+        now = now_ms()
+        waited = now - int(job_kwargs.get("first_requested_ms") or now)
+        delay_ms = self._debounce_ms(now, self.client.hget(meta_key(namespace, session_id), "last_ingest_ms"))
+        delay_ms = min(delay_ms, self.max_wait_ms - waited)
+        if delay_ms <= 0:
+            return False
+        pipe = self.client.pipeline()
+        pipe.pexpire(inflight_key(namespace, session_id), self.inflight_ttl_ms)
+        pipe.hincrby(_STATS_KEY, "deferred", 1)
+        pipe.execute()
+        self._enqueue(delay_ms, **job_kwargs)
+        return True
+
+    def drain(self, namespace: str, session_id: str) -> list[tuple[str, int]]:
+        """Take ownership of every pending id (oldest first)."""
+
+        key = pending_key(namespace, session_id)
+        pipe = self.client.pipeline()
+        pipe.zrange(key, 0, -1, withscores=True)
+        pipe.delete(key)
+        pipe.hincrby(_STATS_KEY, "runs", 1)
+        items = pipe.execute()[0]
+        self.client.hincrby(_STATS_KEY, "drained_messages", len(items))
+        return [(str(member), int(score)) for member, score in items]
+
+    def restore(
+        self, namespace: str, session_id: str, items: list[tuple[str, int]], *, drop_stale: bool = False
+    ) -> None:
+        """Put drained ids back (not folded by this job), keeping their ingest-time scores.
+
+        `drop_stale`: for ids whose rows were not found; those older than the grace period
+        will not appear anymore and are dropped.
+        """
+
+        cutoff = (now_ms() - _MISSING_GRACE_MS) * _SEQ_PER_MS if drop_stale else None
+        keep = {member: score for member, score in items if cutoff is None or score >= cutoff}
+        if keep:
+            self.client.zadd(pending_key(namespace, session_id), keep)
+        if len(keep) < len(items):
+            self.consume(namespace, session_id, len(items) - len(keep))
+
+    def consume(self, namespace: str, session_id: str, n: int) -> None:
+        """`n` backlog messages are done (folded, or dropped as stale)."""
+
+        member = _backlog_member(namespace, session_id)
+        if float(self.client.zincrby(_BACKLOG_KEY, -int(n), member)) <= 0:
+            self.client.zrem(_BACKLOG_KEY, member)
+
+    def count_catch_up(self) -> None:
+        self.client.hincrby(_STATS_KEY, "catch_up_runs", 1)
+
+    def release(self, namespace: str, session_id: str, token: str) -> None:
+        self._release(keys=[inflight_key(namespace, session_id)], args=[token])
+
+    def renew(self, namespace: str, session_id: str, token: str) -> bool:
+        """Extend the inflight marker by a full TTL if `token` still owns it."""
+
+        return bool(self._renew(keys=[inflight_key(namespace, session_id)], args=[token, self.inflight_ttl_ms]))
+
+    def finish(
+        self,
+        namespace: str,
+        session_id: str,
+        token: str,
+        *,
+        trigger_details: dict[str, object],
+        carried: int = 0,
+        force_follow_up: bool = False,
+    ) -> bool:
+        """Release the session; schedule a follow-up if enough new messages arrived meanwhile.
+
+        `carried` pending ids were handed back unfolded (rows not visible yet) and do not count
+        towards the threshold; `force_follow_up` continues a backlog cut at the batch size.
+        """
+
+        self.release(namespace, session_id, token)
+        remaining = int(self.client.zcard(pending_key(namespace, session_id)) or 0)
+        fresh = remaining - max(0, int(carried))
+        if remaining <= 0 or (fresh < self.min_new_messages and not force_follow_up):
+            return False
+        return self.request(
+            namespace,
+            session_id,
+            trigger_reason="new_messages_threshold",
+            trigger_details=dict(trigger_details) | {"source": "scheduler:follow_up", "new_message_count": remaining},
+        )
+
+    def stats(self) -> SchedulerStats:
+        raw = self.client.hgetall(_STATS_KEY) or {}
+        return SchedulerStats(**{k: int(raw.get(k) or 0) for k in SchedulerStats.__dataclass_fields__})
+
+
+def _trigger_json(trigger_reason: str, trigger_details: dict[str, object]) -> str:
+    return json.dumps({"reason": trigger_reason, "details": trigger_details}, ensure_ascii=False)
+
+
+def create_scheduler(client: redis.Redis, queues: Queues, settings: Any) -> CondensationScheduler:
+    return CondensationScheduler(
+        client,
+        queues.condensation,
+        route=queues.for_session,
+        interactive=queues.interactive,
+        quiet_ms=int(settings.summary_schedule_quiet_ms),
+        max_wait_ms=int(settings.summary_schedule_max_wait_ms),
+        run_budget_seconds=int(settings.summary_refresh_lock_seconds),
+        min_new_messages=int(settings.summary_refresh_min_new_messages),
+        batch_queue_depth=int(settings.summary_batch_queue_depth),
+        batch_size=int(settings.summary_batch_size),
+        job_timeout_seconds=int(settings.summary_job_timeout_seconds),
+    )
+
+
+@dataclass
+class FoldOutcome:
+    results: list[CondensationResult] = field(default_factory=list)
+    # Drained ids whose rows were not found (not visible yet with write-behind ingest).
+    carried: list[tuple[str, int]] = field(default_factory=list)
+    # Drained ids handed back unfolded because the job stopped at one batch.
+    rest: list[tuple[str, int]] = field(default_factory=list)
+    catch_up: bool = False
+
+
+def fold_backlog(
+    session: Session,
+    client: redis.Redis,
+    scheduler: CondensationScheduler,
+    namespace: str,
+    session_id: str,
+    pending: list[tuple[str, int]],
+    *,
+    max_batch: int,
+    catchup_batches: int,
+    trigger_reason: str,
+    trigger_details: dict[str, object],
+    token: str | None = None,
+) -> FoldOutcome:
+    """Fold drained ids (or, without any, the created_at backlog) into snapshots on `session`.
+
+    Normally one snapshot of at most `max_batch` messages; the rest goes back to pending.
+    With more than `catchup_batches` batches of backlog the whole backlog is folded in ordered
+    chunks, each committed and published before the next one starts; `token`'s inflight
+    marker is renewed after each one so it cannot expire mid-chain. On failure, ids not
+    folded yet are handed back before the exception propagates.
+    """
+
+    max_batch = max(1, int(max_batch))
+    catch_up_limit = max(1, int(catchup_batches)) * max_batch
+    out = FoldOutcome(catch_up=len(pending) > catch_up_limit)
+    chunks = [pending[i : i + max_batch] for i in range(0, len(pending), max_batch)]
+    if not out.catch_up and len(chunks) > 1:
+        out.rest = [item for chunk in chunks[1:] for item in chunk]
+        chunks = chunks[:1]
+        scheduler.restore(namespace, session_id, out.rest)
+
+    latest = latest_condensation(session, namespace, session_id)
+    prev_id = latest.id if latest else None
+    prev_text = latest.condensed_text if latest else None
+    if not pending:
+        # Rows ingested before the scheduler tracked ids: select by coverage instead.
+        out.catch_up = count_unsummarized_rows(session, namespace, session_id, prev_id) > catch_up_limit
+    if out.catch_up:
+        scheduler.count_catch_up()
+
+    def fold(messages: list[dict[str, str]], chunk_no: int, chunks_total: int | None) -> None:
+        nonlocal prev_id, prev_text
+        details = dict(trigger_details) | {"coalesced_messages": len(messages)}
+        if out.catch_up:
+            details["catch_up"] = {"chunk": chunk_no, "chunks": chunks_total}
+        result = write_snapshot(
+            session,
+            namespace=namespace,
+            session_id=session_id,
+            messages=messages,
+            prev_summary_id=prev_id,
+            prev_summary_text=prev_text,
+            trigger_reason=("backlog_catch_up" if out.catch_up else trigger_reason),
+            trigger_details=details,
+        )
+        # Intermediate snapshots are committed and published: queries see progress and a
+        # failure later in the chain keeps what was already folded.
+        session.commit()
+        publish_snapshot(client, namespace, session_id, result)
+        scheduler.consume(namespace, session_id, len(messages))
+        if token is not None:
+            scheduler.renew(namespace, session_id, token)
+        out.results.append(result)
+        prev_id, prev_text = result.condensation_id, result.condensed_text
+
+    try:
+        if pending:
+            for chunk_no, chunk in enumerate(chunks, start=1):
+                messages = _fetch_messages(session, [member for member, _ in chunk])
+                found = {m["id"] for m in messages}
+                out.carried.extend(item for item in chunk if item[0] not in found)
+                if messages:
+                    fold(messages, chunk_no, len(chunks))
+        else:
+            chunk_no = 0
+            while True:
+                messages = _fetch_new_messages(session, namespace, session_id, prev_id, limit=max_batch)
+                if not messages:
+                    break
+                chunk_no += 1
+                fold(messages, chunk_no, None)
+                if not out.catch_up or len(messages) < max_batch:
+                    break
+    except Exception:
+        done = {m for r in out.results for m in r.memory_ids}
+        scheduler.restore(namespace, session_id, [item for chunk in chunks for item in chunk if item[0] not in done])
+        raise
+    return out
+
+
+def run_scheduled_condensation(
+    namespace: str,
+    session_id: str,
+    token: str,
+    first_requested_ms: int,
+    *,
+    trigger_reason: str | None = None,
+    trigger_details: dict[str, object] | None = None,
+    ctx: WorkerContext | None = None,
+) -> CondensationResult | None:
+    """RQ job: drain the session's pending ids and fold them (see `fold_backlog`).
+
+    The trigger is read from the session's meta hash; `trigger_reason` / `trigger_details` are
+    only passed by jobs enqueued with the old keyword payload.
+    """
+
+    from memos_server.worker_runtime import get_worker_context
+
+    ctx = ctx or get_worker_context()
+    settings, client = ctx.settings, ctx.redis
+    scheduler = create_scheduler(client, ctx.queues, settings)
+
+    if trigger_reason is None:
+        trigger_reason, trigger_details = scheduler.trigger(namespace, session_id)
+    else:
+        trigger_details = dict(trigger_details or {})
+        scheduler.remember_trigger(namespace, session_id, trigger_reason, trigger_details)
+
+    job_kwargs = dict(zip(JOB_ARGS, (namespace, session_id, token, first_requested_ms)))
+    lane = scheduler.lane_for(trigger_reason)
+    if scheduler.defer_if_busy(namespace, session_id, job_kwargs, lane):
+        return None
+    scheduler.record_wait(lane, first_requested_ms)
+
+    pending = scheduler.drain(namespace, session_id)
+    engine = ctx.db.engine
+    try:
+        # One connection for the whole job: `Session(bind=conn)` commits on it without
+        # returning it to the pool between catch-up chunks.
+        with engine.connect() as conn, Session(bind=conn) as session:
+            out = fold_backlog(
+                session,
+                client,
+                scheduler,
+                namespace,
+                session_id,
+                pending,
+                max_batch=int(settings.summary_refresh_max_batch),
+                catchup_batches=int(settings.summary_catchup_batches),
+                trigger_reason=trigger_reason,
+                trigger_details=trigger_details,
+                token=token,
+            )
+    except Exception:
+        # Unfolded ids are back in pending; the next request retries them.
+        scheduler.release(namespace, session_id, token)
+        raise
+
+    # Ids whose rows are not visible yet (write-behind) wait for a later job.
+    scheduler.restore(namespace, session_id, out.carried, drop_stale=True)
+    scheduler.finish(
+        namespace,
+        session_id,
+        token,
+        trigger_details=trigger_details,
+        carried=len(out.carried),
+        force_follow_up=bool(out.rest),
+    )
+    return out.results[-1] if out.results else None
+
+
+@dataclass
+class _BatchItem:
+    entry: dict[str, Any]
+    pending: list[tuple[str, int]]
+    batch: list[tuple[str, int]]
+    rest: list[tuple[str, int]]
+    messages: list[dict[str, str]] = field(default_factory=list)
+    carried: list[tuple[str, int]] = field(default_factory=list)
+    result: CondensationResult | None = None
+
+
+def fold_batch(
+    session: Session,
+    client: redis.Redis,
+    scheduler: CondensationScheduler,
+    entries: list[dict[str, Any]],
+    *,
+    max_batch: int,
+    workers: int = 1,
+) -> tuple[list[CondensationResult], list[dict[str, Any]]]:
+    """Fold many sessions at once: one message fetch, one latest-snapshot lookup, multi-row
+    inserts and a single commit. Each session folds at most `max_batch` drained ids (the rest
+    goes back to pending and triggers a follow-up).
+
+    Returns the results and the entries of sessions without pending ids, which the caller
+    folds one by one (created_at-based selection). Entries are finished (released, follow-up
+    scheduled) here; on failure every drained id is handed back and every entry released.
+    """
+
+    max_batch = max(1, int(max_batch))
+    items: list[_BatchItem] = []
+    legacy: list[dict[str, Any]] = []
+    for entry in entries:
+        pending = scheduler.drain(str(entry["namespace"]), str(entry["session_id"]))
+        if not pending:
+            legacy.append(entry)
+            continue
+        items.append(_BatchItem(entry, pending, pending[:max_batch], pending[max_batch:]))
+        scheduler.record_wait(LANE_BULK, int(entry["first_requested_ms"]))
+
+    def key(item: _BatchItem) -> tuple[str, str]:
+        return str(item.entry["namespace"]), str(item.entry["session_id"])
+
+    try:
+        for item in items:
+            if item.rest:
+                scheduler.restore(*key(item), item.rest)
+        found = fetch_session_messages(session, [member for item in items for member, _ in item.batch])
+        latest = latest_condensations(session, [key(item) for item in items if key(item) in found])
+
+        drafts = []
+        folding = [item for item in items if key(item) in found]
+        for item in items:
+            item.messages = found.get(key(item), [])
+            ids = {m["id"] for m in item.messages}
+            item.carried = [p for p in item.batch if p[0] not in ids]
+        scans = scan_messages(session, {key(item): item.messages for item in folding})
+        cards = condense_many(
+            [
+                snapshot_input(
+                    item.messages,
+                    None,
+                    latest[key(item)].condensed_text if key(item) in latest else None,
+                    scans[key(item)],
+                )
+                for item in folding
+            ],
+            workers,
+        )
+        for item, card in zip(folding, cards):
+            prev = latest.get(key(item))
+            details = dict(item.entry["trigger_details"]) | {"coalesced_messages": len(item.messages), "batch": len(folding)}
+            drafts.append(
+                draft_snapshot(
+                    namespace=key(item)[0],
+                    session_id=key(item)[1],
+                    messages=item.messages,
+                    card=card,
+                    prev_summary_id=(prev.id if prev else None),
+                    trigger_reason=str(item.entry["trigger_reason"]),
+                    trigger_details=details,
+                )
+            )
+        for item, result in zip(folding, write_snapshots(session, drafts)):
+            item.result = result
+        session.commit()
+    except Exception:
+        for item in items:
+            scheduler.restore(*key(item), item.batch)
+        for entry in entries:
+            scheduler.release(str(entry["namespace"]), str(entry["session_id"]), str(entry["token"]))
+        raise
+
+    results = []
+    for item in items:
+        namespace, session_id = key(item)
+        if item.result is not None:
+            publish_snapshot(client, namespace, session_id, item.result)
+            scheduler.consume(namespace, session_id, len(item.messages))
+            results.append(item.result)
+        scheduler.restore(namespace, session_id, item.carried, drop_stale=True)
+        scheduler.finish(
+            namespace,
+            session_id,
+            str(item.entry["token"]),
+            trigger_details=dict(item.entry["trigger_details"]),
+            carried=len(item.carried),
+            force_follow_up=bool(item.rest),
+        )
+    return results, legacy
+
+
+def run_batch_condensation(*, queue_name: str, ctx: WorkerContext | None = None) -> int:
+    """RQ job: fold the sessions queued in `queue_name`'s batch list (see `fold_batch`).
+
+    Returns the number of snapshots written.
+    """
+
+    from memos_server.worker_runtime import get_worker_context
+
+    ctx = ctx or get_worker_context()
+    settings, client = ctx.settings, ctx.redis
+    scheduler = create_scheduler(client, ctx.queues, settings)
+    queue = next((q for q in ctx.queues.all() if q.name == queue_name), ctx.queues.condensation)
+
+    try:
+        entries = scheduler.take_batch(queue_name)
+        with ctx.db.engine.connect() as conn, Session(bind=conn) as session:
+            results, legacy = fold_batch(
+                session,
+                client,
+                scheduler,
+                entries,
+                max_batch=int(settings.summary_refresh_max_batch),
+                workers=int(settings.summary_batch_workers),
+            )
+        written = len(results)
+        # Sessions without tracked ids: the regular per-session path (now, in this job).
+        for entry in legacy:
+            if run_scheduled_condensation(**entry, ctx=ctx) is not None:
+                written += 1
+    finally:
+        scheduler.end_batch(queue)
+    return written
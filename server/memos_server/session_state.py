@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+import redis
+import redis.asyncio
+from sqlalchemy.orm import Session
+
+from memos_server.condensation import card_to_plain_text, count_unsummarized_rows, estimate_tokens, latest_condensation
+
+
+# Hot session state (Redis hash per session), so `/v1/query` needs no Postgres reads to
+# decide what summary to show and whether to refresh it:
+# - summary_id / summary_created_at / condensed_text: latest `condensations` snapshot
+# - plain_text / token_condensed: `card_to_plain_text` output and its token estimate
+# - unsummarized: messages ingested since that snapshot (drives the refresh threshold)
+#
+# Writers: ingest (+N), the condensation job (new snapshot, -N summarized), reset/seed
+# (delete). A missing or partial hash (e.g. only an ingest counter, or after Redis eviction)
+# is rebuilt from Postgres once by `load_or_bootstrap`.
+
+_READY = "ready"
+
+
+def state_key(namespace: str, session_id: str) -> str:
+    return f"memos:session_state:{namespace}:{session_id}"
+
+
+@dataclass(frozen=True)
+class SessionState:
+    summary_id: str | None
+    summary_created_at: str | None
+    condensed_text: str | None
+    plain_text: str | None
+    token_condensed: int
+    unsummarized: int
+
+    @classmethod
+    def from_hash(cls, raw: dict[str, Any]) -> SessionState:
+        return cls(
+            summary_id=(raw.get("summary_id") or None),
+            summary_created_at=(raw.get("summary_created_at") or None),
+            condensed_text=(raw.get("condensed_text") or None),
+            plain_text=(raw.get("plain_text") or None),
+            token_condensed=int(raw.get("token_condensed") or 0),
+            unsummarized=max(0, int(raw.get("unsummarized") or 0)),
+        )
+
+
+def _summary_fields(summary_id: str, created_at: str, condensed_text: str) -> dict[str, str]:
+    plain = card_to_plain_text(condensed_text)
+    return {
+        _READY: "1",
+        "summary_id": summary_id,
+        "summary_created_at": created_at,
+        "condensed_text": condensed_text,
+        "plain_text": plain,
+        "token_condensed": str(estimate_tokens(plain)),
+    }
+
+
+def count_unsummarized(pipe: Any, counts: dict[tuple[str, str], int]) -> None:
+    """Queue `unsummarized += n` per session on a Redis client or pipeline (ingest path)."""
+
+    for (namespace, session_id), n in counts.items():
+        pipe.hincrby(state_key(namespace, session_id), "unsummarized", int(n))
+
+
+def drop_state(client: redis.Redis, namespace: str, session_id: str) -> None:
+    client.delete(state_key(namespace, session_id))
+
+
+def record_summary(
+    client: redis.Redis,
+    namespace: str,
+    session_id: str,
+    *,
+    summary_id: str,
+    created_at: str,
+    condensed_text: str,
+    summarized: int,
+) -> None:
+    """Condensation job hook: point the state at the new snapshot, consume `summarized` messages."""
+
+    key = state_key(namespace, session_id)
+    pipe = client.pipeline()
+    pipe.hset(key, mapping=_summary_fields(summary_id, created_at, condensed_text))
+    pipe.hincrby(key, "unsummarized", -int(summarized))
+    remaining = pipe.execute()[-1]
+    if int(remaining) < 0:
+        client.hset(key, "unsummarized", 0)
+
+
+def bootstrap_fields(session: Session, namespace: str, session_id: str) -> dict[str, str]:
+    """Hash fields rebuilt from Postgres (cold start / eviction): latest snapshot + messages since."""
+
+    persisted = latest_condensation(session, namespace, session_id)
+    unsummarized = count_unsummarized_rows(session, namespace, session_id, persisted.id if persisted else None)
+
+    fields = {_READY: "1", "unsummarized": str(unsummarized)}
+    if persisted:
+        fields |= _summary_fields(persisted.id, persisted.created_at, persisted.condensed_text)
+    return fields
+
+
+def _queue_replace(pipe: Any, namespace: str, session_id: str, fields: dict[str, str]) -> None:
+    key = state_key(namespace, session_id)
+    pipe.delete(key)
+    pipe.hset(key, mapping=fields)
+
+
+def bootstrap_state(session: Session, client: redis.Redis, namespace: str, session_id: str) -> SessionState:
+    fields = bootstrap_fields(session, namespace, session_id)
+    pipe = client.pipeline()
+    _queue_replace(pipe, namespace, session_id, fields)
+    pipe.execute()
+    return SessionState.from_hash(fields)
+
+
+def load_or_bootstrap(session: Session, client: redis.Redis, namespace: str, session_id: str) -> SessionState:
+    raw = client.hgetall(state_key(namespace, session_id))
+    if raw and raw.get(_READY):
+        return SessionState.from_hash(raw)
+    return bootstrap_state(session, client, namespace, session_id)
+
+
+async def load_state_async(client: redis.asyncio.Redis, namespace: str, session_id: str) -> SessionState | None:
+    """Async read of a ready hash; None means the caller must bootstrap (`store_state_async`)."""
+
+    raw = await client.hgetall(state_key(namespace, session_id))
+    if raw and raw.get(_READY):
+        return SessionState.from_hash(raw)
+    return None
+
+
+async def store_state_async(
+    client: redis.asyncio.Redis, namespace: str, session_id: str, fields: dict[str, str]
+) -> SessionState:
+    pipe = client.pipeline()
+    _queue_replace(pipe, namespace, session_id, fields)
+    await pipe.execute()
+    return SessionState.from_hash(fields)
@@ -28,10 +28,120 @@ class Settings(BaseSettings):
     # L1 session window size
     l1_window_size: int = 20
 
+    # Embeddings (L2 vector space). Changing provider/dim requires re-embedding existing rows;
+    # the `memories.embedding` column is resized automatically only while it holds no vectors.
+    # - "hash": deterministic fake embedding (MVP default, not semantic)
+    # - "hashed_projection": local CPU embedder (hashed TF features + random projection)
+    embedding_provider: str = "hash"
+    embedding_dim: int = 32
+    # Process-pool size for batch embedding; opt-in: 0 or 1 embed in-process, >1 starts a pool.
+    embedding_workers: int = 1
+    embedding_parallel_min_batch: int = 256
+    # Embedding cache: in-process LRU entries (0 disables) + optional shared Redis level.
+    embedding_cache_size: int = 4096
+    embedding_cache_shared: bool = False
+    embedding_cache_ttl_seconds: int = 86_400
+
+    # L2 retrieval planner: exact per-session scan up to this many rows, HNSW above it.
+    retrieval_exact_max_rows: int = 5000
+    # HNSW probing: start ef_search, doubled until top_k rows survive the session filter.
+    retrieval_hnsw_ef_search: int = 40
+    retrieval_hnsw_max_ef_search: int = 400
+    # "vector" (default) or "hybrid": vector + full-text candidates fused by reciprocal rank
+    # fusion (per-request override: `QueryRequest.retrieval_mode`).
+    retrieval_mode: str = "vector"
+    retrieval_hybrid_candidates: int = 50
+    retrieval_rrf_k: int = 60
+
+    # Hot namespaces: in-process HNSW index per listed namespace (comma separated), queried
+    # before Postgres. Each API process holds its own copy within the memory budget; the least
+    # recently queried namespace is evicted (and snapshotted, if a snapshot dir is set) first.
+    hot_namespaces: str = ""
+    hot_index_memory_budget_mb: int = 256
+    hot_index_snapshot_dir: str = ""
+    hot_index_reconcile_seconds: float = 30.0
+    hot_index_m: int = 16
+    hot_index_ef_construction: int = 100
+    hot_index_ef_search: int = 64
+
+    # `/v1/query` result cache in Redis, invalidated exactly by a per-session write watermark
+    # (bumped by ingest/flush/seed/reset/condensation). The TTL only bounds memory.
+    query_cache_enabled: bool = False
+    query_cache_ttl_seconds: int = 600
+    # On a cache hit, still write the QUERY audit + a fresh context pack (replayable history)
+    # instead of returning the cached context pack id with zero Postgres writes.
+    query_cache_replay_persistence: bool = False
+
+    # Query-path persistence (context pack + QUERY/CONTEXT_PACK audits):
+    # - "sync": written before responding (default)
+    # - "async": bounded in-process queue + background batch writer (ids returned immediately)
+    # - "sampled": async, keeping only `persistence_sample_rate` of context packs
+    persistence_mode: str = "sync"
+    persistence_sample_rate: float = 0.1
+    persistence_queue_size: int = 10_000
+    persistence_batch_size: int = 200
+    persistence_flush_ms: int = 200
+
+    # Request path: "sync" handlers (threadpool, blocking drivers) by default; with api_async the
+    # query/ingest endpoints run on the event loop (async SQLAlchemy + redis.asyncio) and
+    # `/v1/query` fetches L1, L2 and the session state concurrently.
+    api_async: bool = False
+    api_async_pool_size: int = 20
+    api_async_max_overflow: int = 20
+
+    # Ingest durability mode:
+    # - "sync": commit to Postgres before responding (default)
+    # - "write_behind": write L1 + a Redis stream, respond immediately; `flusher.py` persists in bulk
+    ingest_mode: str = "sync"
+    write_behind_stream: str = "memos:ingest:stream"
+    write_behind_batch_size: int = 500
+    write_behind_claim_idle_ms: int = 30_000
+
+    # Condensation worker (`worker.py`): "simple" runs jobs in the worker process and reuses its
+    # runtime (default); "fork" forks one child per job (rq.Worker).
+    worker_class: str = "simple"
+    # Session-affinity sharding: >1 routes condensation jobs to `condensation:{i}` by a hash of
+    # (namespace, session_id); `worker.py --pool` runs one worker process per shard.
+    condensation_shards: int = 1
+    # Pool supervisor: seconds to wait for workers to finish their current job on shutdown.
+    worker_pool_drain_seconds: int = 60
+    # Priority lanes (see `queue.py`): bootstrap summaries requested by /v1/query go to
+    # `condensation:interactive`, drained first by every worker; after `burst` interactive jobs
+    # in a row a worker takes one bulk job (starvation guard).
+    condensation_interactive_lane: bool = True
+    condensation_interactive_burst: int = 10
+
+    # Extra memory-card line rules (JSON file, see `line_classifier.load_rules`); empty = built-ins.
+    card_rules_path: str = ""
+
     # Session summary (condensation) refresh policy
     summary_refresh_min_new_messages: int = 4
     summary_refresh_max_batch: int = 40
+    # Catch-up: a job facing more than this many batches of backlog folds all of it, one
+    # committed snapshot per batch, instead of a single batch.
+    summary_catchup_batches: int = 3
+    # Run budget of one condensation job: the per-session in-flight marker expires this long
+    # after the debounce window, so a crashed worker cannot block a session for good.
     summary_refresh_lock_seconds: int = 30
+    # RQ timeout of condensation jobs (RQ's default of 60s is too short for a catch-up chain;
+    # the in-flight marker is renewed after every committed chunk).
+    summary_job_timeout_seconds: int = 600
+    # Coalescing scheduler debounce: wait for this much ingest silence before condensing,
+    # but never longer than max_wait after the first request.
+    summary_schedule_quiet_ms: int = 2000
+    summary_schedule_max_wait_ms: int = 30_000
+    # Batch fallback: when a condensation queue holds this many jobs (0 = never), sessions are
+    # folded by batch jobs of up to `summary_batch_size` sessions (one fetch, multi-row inserts).
+    summary_batch_queue_depth: int = 200
+    summary_batch_size: int = 50
+    # Process-pool size for condensing a batch (1 = in the worker process).
+    summary_batch_workers: int = 1
+    # Backpressure (`backpressure.py`): from this bulk-lane queue depth (queued jobs + batched
+    # sessions) /v1/query raises its refresh threshold, and from the hard depth it stops
+    # enqueueing (0 = off). The depth is re-read at most once per `cache_ms` per API process.
+    summary_backpressure_soft_depth: int = 100
+    summary_backpressure_hard_depth: int = 1000
+    summary_backpressure_cache_ms: int = 1000
 
 
 def get_settings() -> Settings:
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+# Vector codec: the single place where embeddings cross the Python <-> Postgres boundary.
+#
+# Why not '[0.123456,...]' string literals:
+# - formatting floats in Python and parsing them again in Postgres costs CPU on both sides
+# - `:.6f` rounding silently drops precision
+#
+# Instead, every engine registers pgvector's psycopg adapter, so NumPy arrays bound as
+# parameters are sent with the binary protocol (float4, same as the `vector` column) and
+# `vector` columns load back without text parsing.
+
+
+def to_vector(values: Iterable[float] | np.ndarray, dim: int | None = None) -> np.ndarray:
+    """Normalize an embedding into a 1-D float32 array ready to be bound as a `vector`."""
+
+    arr = np.asarray(values, dtype=np.float32)
+    if arr.ndim != 1:
+        raise ValueError(f"expected a 1-D embedding, got shape {arr.shape}")
+    if dim is not None and arr.shape[0] != dim:
+        raise ValueError(f"expected embedding dim {dim}, got {arr.shape[0]}")
+    if not np.isfinite(arr).all():
+        raise ValueError("embedding contains NaN/inf")
+    return np.ascontiguousarray(arr)
+
+
+def from_db(value: Any) -> np.ndarray | None:
+    """Decode a `vector` column value into a float32 array.
+
+    Handles every shape the driver may hand back: pgvector `Vector` objects (newer
+    adapters), ndarrays (older adapters) and the text format (unregistered connections).
+    """
+
+    if value is None:
+        return None
+    if hasattr(value, "to_numpy"):
+        return np.asarray(value.to_numpy(), dtype=np.float32)
+    if isinstance(value, str):
+        body = value.strip().strip("[]")
+        return np.array([float(x) for x in body.split(",")] if body else [], dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def register_vector_codec(engine: Engine) -> None:
+    """Register pgvector's psycopg (binary) adapter on every new DBAPI connection."""
+
+    from pgvector.psycopg import register_vector
+
+    @event.listens_for(engine, "connect")
+    def _register(dbapi_connection, connection_record):  # type: ignore[no-untyped-def]
+        try:
+            register_vector(dbapi_connection)
+        except Exception as exc:
+            # The `vector` extension is created by docker init SQL; surface a missing one loudly
+            # instead of failing every checkout.
+            print(f"[db] warning: pgvector adapter not registered: {type(exc).__name__}: {exc}")
+
+
+def register_vector_codec_async(engine: AsyncEngine) -> None:
+    """Async engines: same adapter, registered through the psycopg async connection."""
+
+    from pgvector.psycopg import register_vector_async
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _register(dbapi_connection, connection_record):  # type: ignore[no-untyped-def]
+        try:
+            # SQLAlchemy's adapted connection runs the coroutine on the driver's event loop.
+            dbapi_connection.run_async(register_vector_async)
+        except Exception as exc:
+            print(f"[db] warning: pgvector adapter not registered: {type(exc).__name__}: {exc}")
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import time
+from typing import Any, Callable
+
+import redis
+from rq import Queue
+
+from memos_server.queue import Queues
+
+
+# Condensation worker pool (`worker.py --pool`).
+#
+# The supervisor runs one worker process per shard queue (see `queue.py`) and does no job
+# work itself:
+# - crashed children are restarted; a child that dies shortly after starting is restarted
+#   with exponential backoff so a broken deploy doesn't spin
+# - SIGTERM/SIGINT drains: every child gets one SIGTERM (RQ warm shutdown: finish the current
+#   job, take no new one) and is killed only after `drain_seconds`
+# - restarts are counted in Redis so `/v1/ops/pipeline` can show them next to the per-shard
+#   queue depth and live worker count
+#
+# Children run in their own process group, so a terminal Ctrl+C reaches the supervisor only;
+# a second signal would turn RQ's warm shutdown into a cold one.
+
+_STATS_KEY = "memos:worker_pool:restarts"
+# A child that lived shorter than this counts as a failed start (backoff grows).
+_HEALTHY_AFTER_S = 10.0
+_MAX_BACKOFF_S = 30.0
+
+
+def shard_worker_queues(queues: Queues, index: int) -> list[Queue]:
+    """Queues consumed by shard `index`'s worker: the interactive lane first (every shard),
+    then its own shard (shard 0 also drains the unsharded queue)."""
+
+    lane = [queues.interactive] if queues.interactive is not None else []
+    if not queues.shards:
+        return lane + [queues.condensation]
+    own = [queues.shards[index]]
+    return lane + (own + [queues.condensation] if index == 0 else own)
+
+
+def pool_restarts(client: redis.Redis) -> dict[str, int]:
+    """Restart counters by shard queue name (`client` must decode responses)."""
+
+    return {str(k): int(v) for k, v in (client.hgetall(_STATS_KEY) or {}).items()}
+
+
+def _child_main(target: Callable[[int], None], index: int) -> None:
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    target(index)
+
+
+class WorkerPool:
+    """Supervises `shards` worker processes; `target(index)` runs shard `index`'s worker."""
+
+    def __init__(
+        self,
+        shards: int,
+        target: Callable[[int], None],
+        *,
+        client: redis.Redis | None = None,
+        queue_names: list[str] | None = None,
+        drain_seconds: float = 60.0,
+        poll_seconds: float = 1.0,
+        mp_context: Any = None,
+    ) -> None:
+        self.shards = max(1, int(shards))
+        self.target = target
+        self.client = client
+        self.queue_names = queue_names or [str(i) for i in range(self.shards)]
+        self.drain_seconds = max(0.0, float(drain_seconds))
+        self.poll_seconds = max(0.05, float(poll_seconds))
+        self._mp = mp_context or multiprocessing.get_context()
+        self._procs: dict[int, Any] = {}
+        self._started_at: dict[int, float] = {}
+        self._failures: dict[int, int] = {}
+        self._restart_at: dict[int, float] = {}
+        self.restarts = 0
+        self.stopping = False
+
+    def start(self) -> None:
+        for index in range(self.shards):
+            self._spawn(index)
+
+    def _spawn(self, index: int) -> None:
+        proc = self._mp.Process(
+            target=_child_main, args=(self.target, index), name=f"memos-worker-{index}", daemon=False
+        )
+        proc.start()
+        self._procs[index] = proc
+        self._started_at[index] = time.monotonic()
+        self._restart_at.pop(index, None)
+
+    def supervise_once(self, now: float | None = None) -> None:
+        """Restart children that exited (after their backoff, if any)."""
+
+        if self.stopping:
+            return
+        now = time.monotonic() if now is None else now
+        for index, proc in list(self._procs.items()):
+            if proc.is_alive():
+                if now - self._started_at[index] >= _HEALTHY_AFTER_S:
+                    self._failures.pop(index, None)
+                continue
+            if index not in self._restart_at:
+                failures = self._failures.get(index, 0)
+                if now - self._started_at[index] < _HEALTHY_AFTER_S:
+                    failures += 1
+                self._failures[index] = failures
+                backoff = min(_MAX_BACKOFF_S, 2.0 ** (failures - 1)) if failures else 0.0
+                self._restart_at[index] = now + backoff
+                print(f"[worker-pool] shard {index} exited code={proc.exitcode}; restart in {backoff:.0f}s")
+            if now >= self._restart_at[index]:
+                self._record_restart(index)
+                self._spawn(index)
+
+    def _record_restart(self, index: int) -> None:
+        self.restarts += 1
+        if self.client is None:
+            return
+        try:
+            self.client.hincrby(_STATS_KEY, self.queue_names[index], 1)
+        except redis.RedisError:
+            pass
+
+    def stop(self) -> None:
+        """Drain: one SIGTERM per child, wait up to `drain_seconds`, then kill stragglers."""
+
+        self.stopping = True
+        for proc in self._procs.values():
+            if proc.is_alive():
+                proc.terminate()
+        deadline = time.monotonic() + self.drain_seconds
+        for proc in self._procs.values():
+            proc.join(max(0.0, deadline - time.monotonic()))
+        for index, proc in self._procs.items():
+            if proc.is_alive():
+                print(f"[worker-pool] shard {index} did not drain in {self.drain_seconds:.0f}s; killing")
+                proc.kill()
+                proc.join()
+
+    def alive(self) -> int:
+        return sum(1 for proc in self._procs.values() if proc.is_alive())
+
+    def run(self) -> None:
+        def request_stop(signum, frame):  # type: ignore[no-untyped-def]
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        self.start()
+        try:
+            while not self.stopping:
+                self.supervise_once()
+                time.sleep(self.poll_seconds)
+        finally:
+            self.stop()
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+
+import redis
+
+from memos_server.db import Db, create_db
+from memos_server.env import init_env
+from memos_server.queue import Queues, create_queues
+from memos_server.settings import Settings, get_settings
+
+
+# Per-process worker runtime.
+#
+# Settings, the SQLAlchemy engine (and its connection pool) and the Redis clients are created
+# once per worker process and handed to jobs through `WorkerContext`, instead of every job
+# running `init_env()` / `get_settings()` / `create_db()` and discarding the pool afterwards.
+#
+# `worker.py` initializes the context before it starts consuming. Jobs call
+# `get_worker_context()` (or receive a context explicitly, e.g. in tests/benchmarks), so jobs
+# executed outside `worker.py` still work: the first call creates the context lazily.
+#
+# Forking workers (rq.Worker): a child inherits the parent's context but must not reuse its
+# pooled connections, so the pool is reset in the child right after the fork.
+
+
+@dataclass(frozen=True)
+class WorkerContext:
+    settings: Settings
+    db: Db
+    # App keys (L1, session state, scheduler): decoded like the API's L1 client.
+    redis: redis.Redis
+    # RQ needs a client that does not decode responses.
+    queues: Queues
+
+
+_context: WorkerContext | None = None
+_lock = threading.Lock()
+
+
+def init_worker_context(settings: Settings | None = None) -> WorkerContext:
+    """(Re)create the process context; disposes the previous engine if there was one."""
+
+    global _context
+    init_env()
+    settings = settings or get_settings()
+    ctx = WorkerContext(
+        settings=settings,
+        db=create_db(settings.database_url),
+        redis=redis.Redis.from_url(settings.redis_url, decode_responses=True),
+        queues=create_queues(
+            settings.redis_url, settings.condensation_shards, interactive=settings.condensation_interactive_lane
+        ),
+    )
+    with _lock:
+        previous, _context = _context, ctx
+    if previous is not None:
+        previous.db.engine.dispose()
+    return ctx
+
+
+def get_worker_context() -> WorkerContext:
+    return _context or init_worker_context()
+
+
+def reset_worker_context() -> None:
+    """Drop the process context (next `get_worker_context()` builds a fresh one)."""
+
+    global _context
+    with _lock:
+        previous, _context = _context, None
+    if previous is not None:
+        previous.db.engine.dispose()
+
+
+def _after_fork_in_child() -> None:
+    ctx = _context
+    if ctx is not None:
+        # Keep the engine, drop the parent's pooled connections without closing them (they
+        # still belong to the parent).
+        ctx.db.engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+import redis
+from sqlalchemy.orm import Session
+
+from memos_server.audit import insert_audit_rows
+from memos_server.db import Db
+from memos_server.embedding import EmbeddingProvider
+from memos_server.ingest import MemoryRecord, insert_memories
+from memos_server.query_cache import bump_watermark
+
+
+# Write-behind ingest:
+# - The API appends each accepted ingest unit (memories + its audit rows) to a Redis stream
+#   and returns immediately.
+# - `flusher.py` drains the stream through a consumer group and writes large transactions.
+# - Entries are acked (and deleted) only after commit, so delivery is at-least-once; inserts
+#   use `ON CONFLICT (id) DO NOTHING` with ids assigned by the API, which makes replays idempotent.
+#
+# Because acked entries are deleted, the stream only ever holds unflushed work: its length is
+# the backlog and its first entry is the oldest unflushed write.
+
+FLUSHER_GROUP = "memos-flusher"
+
+_IDEMPOTENT = "ON CONFLICT (id) DO NOTHING"
+
+
+@dataclass(frozen=True)
+class WriteBehindStats:
+    stream: str
+    length: int = 0
+    pending: int = 0
+    lag: int = 0
+    oldest_age_ms: int = 0
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def enqueue_ingest(
+    client: redis.Redis,
+    stream: str,
+    records: list[MemoryRecord],
+    audits: list[dict[str, object]],
+) -> str:
+    """Append one ingest unit to the stream. Returns the stream entry id.
+
+    `created_at` is stamped here (accept time), so rows keep their arrival order even
+    though they are written later.
+    """
+
+    return str(client.xadd(stream, ingest_fields(records, audits)))
+
+
+def ingest_fields(records: list[MemoryRecord], audits: list[dict[str, object]]) -> dict[str, str]:
+    """Stream entry fields for one ingest unit (shared by the sync and async request paths)."""
+
+    accepted_at = utc_now_iso()
+    payload = {
+        "memories": [asdict(r) | {"created_at": r.created_at or accepted_at} for r in records],
+        "audits": [dict(audit) | {"created_at": accepted_at} for audit in audits],
+    }
+    return {"payload": json.dumps(payload, ensure_ascii=False)}
+
+
+def ensure_group(client: redis.Redis, stream: str) -> None:
+    try:
+        client.xgroup_create(stream, FLUSHER_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+def _decode(entries: list[Any]) -> tuple[list[str], list[MemoryRecord], list[dict[str, object]]]:
+    ids: list[str] = []
+    records: list[MemoryRecord] = []
+    audits: list[dict[str, object]] = []
+    for entry in entries:
+        # XAUTOCLAIM may return nil placeholders for entries deleted meanwhile.
+        if not entry:
+            continue
+        entry_id, fields = entry
+        ids.append(str(entry_id))
+        try:
+            payload = json.loads((fields or {}).get("payload") or "{}")
+            records.extend(MemoryRecord(**m) for m in payload.get("memories") or [])
+            audits.extend(dict(a) for a in payload.get("audits") or [])
+            # Entries written before batches were audited per session.
+            if payload.get("audit"):
+                audits.append(dict(payload["audit"]))
+        except Exception as exc:
+            # Poison entry: ack it with the batch instead of retrying it forever.
+            print(f"[flusher] dropping malformed entry id={entry_id}: {exc}")
+    return ids, records, audits
+
+
+def flush_once(
+    db: Db,
+    client: redis.Redis,
+    embedder: EmbeddingProvider,
+    stream: str,
+    consumer: str,
+    *,
+    count: int = 500,
+    block_ms: int = 1000,
+    claim_idle_ms: int = 30_000,
+) -> int:
+    """Flush up to `count` stream entries in one transaction. Returns entries acked.
+
+    Entries left pending by a crashed consumer are reclaimed first (XAUTOCLAIM), then new
+    entries are read (XREADGROUP).
+    """
+
+    claimed = client.xautoclaim(stream, FLUSHER_GROUP, consumer, min_idle_time=claim_idle_ms, start_id="0-0", count=count)
+    entries: list[Any] = list(claimed[1] or [])
+
+    if len(entries) < count:
+        res = client.xreadgroup(
+            FLUSHER_GROUP,
+            consumer,
+            {stream: ">"},
+            count=count - len(entries),
+            block=(None if entries else block_ms),
+        )
+        for _stream_name, items in res or []:
+            entries.extend(items)
+
+    ids, records, audits = _decode(entries)
+    if not ids:
+        return 0
+
+    with Session(db.engine) as session:
+        insert_memories(session, records, embedder, on_conflict=_IDEMPOTENT)
+        insert_audit_rows(session, audits, on_conflict=_IDEMPOTENT)
+        session.commit()
+
+    pipe = client.pipeline()
+    pipe.xack(stream, FLUSHER_GROUP, *ids)
+    pipe.xdel(stream, *ids)
+    # Rows just became visible to L2 retrieval: invalidate cached query results.
+    for namespace, session_id in {(r.namespace, r.session_id) for r in records}:
+        bump_watermark(pipe, namespace, session_id)
+    pipe.execute()
+    return len(ids)
+
+
+def run_flusher(
+    db: Db,
+    client: redis.Redis,
+    embedder: EmbeddingProvider,
+    stream: str,
+    *,
+    batch_size: int,
+    claim_idle_ms: int,
+) -> None:
+    """Drain the write-behind stream forever (entrypoint: `python flusher.py`)."""
+
+    ensure_group(client, stream)
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"[flusher] consuming stream={stream!r} group={FLUSHER_GROUP!r} consumer={consumer!r}")
+
+    while True:
+        flush_pass(db, client, embedder, stream, consumer, batch_size=batch_size, claim_idle_ms=claim_idle_ms)
+
+
+def flush_pass(
+    db: Db,
+    client: redis.Redis,
+    embedder: EmbeddingProvider,
+    stream: str,
+    consumer: str,
+    *,
+    batch_size: int,
+    claim_idle_ms: int,
+) -> int:
+    """One `run_flusher` iteration: `flush_once`, surviving errors. Returns entries acked."""
+
+    try:
+        flushed = flush_once(db, client, embedder, stream, consumer, count=batch_size, claim_idle_ms=claim_idle_ms)
+        if flushed:
+            print(f"[flusher] flushed entries={flushed}")
+        return flushed
+    except redis.ResponseError as exc:
+        if "NOGROUP" not in str(exc):
+            return _flush_failed(exc)
+        # The stream or its group is gone (Redis restarted without persistence, stream
+        # deleted/trimmed away): recreate the group and read again.
+        print(f"[flusher] consumer group missing, recreating: {exc}")
+        try:
+            ensure_group(client, stream)
+        except Exception as group_exc:
+            return _flush_failed(group_exc)
+        return 0
+    except Exception as exc:
+        return _flush_failed(exc)
+
+
+def _flush_failed(exc: Exception) -> int:
+    # Unacked entries stay pending and are reclaimed on a later pass.
+    print(f"[flusher] flush failed: {type(exc).__name__}: {exc}")
+    time.sleep(1.0)
+    return 0
+
+
+def stream_stats(client: redis.Redis, stream: str) -> WriteBehindStats:
+    """Backlog/lag metrics for `/v1/ops/pipeline`."""
+
+    length = int(client.xlen(stream) or 0)
+    if length == 0:
+        return WriteBehindStats(stream=stream)
+
+    pending = 0
+    try:
+        for g in client.xinfo_groups(stream):
+            if str(g.get("name")) == FLUSHER_GROUP:
+                pending = int(g.get("pending") or 0)
+    except redis.ResponseError:
+        pass
+
+    oldest_age_ms = 0
+    first = client.xrange(stream, "-", "+", count=1)
+    if first:
+        first_ms = int(str(first[0][0]).split("-", 1)[0])
+        oldest_age_ms = max(0, int(time.time() * 1000) - first_ms)
+
+    return WriteBehindStats(
+        stream=stream,
+        length=length,
+        pending=pending,
+        lag=max(0, length - pending),
+        oldest_age_ms=oldest_age_ms,
+    )
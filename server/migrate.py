@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+"""One-off migrations for existing databases.
+
+How to run locally (once after pulling schema changes; safe to re-run, and ingest keeps
+running meanwhile):
+
+  cd server
+  source .venv/bin/activate
+  python migrate.py
+
+Fresh databases get everything from `db/init/*.sql`. The API's startup `ensure_schema` only
+adds missing tables/columns; work that scans or locks `memories` lives here instead of in
+every API process:
+- retrieval indexes, built with CREATE INDEX CONCURRENTLY (`db.build_memory_indexes`)
+- ingest-time features and card buckets of rows written before their columns existed
+  (`ingest.backfill_memory_features`, `ingest.backfill_memory_buckets`; batches claimed with
+  SKIP LOCKED, one UPDATE each)
+"""
+
+from memos_server.db import build_memory_indexes, create_db, ensure_schema
+from memos_server.env import init_env
+from memos_server.ingest import backfill_memory_buckets, backfill_memory_features
+from memos_server.settings import get_settings
+
+
+def main() -> None:
+  init_env()
+
+  settings = get_settings()
+  db = create_db(settings.database_url)
+  ensure_schema(db.engine)
+
+  built = build_memory_indexes(db.engine)
+  print(f"[migrate] indexes built={built or 'none'}")
+  print(f"[migrate] memory features backfilled rows={backfill_memory_features(db.engine)}")
+  print(f"[migrate] memory buckets backfilled rows={backfill_memory_buckets(db.engine)}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+import numpy as np
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+def _clustered(n: int, dim: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(16, dim))
+    return (centers[rng.integers(0, 16, size=n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def _exact_top(vectors: np.ndarray, q: np.ndarray, k: int) -> list[int]:
+    v = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.argsort(-(v @ (q / np.linalg.norm(q))))[:k].tolist()
+
+
+class TestHnswIndex(unittest.TestCase):
+    def _build(self, vectors: np.ndarray, groups=None):  # type: ignore[no-untyped-def]
+        from memos_server.ann_index import HnswIndex
+
+        index = HnswIndex(vectors.shape[1], m=12, ef_construction=80, capacity=8)
+        for i, v in enumerate(vectors):
+            index.add(f"m{i}", v, groups[i] if groups else "s")
+        return index
+
+    def test_recall_against_brute_force(self) -> None:
+        vectors = _clustered(1500, 16)
+        index = self._build(vectors)
+        queries = _clustered(40, 16, seed=11)
+
+        hits = 0
+        for q in queries:
+            truth = {f"m{i}" for i in _exact_top(vectors, q, 10)}
+            got = {label for label, _ in index.search(q, 10, ef=64)}
+            hits += len(truth & got)
+        self.assertGreaterEqual(hits / (10 * len(queries)), 0.9)
+
+    def test_group_filter_and_removal(self) -> None:
+        vectors = _clustered(600, 16)
+        groups = ["a" if i % 3 == 0 else "b" for i in range(len(vectors))]
+        index = self._build(vectors, groups)
+
+        q = vectors[3]
+        # Small group: exact scan; large group threshold forced down: filtered graph search.
+        for brute_force_max in (2048, 0):
+            got = index.search(q, 5, group="a", brute_force_max=brute_force_max)
+            self.assertEqual(len(got), 5)
+            self.assertEqual(got[0][0], "m3")
+            self.assertTrue(all(int(label[1:]) % 3 == 0 for label, _ in got))
+
+        self.assertTrue(index.remove("m3"))
+        self.assertNotIn("m3", index)
+        self.assertNotIn("m3", [label for label, _ in index.search(q, 5, group="a")])
+
+        removed = index.remove_group("a")
+        self.assertEqual(removed, 199)
+        self.assertEqual(index.search(q, 5, group="a"), [])
+        self.assertEqual(len(index), 400)
+
+    def test_duplicate_label_is_ignored(self) -> None:
+        from memos_server.ann_index import HnswIndex
+
+        index = HnswIndex(4)
+        self.assertTrue(index.add("x", np.ones(4)))
+        self.assertFalse(index.add("x", np.ones(4)))
+        self.assertEqual(len(index), 1)
+        with self.assertRaises(ValueError):
+            index.add("y", np.ones(3))
+
+    def test_snapshot_round_trip(self) -> None:
+        from memos_server.ann_index import HnswIndex
+
+        vectors = _clustered(300, 8)
+        index = self._build(vectors, ["a" if i % 2 else "b" for i in range(len(vectors))])
+        index.remove("m1")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ns.npz")
+            index.save(path, meta={"watermark": "2026-01-01T00:00:00+00:00"})
+            loaded, header = HnswIndex.load(path)
+
+        self.assertEqual(header["watermark"], "2026-01-01T00:00:00+00:00")
+        self.assertEqual(len(loaded), len(index))
+        self.assertNotIn("m1", loaded)
+        for q in vectors[:10]:
+            self.assertEqual(loaded.search(q, 5, ef=32), index.search(q, 5, ef=32))
+            self.assertEqual(
+                loaded.search(q, 5, group="a", brute_force_max=0),
+                index.search(q, 5, group="a", brute_force_max=0),
+            )
+
+
+class TestFetchHotHits(unittest.TestCase):
+    def test_keeps_index_order_and_falls_back_when_short(self) -> None:
+        from memos_server.retrieval import STRATEGY_HOT, fetch_hot_hits
+
+        class _Session:
+            def __init__(self, present: set[str]) -> None:
+                self.present = present
+
+            def execute(self, _stmt, params):  # type: ignore[no-untyped-def]
+                rows = [{"id": i, "text": f"t-{i}", "role": "user"} for i in params["ids"] if i in self.present]
+
+                class _R:
+                    def mappings(self):  # type: ignore[no-untyped-def]
+                        return self
+
+                    def all(self):  # type: ignore[no-untyped-def]
+                        return list(reversed(rows))
+
+                return _R()
+
+        hits = [("a", 0.9), ("b", 0.8), ("c", 0.7)]
+        result = fetch_hot_hits(_Session({"a", "b", "c"}), "ns", "s", hits, 2)
+        assert result is not None
+        self.assertEqual(result.strategy_used, STRATEGY_HOT)
+        self.assertEqual([r["id"] for r in result.rows], ["a", "b"])
+        self.assertEqual(result.rows[0]["score"], 0.9)
+
+        # A hit deleted in Postgres leaves the session short: caller falls back to SQL.
+        self.assertIsNone(fetch_hot_hits(_Session({"a"}), "ns", "s", hits, 2))
+        self.assertIsNone(fetch_hot_hits(_Session({"a", "b", "c"}), "ns", "s", hits, 5))
+
+
+
+class TestHotIndexBudget(unittest.TestCase):
+    def _manager(self, budget: int, namespaces: dict[str, int]):  # type: ignore[no-untyped-def]
+        from memos_server.ann_index import HnswIndex
+        from memos_server.hot_index import HotIndexManager, _NamespaceIndex
+
+        manager = HotIndexManager(
+            None,  # type: ignore[arg-type]
+            namespaces=list(namespaces),
+            dim=8,
+            vector_space="fake:v1:8",
+            memory_budget_bytes=budget,
+        )
+        snapshots: list[tuple[str, bool]] = []
+        # Records whether the lock was held while writing the snapshot.
+        manager._snapshot = lambda ns, state: snapshots.append((ns, manager._lock.locked()))  # type: ignore[method-assign]
+        for i, (ns, n) in enumerate(namespaces.items()):
+            index = HnswIndex(8)
+            for j, v in enumerate(_clustered(n, 8, seed=i)):
+                index.add(f"{ns}{j}", v, "s")
+            manager._states[ns] = _NamespaceIndex(index=index, watermark=None, last_used=float(i))
+        manager._wanted.clear()  # initial loads done
+        return manager, snapshots
+
+    def test_coldest_namespace_is_evicted_outside_the_lock(self) -> None:
+        manager, snapshots = self._manager(0, {"cold": 50, "hot": 50})
+        manager.memory_budget_bytes = manager._states["hot"].index.nbytes() + 1
+        manager._enforce_budget(keep="hot")
+        self.assertEqual(list(manager._states), ["hot"])
+        self.assertEqual(snapshots, [("cold", False)])
+        self.assertEqual([s["oversized"] for s in manager.stats()], [False, False])
+
+    def test_single_namespace_over_budget_is_dropped_and_not_reloaded(self) -> None:
+        manager, snapshots = self._manager(1024, {"only": 200})
+        manager._enforce_budget(keep="only")
+        self.assertEqual(manager._states, {})
+        self.assertEqual(snapshots, [("only", False)])
+        # Served from SQL without queueing a reload that would be evicted again.
+        self.assertIsNone(manager.search("only", "s", np.ones(8, dtype=np.float32), 5))
+        self.assertNotIn("only", manager._wanted)
+        self.assertEqual(manager.stats()[0]["oversized"], True)
+
+
+if __name__ == "__main__":
+    unittest.main()
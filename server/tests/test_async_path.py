@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class _Store:
+    """List + hash subset of redis-py (decode_responses=True), shared by both fakes."""
+
+    def __init__(self) -> None:
+        self.lists: dict[str, list[str]] = {}
+        self.hashes: dict[str, dict[str, str]] = {}
+        # Pipelined commands this fake doesn't model (counters, pending ids, watermarks).
+        self.other: list[str] = []
+
+    def lpush(self, key: str, *values: str) -> None:
+        for v in values:
+            self.lists.setdefault(key, []).insert(0, v)
+
+    def ltrim(self, key: str, start: int, end: int) -> None:
+        self.lists[key] = self.lists.get(key, [])[start : end + 1]
+
+    def expire(self, key: str, seconds: int) -> None:
+        pass
+
+    def lrange(self, key: str, start: int, end: int) -> list[str]:
+        return self.lists.get(key, [])[start : end + 1]
+
+    def delete(self, key: str) -> None:
+        self.hashes.pop(key, None)
+
+    def hset(self, key: str, field: str | None = None, value: object = None, mapping: dict[str, str] | None = None) -> None:
+        self.hashes.setdefault(key, {}).update(mapping or {field: str(value)})
+
+    def hgetall(self, key: str) -> dict[str, str]:
+        return dict(self.hashes.get(key, {}))
+
+
+class _SyncRedis(_Store):
+    def pipeline(self, transaction: bool = True):  # type: ignore[no-untyped-def]
+        return self
+
+    def execute(self) -> list[object]:
+        return []
+
+
+class _AsyncRedis:
+    def __init__(self) -> None:
+        self.store = _Store()
+
+    def pipeline(self, transaction: bool = True):  # type: ignore[no-untyped-def]
+        return _AsyncPipeline(self.store)
+
+    async def lrange(self, key: str, start: int, end: int) -> list[str]:
+        return self.store.lrange(key, start, end)
+
+    async def hgetall(self, key: str) -> dict[str, str]:
+        return self.store.hgetall(key)
+
+
+class _AsyncPipeline:
+    def __init__(self, store: _Store) -> None:
+        self._store = store
+        self._ops: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):  # type: ignore[no-untyped-def]
+        return lambda *args, **kwargs: self._ops.append((name, args, kwargs))
+
+    async def execute(self) -> list[object]:
+        for name, args, kwargs in self._ops:
+            if hasattr(self._store, name):
+                getattr(self._store, name)(*args, **kwargs)
+            else:
+                self._store.other.append(name)
+        return []
+
+
+class TestAsyncL1(unittest.TestCase):
+    def test_async_window_matches_sync(self) -> None:
+        from memos_server.l1_redis import L1Redis, append_messages, append_messages_async, get_window, get_window_async
+
+        messages = [("ns", "s1", "user", f"m{i}") for i in range(5)] + [("ns", "s2", "agent", "other")]
+        sync_client = _SyncRedis()
+        append_messages(L1Redis(client=sync_client, window_size=3), messages)  # type: ignore[arg-type]
+
+        async def run() -> list[dict[str, str]]:
+            client = _AsyncRedis()
+            await append_messages_async(client, 3, messages)  # type: ignore[arg-type]
+            return await get_window_async(client, 3, "ns", "s1")  # type: ignore[arg-type]
+
+        window = asyncio.run(run())
+        self.assertEqual(window, get_window(L1Redis(client=sync_client, window_size=3), "ns", "s1"))  # type: ignore[arg-type]
+        self.assertEqual([m["text"] for m in window], ["m2", "m3", "m4"])
+
+
+class TestAsyncSessionState(unittest.TestCase):
+    def test_missing_state_then_stored_fields(self) -> None:
+        from memos_server.session_state import load_state_async, store_state_async
+
+        async def run():  # type: ignore[no-untyped-def]
+            client = _AsyncRedis()
+            missing = await load_state_async(client, "ns", "s1")  # type: ignore[arg-type]
+            stored = await store_state_async(client, "ns", "s1", {"ready": "1", "unsummarized": "3"})  # type: ignore[arg-type]
+            loaded = await load_state_async(client, "ns", "s1")  # type: ignore[arg-type]
+            return missing, stored, loaded
+
+        missing, stored, loaded = asyncio.run(run())
+        self.assertIsNone(missing)
+        self.assertEqual(stored, loaded)
+        self.assertEqual(loaded.unsummarized, 3)
+        self.assertIsNone(loaded.summary_id)
+
+
+
+class _Result:
+    def __init__(self, rows=None, scalar=None) -> None:  # type: ignore[no-untyped-def]
+        self._rows = rows or []
+        self._scalar = scalar
+        self.rowcount = 1
+
+    def scalar(self):  # type: ignore[no-untyped-def]
+        return self._scalar
+
+    def mappings(self):  # type: ignore[no-untyped-def]
+        return self
+
+    def all(self):  # type: ignore[no-untyped-def]
+        return self._rows
+
+
+class _SqlSession:
+    """Sync session behind `run_sync`: a small session (exact scan) and recorded writes."""
+
+    def __init__(self, texts: dict[str, str]) -> None:
+        self.texts = texts
+        self.statements: list[str] = []
+        self.commits = 0
+
+    def execute(self, stmt, params=None):  # type: ignore[no-untyped-def]
+        sql = str(stmt)
+        self.statements.append(sql)
+        if "COUNT(*)" in sql:
+            return _Result(scalar=len(self.texts))
+        if "MATERIALIZED" in sql:
+            rows = [
+                {"id": mid, "role": "user", "token_hashes": None, "token_estimate": 3, "text_length": len(t), "score": 0.9 - i / 10}
+                for i, (mid, t) in enumerate(self.texts.items())
+            ]
+            return _Result(rows=rows[: int(params["k"])])
+        if "SELECT id, text FROM memories" in sql:
+            return _Result(rows=[{"id": mid, "text": t} for mid, t in self.texts.items() if mid in params["ids"]])
+        return _Result()
+
+    def commit(self) -> None:
+        self.commits += 1
+
+
+class _AsyncSession:
+    def __init__(self, sync: _SqlSession) -> None:
+        self.sync = sync
+
+    async def __aenter__(self) -> _AsyncSession:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    async def run_sync(self, fn, *args):  # type: ignore[no-untyped-def]
+        # Like AsyncSession.run_sync: the sync function runs on the event loop thread.
+        return fn(self.sync, *args)
+
+    async def commit(self) -> None:
+        self.sync.commits += 1
+
+
+class _AppRedis(_AsyncRedis):
+    """Async L1 client of the app; the window read only returns once the state read started,
+    so the two must be awaited concurrently."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.state_read = asyncio.Event()
+        # Query cache entries and watermarks.
+        self.strings: dict[str, str] = {}
+
+    async def get(self, key: str) -> str | None:
+        return self.strings.get(key)
+
+    async def set(self, key: str, value: str, ex: int | None = None) -> None:
+        self.strings[key] = value
+
+    async def lrange(self, key: str, start: int, end: int) -> list[str]:
+        await asyncio.wait_for(self.state_read.wait(), timeout=2)
+        return await super().lrange(key, start, end)
+
+    async def hgetall(self, key: str) -> dict[str, str]:
+        self.state_read.set()
+        return await super().hgetall(key)
+
+
+class _LoopCheckingEmbedder:
+    """Delegates to the real provider; records calls made on the event loop thread."""
+
+    def __init__(self, inner) -> None:  # type: ignore[no-untyped-def]
+        self.inner = inner
+        self.name, self.version, self.dim = inner.name, inner.version, inner.dim
+        self.on_loop: list[str] = []
+
+    def _check(self, method: str) -> None:
+        try:
+            asyncio.get_running_loop()
+            self.on_loop.append(method)
+        except RuntimeError:
+            pass
+
+    def embed(self, text: str):  # type: ignore[no-untyped-def]
+        self._check("embed")
+        return self.inner.embed(text)
+
+    def embed_many(self, texts: list[str]):  # type: ignore[no-untyped-def]
+        self._check("embed_many")
+        return self.inner.embed_many(texts)
+
+
+class TestAsyncRequestPath(unittest.TestCase):
+    def _client(self, sql: _SqlSession, aredis: _AppRedis, env: dict[str, str] | None = None, scheduler=None):  # type: ignore[no-untyped-def]
+        import os
+        from types import SimpleNamespace
+        from unittest import mock
+
+        from fastapi.testclient import TestClient
+
+        from memos_server import app as app_module
+        from memos_server.embedding import create_embedder
+
+        embedders: list[_LoopCheckingEmbedder] = []
+
+        def embedder(settings):  # type: ignore[no-untyped-def]
+            embedders.append(_LoopCheckingEmbedder(create_embedder(settings)))
+            return embedders[-1]
+
+        fake_db = SimpleNamespace(engine=None, sessionmaker=lambda: _AsyncSession(sql))
+        env = {"MEMOS_API_ASYNC": "1", "MEMOS_LOAD_DOTENV": "0", **(env or {})}
+        with mock.patch.dict(os.environ, env), mock.patch(
+            "memos_server.async_db.create_async_db", lambda *a, **k: fake_db
+        ), mock.patch.object(app_module, "create_l1_async", lambda url: aredis), mock.patch.object(
+            app_module, "create_embedder", embedder
+        ), mock.patch.object(
+            app_module, "create_scheduler", (lambda *a: scheduler) if scheduler is not None else app_module.create_scheduler
+        ):
+            client = TestClient(app_module.create_app())
+        return client, embedders[0]
+
+    def test_query_fetches_concurrently_and_embeds_off_the_loop(self) -> None:
+        from memos_server.session_state import state_key
+
+        sql = _SqlSession(
+            {"00000000-0000-0000-0000-000000000001": "postgres 5432", "00000000-0000-0000-0000-000000000002": "redis 6379"}
+        )
+        aredis = _AppRedis()
+        aredis.store.lpush("l1:ns:s1", '{"role": "user", "text": "hi"}')
+        state = {"ready": "1", "summary_id": "sum-1", "condensed_text": "card", "unsummarized": "0"}
+        aredis.store.hset(state_key("ns", "s1"), mapping=state)
+        client, embedder = self._client(sql, aredis)
+
+        res = client.post("/v1/query", json={"namespace": "ns", "session_id": "s1", "query": "postgres  端口", "top_k": 2})
+        self.assertEqual(res.status_code, 200, res.text)
+        body = res.json()
+        self.assertEqual([c["text"] for c in body["raw_chunks"]], ["postgres 5432", "redis 6379"])
+        self.assertEqual(body["session_summary_id"], "sum-1")
+        self.assertFalse(body["session_summary_enqueued"])
+        self.assertEqual(embedder.on_loop, [])
+        # QUERY audit + context pack written in the request's session and committed.
+        self.assertTrue(any("INSERT INTO context_packs" in s for s in sql.statements))
+        self.assertTrue(any("INSERT INTO audit_logs" in s for s in sql.statements))
+        self.assertEqual(sql.commits, 1)
+
+    def test_cache_hits_retry_a_deferred_refresh(self) -> None:
+        from types import SimpleNamespace
+        from unittest import mock
+
+        from memos_server import app as app_module
+        from memos_server.backpressure import LEVEL_DEFERRED, LEVEL_NORMAL, Pressure
+        from memos_server.queue import LANE_BULK
+        from memos_server.session_state import state_key
+
+        sql = _SqlSession({"00000000-0000-0000-0000-000000000001": "postgres 5432"})
+        aredis = _AppRedis()
+        state = {"ready": "1", "summary_id": "sum-1", "condensed_text": "card", "unsummarized": "9"}
+        aredis.store.hset(state_key("ns", "s1"), mapping=state)
+        requested: list[str] = []
+        scheduler = SimpleNamespace(
+            lane_for=lambda reason: LANE_BULK, request=lambda ns, sid, **kw: requested.append(sid) or True
+        )
+        client, _ = self._client(sql, aredis, env={"MEMOS_QUERY_CACHE_ENABLED": "1"}, scheduler=scheduler)
+        body = {"namespace": "ns", "session_id": "s1", "query": "postgres", "top_k": 1}
+
+        with mock.patch.object(app_module.QueueBackpressure, "current", lambda self: Pressure(LEVEL_DEFERRED, 5000, 40)):
+            first = client.post("/v1/query", json=body).json()
+        self.assertTrue(first["session_summary_deferred"])
+        self.assertEqual(requested, [])
+
+        # Queues drained: the cached response is served and the refresh enqueued now.
+        with mock.patch.object(app_module.QueueBackpressure, "current", lambda self: Pressure(LEVEL_NORMAL, 0, 4)):
+            second = client.post("/v1/query", json=body).json()
+        self.assertTrue(second["cache_hit"])
+        self.assertEqual((second["session_summary_deferred"], second["session_summary_enqueued"]), (False, True))
+        self.assertEqual(requested, ["s1"])
+
+    def test_ingest_batch_writes_and_publishes(self) -> None:
+        sql = _SqlSession({})
+        aredis = _AppRedis()
+        client, embedder = self._client(sql, aredis)
+
+        items = [{"namespace": "ns", "session_id": "s1", "role": "user", "text": f"m{i}"} for i in range(3)]
+        res = client.post("/v1/ingest/batch", json={"items": items})
+        self.assertEqual(res.status_code, 200, res.text)
+        self.assertEqual(res.json()["accepted"], 3)
+        self.assertEqual(embedder.on_loop, [])
+        self.assertEqual(len(aredis.store.lists), 1)
+        self.assertEqual(len(next(iter(aredis.store.lists.values()))), 3)
+        self.assertTrue(any("INSERT INTO memories" in s for s in sql.statements))
+        self.assertEqual(sql.commits, 1)
+        # Unsummarized counter, pending ids and the query-cache watermark in one pipeline.
+        self.assertTrue({"hincrby", "zadd", "incr"} <= set(aredis.store.other))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+def _backpressure(depth, cache_ms: int = 60_000):  # type: ignore[no-untyped-def]
+    from memos_server.backpressure import QueueBackpressure
+
+    return QueueBackpressure(
+        depth,
+        base_min_new_messages=4,
+        max_min_new_messages=40,
+        soft_depth=100,
+        hard_depth=1000,
+        cache_ms=cache_ms,
+    )
+
+
+class TestQueueBackpressure(unittest.TestCase):
+    def test_threshold_scales_with_depth_until_hard_limit(self) -> None:
+        from memos_server.backpressure import LEVEL_DEFERRED, LEVEL_ELEVATED, LEVEL_NORMAL
+
+        bp = _backpressure(lambda: 0)
+        self.assertEqual(bp.pressure_at(99).level, LEVEL_NORMAL)
+        self.assertEqual(bp.pressure_at(99).min_new_messages, 4)
+        self.assertEqual((bp.pressure_at(100).level, bp.pressure_at(100).min_new_messages), (LEVEL_ELEVATED, 8))
+        self.assertEqual(bp.pressure_at(350).min_new_messages, 16)
+        # Capped at the batch size: one job folds at most that many messages.
+        self.assertEqual(bp.pressure_at(999).min_new_messages, 40)
+        self.assertEqual(bp.pressure_at(1000).level, LEVEL_DEFERRED)
+
+    def test_depth_is_read_once_per_interval(self) -> None:
+        reads: list[int] = []
+
+        def depth() -> int:
+            reads.append(1)
+            return 250
+
+        bp = _backpressure(depth)
+        for _ in range(50):
+            self.assertEqual(bp.current().depth, 250)
+        self.assertEqual(len(reads), 1)
+
+        bp = _backpressure(depth, cache_ms=0)
+        bp.current()
+        time.sleep(0.001)
+        bp.current()
+        self.assertEqual(len(reads), 3)
+
+    def test_failed_read_keeps_last_level(self) -> None:
+        from memos_server.backpressure import LEVEL_DEFERRED
+
+        depths: list[object] = [5000, RuntimeError("redis down"), RuntimeError("redis down")]
+
+        def depth() -> int:
+            value = depths.pop(0)
+            if isinstance(value, Exception):
+                raise value
+            return int(value)  # type: ignore[call-overload]
+
+        bp = _backpressure(depth, cache_ms=0)
+        self.assertEqual(bp.current().level, LEVEL_DEFERRED)
+        time.sleep(0.001)
+        self.assertEqual(bp.current().level, LEVEL_DEFERRED)
+        time.sleep(0.001)
+        stats = bp.stats()
+        self.assertEqual((stats.level, stats.depth_errors), (LEVEL_DEFERRED, 2))
+
+    def test_slow_read_does_not_block_other_requests(self) -> None:
+        import threading
+
+        from memos_server.backpressure import LEVEL_NORMAL
+
+        started, release = threading.Event(), threading.Event()
+
+        def depth() -> int:
+            started.set()
+            self.assertTrue(release.wait(timeout=5))
+            return 5000
+
+        bp = _backpressure(depth)
+        reader = threading.Thread(target=bp.current)
+        reader.start()
+        self.assertTrue(started.wait(timeout=5))
+        # The read is in flight: others get the cached level at once instead of waiting.
+        self.assertEqual(bp.current().level, LEVEL_NORMAL)
+        self.assertEqual(bp.stats().queue_depth, 0)
+        release.set()
+        reader.join(timeout=5)
+        self.assertEqual(bp.current().depth, 5000)
+
+    def test_disabled_limits_never_read_depth(self) -> None:
+        from memos_server.backpressure import LEVEL_NORMAL, QueueBackpressure
+
+        def depth() -> int:
+            raise AssertionError("depth read")
+
+        bp = QueueBackpressure(depth, base_min_new_messages=4, max_min_new_messages=40, soft_depth=0, hard_depth=0, cache_ms=0)
+        self.assertEqual(bp.current().level, LEVEL_NORMAL)
+        self.assertEqual(bp.current().min_new_messages, 4)
+
+
+class TestQueueDepth(unittest.TestCase):
+    def test_counts_jobs_and_batched_sessions_of_every_queue(self) -> None:
+        from types import SimpleNamespace
+
+        from test_scheduler import _FakeRedis
+
+        from memos_server.queue import Queues
+        from memos_server.scheduler import batch_key, queue_depth
+
+        client = _FakeRedis()
+        legacy = SimpleNamespace(name="condensation", key="rq:queue:condensation")
+        shards = tuple(SimpleNamespace(name=f"condensation:{i}", key=f"rq:queue:condensation:{i}") for i in range(2))
+        client.rpush(legacy.key, "job-a")
+        client.rpush(shards[1].key, "job-b", "job-c")
+        client.rpush(batch_key("condensation:0"), "[]", "[]")
+        self.assertEqual(queue_depth(client, Queues(legacy, shards)), 5)  # type: ignore[arg-type]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class _Result:
+    def __init__(self, rowcount: int) -> None:
+        self.rowcount = rowcount
+
+
+class _RecordingSession:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, dict[str, object]]] = []
+
+    def execute(self, stmt, params):  # type: ignore[no-untyped-def]
+        self.calls.append((str(stmt), dict(params)))
+        return _Result(sum(1 for k in params if k.startswith("id_")))
+
+
+class TestBulkInsert(unittest.TestCase):
+    def test_single_statement_for_small_batches(self) -> None:
+        from memos_server.db import bulk_insert
+
+        session = _RecordingSession()
+        rows = [{"id": str(i), "details": "{}"} for i in range(5)]
+        inserted = bulk_insert(session, "audit_logs", rows, casts={"details": "jsonb"})  # type: ignore[arg-type]
+
+        self.assertEqual(inserted, 5)
+        self.assertEqual(len(session.calls), 1)
+        sql, params = session.calls[0]
+        self.assertIn("INSERT INTO audit_logs (id, details) VALUES", sql)
+        self.assertIn("CAST(:details_4 AS jsonb)", sql)
+        self.assertEqual(len(params), 10)
+
+    def test_chunks_by_param_budget(self) -> None:
+        from memos_server.db import bulk_insert
+
+        session = _RecordingSession()
+        rows = [{"id": str(i), "text": "x"} for i in range(7)]
+        inserted = bulk_insert(session, "memories", rows, max_params=6)  # type: ignore[arg-type]
+
+        self.assertEqual(inserted, 7)
+        self.assertEqual(len(session.calls), 3)
+
+    def test_empty_is_noop(self) -> None:
+        from memos_server.db import bulk_insert
+
+        session = _RecordingSession()
+        self.assertEqual(bulk_insert(session, "memories", []), 0)  # type: ignore[arg-type]
+        self.assertEqual(session.calls, [])
+
+
+class TestFeatureBackfill(unittest.TestCase):
+    def test_one_update_per_batch(self) -> None:
+        from memos_server.ingest import memory_features, store_memory_features
+
+        session = _RecordingSession()
+        rows = [{"id": f"00000000-0000-0000-0000-00000000000{i}", "text": f"postgres 5432 第{i}次"} for i in range(3)]
+        store_memory_features(session, rows)  # type: ignore[arg-type]
+
+        self.assertEqual(len(session.calls), 1)
+        sql, params = session.calls[0]
+        self.assertIn("FROM unnest(", sql)
+        self.assertEqual(params["ids"], [r["id"] for r in rows])
+        expected = memory_features(rows[1]["text"])
+        self.assertEqual(params["lexical"][1], expected["lexical"])  # type: ignore[index]
+        self.assertEqual(params["token_hashes"][1], "{" + ",".join(map(str, expected["token_hashes"])) + "}")  # type: ignore[index,arg-type]
+        self.assertEqual(params["text_length"], [len(r["text"]) for r in rows])
+
+
+class TestBatchAuditSummary(unittest.TestCase):
+    def test_single_session_scope(self) -> None:
+        from memos_server.ingest import new_memory, summarize_batch
+
+        records = [new_memory("ns", "s1", "user", f"m{i}") for i in range(3)]
+        [(namespace, session_id, details)] = summarize_batch(records)
+        self.assertEqual((namespace, session_id), ("ns", "s1"))
+        self.assertEqual((details["count"], details["batch_count"]), (3, 3))
+        self.assertEqual(details["memory_ids"], [r.id for r in records])
+
+    def test_one_row_per_session(self) -> None:
+        from memos_server.ingest import new_memory, summarize_batch
+
+        records = [new_memory("a", "s1", "user", "x"), new_memory("b", "s2", "agent", "y"), new_memory("a", "s1", "agent", "z")]
+        rows = summarize_batch(records)
+        # Every row carries its real namespace, so namespace-filtered audit queries see it.
+        self.assertEqual([(ns, sid, d["count"]) for ns, sid, d in rows], [("a", "s1", 2), ("b", "s2", 1)])
+        self.assertEqual(rows[0][2]["memory_ids"], [records[0].id, records[2].id])
+        self.assertEqual({d["batch_id"] for _, _, d in rows}, {rows[0][2]["batch_id"]})
+        self.assertEqual({d["batch_count"] for _, _, d in rows}, {3})
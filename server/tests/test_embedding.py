@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+def _cos(a, b) -> float:  # type: ignore[no-untyped-def]
+    import numpy as np
+
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+class TestFakeEmbeddings(unittest.TestCase):
+    def test_vectorized_is_bit_identical(self) -> None:
+        import numpy as np
+
+        from memos_server.embedding import fake_embedding, fake_embeddings
+
+        texts = ["", "redis", "端口 6379", "x" * 5000]
+        for dim in (1, 15, 16, 32, 48, 100):
+            fast = fake_embeddings(texts, dim)
+            slow = np.array([fake_embedding(t, dim) for t in texts])
+            self.assertEqual(fast.shape, (len(texts), dim))
+            self.assertTrue(np.array_equal(fast, slow), f"dim={dim}")
+
+    def test_empty_batch(self) -> None:
+        from memos_server.embedding import fake_embeddings
+
+        self.assertEqual(fake_embeddings([], 32).shape, (0, 32))
+
+
+class TestEmbeddingProviders(unittest.TestCase):
+    def test_hash_provider_matches_fake_embedding(self) -> None:
+        import numpy as np
+
+        from memos_server.embedding import HashEmbeddingProvider, fake_embedding
+
+        provider = HashEmbeddingProvider(dim=48)
+        out = provider.embed_many(["a", "b"])
+        self.assertEqual(out.shape, (2, 48))
+        self.assertEqual(out.dtype, np.float32)
+        np.testing.assert_array_equal(out[1], np.asarray(fake_embedding("b", 48), dtype=np.float32))
+
+    def test_hashed_projection_is_normalized_and_lexical(self) -> None:
+        import numpy as np
+
+        from memos_server.embedding import HashedProjectionEmbeddingProvider
+
+        provider = HashedProjectionEmbeddingProvider(dim=64)
+        q, near, far, cjk_q, cjk_near = provider.embed_many(
+            [
+                "what port does redis use?",
+                "redis port 6379",
+                "前端面板改名为 Context Inspector",
+                "postgres 端口冲突",
+                "本机 postgres 占用 5432 端口",
+            ]
+        )
+        self.assertAlmostEqual(float(np.linalg.norm(q)), 1.0, places=5)
+        self.assertGreater(_cos(q, near), _cos(q, far))
+        self.assertGreater(_cos(cjk_q, cjk_near), _cos(cjk_q, far))
+        # Deterministic across calls.
+        np.testing.assert_array_equal(provider.embed("redis port 6379"), near)
+
+    def test_featureless_text_falls_back_to_hash_vector(self) -> None:
+        import numpy as np
+
+        from memos_server.embedding import HashedProjectionEmbeddingProvider
+
+        vec = HashedProjectionEmbeddingProvider(dim=16).embed("?!")
+        self.assertTrue(np.any(vec != 0.0))
+
+    def test_parallel_matches_serial(self) -> None:
+        import numpy as np
+
+        from memos_server.embedding import HashedProjectionEmbeddingProvider, ParallelEmbeddingProvider
+
+        inner = HashedProjectionEmbeddingProvider(dim=32)
+        parallel = ParallelEmbeddingProvider(inner=inner, workers=2, min_batch=4)
+        texts = [f"message {i} about redis 端口 {i % 7}" for i in range(9)]
+        np.testing.assert_array_equal(parallel.embed_many(texts), inner.embed_many(texts))
+        self.assertEqual((parallel.name, parallel.dim), (inner.name, inner.dim))
+
+    def test_create_embedder_rejects_unknown_provider(self) -> None:
+        from memos_server.embedding import create_embedder
+        from memos_server.settings import Settings
+
+        with self.assertRaises(ValueError):
+            create_embedder(Settings(embedding_provider="nope"))
+        embedder = create_embedder(Settings(embedding_provider="hashed_projection", embedding_dim=24, embedding_workers=1))
+        self.assertEqual(embedder.dim, 24)
+
+    def test_process_pool_is_opt_in(self) -> None:
+        from memos_server.embedding import ParallelEmbeddingProvider, create_embedder
+        from memos_server.settings import Settings
+
+        for workers in (None, 0, 1):
+            extra = {} if workers is None else {"embedding_workers": workers}
+            embedder = create_embedder(Settings(embedding_cache_size=0, **extra))
+            self.assertNotIsInstance(embedder, ParallelEmbeddingProvider)
+        embedder = create_embedder(Settings(embedding_cache_size=0, embedding_workers=3))
+        self.assertIsInstance(embedder, ParallelEmbeddingProvider)
+        self.assertEqual(embedder.workers, 3)  # type: ignore[attr-defined]
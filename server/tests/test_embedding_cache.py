@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class _CountingProvider:
+    name = "count"
+    version = "v1"
+    dim = 4
+
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def embed(self, text: str):  # type: ignore[no-untyped-def]
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts):  # type: ignore[no-untyped-def]
+        import numpy as np
+
+        self.calls.append(list(texts))
+        return np.array([[len(t), 1.0, 2.0, 3.0] for t in texts], dtype=np.float32)
+
+
+class _DictRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+
+    def mget(self, keys):  # type: ignore[no-untyped-def]
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction: bool = True):  # type: ignore[no-untyped-def]
+        return self
+
+    def set(self, key, value, ex=None):  # type: ignore[no-untyped-def]
+        self.data[key] = value
+
+    def execute(self) -> None:
+        return None
+
+
+class TestLruCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self) -> None:
+        from memos_server.embedding_cache import LruCache
+
+        cache: LruCache[str, int] = LruCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+
+
+class TestCachedEmbeddingProvider(unittest.TestCase):
+    def test_local_hits_and_in_batch_dedup(self) -> None:
+        from memos_server.embedding_cache import CachedEmbeddingProvider
+
+        inner = _CountingProvider()
+        cached = CachedEmbeddingProvider(inner, maxsize=16)
+        first = cached.embed_many(["redis", "port", "redis"])
+        second = cached.embed_many(["port", "redis"])
+
+        self.assertEqual(inner.calls, [["redis", "port"]])
+        self.assertEqual(first[0].tolist(), second[1].tolist())
+        stats = cached.cache_stats()
+        self.assertEqual((stats.local_hits, stats.misses), (2, 2))
+
+    def test_shared_level_serves_other_processes(self) -> None:
+        from memos_server.embedding_cache import CachedEmbeddingProvider
+
+        shared = _DictRedis()
+        CachedEmbeddingProvider(_CountingProvider(), maxsize=16, shared=shared).embed("what port does redis use?")  # type: ignore[arg-type]
+
+        inner = _CountingProvider()
+        other = CachedEmbeddingProvider(inner, maxsize=16, shared=shared)  # type: ignore[arg-type]
+        vec = other.embed("what port does redis use?")
+        self.assertEqual(inner.calls, [])
+        self.assertEqual(vec.tolist(), [25.0, 1.0, 2.0, 3.0])
+        self.assertEqual(other.cache_stats().shared_hits, 1)
+
+    def test_key_includes_provider_version_and_dim(self) -> None:
+        from memos_server.embedding_cache import CachedEmbeddingProvider
+
+        key = CachedEmbeddingProvider(_CountingProvider(), maxsize=1).cache_key("x")
+        self.assertTrue(key.startswith("memos:emb:count:v1:4:"))
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from dataclasses import replace
+import os
+import sys
+from pathlib import Path
+import unittest
+import uuid
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+@unittest.skipUnless(os.getenv("MEMOS_INTEGRATION_TESTS") == "1", "set MEMOS_INTEGRATION_TESTS=1 to run")
+class TestIntegrationDb(unittest.TestCase):
+    """Runs the condensation SQL against the Postgres of `MEMOS_DATABASE_URL`."""
+
+    def setUp(self) -> None:
+        from sqlalchemy import text
+        from sqlalchemy.exc import OperationalError
+        from sqlalchemy.orm import Session
+
+        from memos_server.db import create_db, ensure_schema
+        from memos_server.embedding import create_embedder
+        from memos_server.settings import get_settings
+
+        settings = get_settings()
+        self.db = create_db(settings.database_url)
+        self.embedder = create_embedder(settings)
+        try:
+            ensure_schema(self.db.engine, embedding_dim=self.embedder.dim)
+        except OperationalError as exc:
+            self.db.engine.dispose()
+            self.skipTest(f"Postgres not reachable: {exc.orig}")
+        self.namespace = f"it-{uuid.uuid4().hex[:8]}"
+
+        def cleanup() -> None:
+            with Session(self.db.engine) as session:
+                session.execute(text("DELETE FROM memories WHERE namespace = :ns"), {"ns": self.namespace})
+                session.execute(text("DELETE FROM condensations WHERE namespace = :ns"), {"ns": self.namespace})
+                session.commit()
+            self.db.engine.dispose()
+
+        self.addCleanup(cleanup)
+
+    def _insert_seed(self) -> tuple[list[str], list[tuple[str, str]]]:
+        from sqlalchemy import text
+        from sqlalchemy.orm import Session
+
+        from memos_server.demo_seed import get_demo_seed_messages_zh
+        from memos_server.ingest import insert_memories, new_memory
+
+        seed = get_demo_seed_messages_zh()
+        records = [
+            replace(new_memory(self.namespace, "s1", role, text_value), created_at=f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}+00:00")
+            for i, (role, text_value) in enumerate(seed)
+        ]
+        with Session(self.db.engine) as session:
+            insert_memories(session, records, self.embedder)
+            # Every other row as written before `buckets` existed.
+            session.execute(
+                text("UPDATE memories SET buckets = NULL WHERE id = ANY(CAST(:ids AS uuid[]))"),
+                {"ids": [r.id for r in records[1::2]]},
+            )
+            session.commit()
+        return [r.id for r in records], seed
+
+    def test_scan_messages_aggregates_stored_buckets(self) -> None:
+        from sqlalchemy.orm import Session
+
+        from memos_server.condensation import (
+            _fetch_messages,
+            condense_card,
+            scan_messages,
+            snapshot_input,
+            structured_condense,
+        )
+
+        ids, seed = self._insert_seed()
+        with Session(self.db.engine) as session:
+            messages = _fetch_messages(session, ids)
+            self.assertEqual([m["id"] for m in messages], ids)
+            scans = scan_messages(session, {(self.namespace, "s1"): messages})
+            session.commit()
+
+        card = condense_card(snapshot_input(messages, None, None, scans[(self.namespace, "s1")]))[0]
+        self.assertEqual(card, structured_condense("\n".join(f"[{r}] {t}" for r, t in seed)))
+
+    def test_backfill_enriches_rows_without_buckets(self) -> None:
+        from sqlalchemy import text
+        from sqlalchemy.orm import Session
+
+        from memos_server.ingest import backfill_memory_buckets
+
+        self._insert_seed()
+        self.assertGreater(backfill_memory_buckets(self.db.engine, batch_size=3), 0)
+        with Session(self.db.engine) as session:
+            missing = session.execute(
+                text("SELECT count(*) FROM memories WHERE namespace = :ns AND buckets IS NULL"),
+                {"ns": self.namespace},
+            ).scalar()
+        self.assertEqual(missing, 0)
+
+    def test_backlog_sharing_created_at_is_folded_completely(self) -> None:
+        from sqlalchemy.orm import Session
+
+        from test_scheduler import _FakeQueue, _FakeRedis, _scheduler
+
+        from memos_server.condensation import count_unsummarized_rows
+        from memos_server.ingest import insert_memories, new_memory
+        from memos_server.scheduler import fold_backlog
+
+        # One multi-row insert: every row gets the transaction's now().
+        records = [new_memory(self.namespace, "s1", "user", f"message {i}") for i in range(100)]
+        with Session(self.db.engine) as session:
+            insert_memories(session, records, self.embedder)
+            session.commit()
+
+        client = _FakeRedis()
+        with Session(self.db.engine) as session:
+            out = fold_backlog(
+                session,
+                client,  # type: ignore[arg-type]
+                _scheduler(client, _FakeQueue()),
+                self.namespace,
+                "s1",
+                [],
+                max_batch=30,
+                catchup_batches=1,
+                trigger_reason="new_messages_threshold",
+                trigger_details={},
+            )
+            remaining = count_unsummarized_rows(session, self.namespace, "s1", out.results[-1].condensation_id)
+
+        self.assertEqual([len(r.memory_ids) for r in out.results], [30, 30, 30, 10])
+        self.assertEqual(sorted(m for r in out.results for m in r.memory_ids), sorted(r.id for r in records))
+        self.assertEqual(remaining, 0)
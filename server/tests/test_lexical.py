@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class TestTokenizer(unittest.TestCase):
+    def test_cjk_unigrams_and_bigrams(self) -> None:
+        from memos_server.lexical import tokenize
+
+        self.assertEqual(tokenize("用Redis缓存"), ["用", "redis", "缓", "存", "缓存"])
+        self.assertEqual(tokenize("记忆系统"), ["记", "忆", "系", "统", "记忆", "忆系", "系统"])
+        self.assertEqual(tokenize("!!!"), [])
+
+    def test_overlap_matches_chinese_text(self) -> None:
+        from memos_server.app import _score_overlap  # type: ignore
+
+        self.assertGreater(_score_overlap("缓存", "我们用 Redis 做缓存"), 0.0)
+        self.assertAlmostEqual(_score_overlap("缓存", "数据库"), 0.0)
+
+    def test_tsvector_literal_quotes_and_positions(self) -> None:
+        from memos_server.lexical import tsquery_literal, tsvector_literal
+
+        self.assertEqual(tsvector_literal("redis it's redis"), "'redis':1,4 'it':2 's':3")
+        self.assertEqual(tsvector_literal(""), "")
+        self.assertEqual(tsquery_literal("Redis redis 缓存"), "'redis' | '缓' | '存' | '缓存'")
+        self.assertIsNone(tsquery_literal("???"))
+
+
+class TestRerankFeatures(unittest.TestCase):
+    def test_hash_overlap_matches_text_overlap(self) -> None:
+        from memos_server.app import _score_overlap, _score_overlap_hashes  # type: ignore
+        from memos_server.lexical import token_hashes
+
+        cases = [("redis postgres", "redis://127.0.0.1"), ("缓存 策略", "我们用 Redis 做缓存"), ("a", "")]
+        for query, candidate in cases:
+            self.assertAlmostEqual(
+                _score_overlap_hashes(set(token_hashes(query)), token_hashes(candidate)),
+                _score_overlap(query, candidate),
+            )
+
+    def test_memory_features(self) -> None:
+        from memos_server.condensation import estimate_tokens
+        from memos_server.ingest import memory_features
+
+        text_value = "Redis 缓存" * 100
+        features = memory_features(text_value)
+        self.assertEqual(features["text_length"], len(text_value))
+        self.assertEqual(features["token_estimate"], estimate_tokens(text_value))
+        hashes = features["token_hashes"]
+        self.assertEqual(hashes, sorted(set(hashes)))  # type: ignore[arg-type]
+        self.assertTrue(all(-(2**31) <= h < 2**31 for h in hashes))  # type: ignore[union-attr]
+
+
+class TestRrfFuse(unittest.TestCase):
+    def test_lexical_only_hit_is_recalled(self) -> None:
+        from memos_server.retrieval import rrf_fuse
+
+        vector = [{"id": "a", "score": 0.9}, {"id": "b", "score": 0.8}, {"id": "c", "score": 0.7}]
+        lexical = [{"id": "z", "score": 0.1, "lexical_score": 0.5}, {"id": "b", "score": 0.8, "lexical_score": 0.2}]
+
+        fused = rrf_fuse([vector, lexical], 3, rrf_k=60)
+        ids = [r["id"] for r in fused]
+        # "b" is in both lists; "z" was missed by the vector side but still makes the cut.
+        self.assertEqual(ids[0], "b")
+        self.assertIn("z", ids)
+        self.assertEqual(len(fused), 3)
+        self.assertAlmostEqual(fused[0]["rrf_score"], 1 / 62 + 1 / 62)
+
+
+if __name__ == "__main__":
+    unittest.main()
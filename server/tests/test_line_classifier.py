@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class TestLineClassifier(unittest.TestCase):
+    def test_line_is_assigned_to_all_its_buckets(self) -> None:
+        from memos_server.line_classifier import LineClassifier
+
+        classify = LineClassifier().classify
+        self.assertEqual(
+            classify("踩坑：本机 postgres 占用 5432"),
+            [("risks", "踩坑：本机 postgres 占用 5432"), ("facts", "postgres port 5432")],
+        )
+        self.assertEqual(classify("决策：用 A；用 B"), [("decisions", "用 A"), ("decisions", "用 B")])
+        self.assertEqual(classify("`docker compose up`"), [("actions", "docker compose up")])
+        self.assertEqual(classify("不要提交"), [("constraints", "不要提交")])
+        self.assertEqual(classify("just chatting"), [])
+
+    def test_overlapping_and_case_sensitive_keywords(self) -> None:
+        from memos_server.line_classifier import LineClassifier
+
+        classify = LineClassifier().classify
+        memos = ("facts", "Project: MemOS (agent memory / context governance)")
+        # "memos" (any case) and "MemOS" (exact case) start at the same position.
+        self.assertEqual(classify("MemOS is the project"), [memos])
+        self.assertEqual(classify("memos 我们在做"), [memos])
+        self.assertEqual(classify("MEMOS is the project"), [])
+        # "memos_server.app" hides the shorter "memos" at the same position.
+        self.assertIn(("facts", "api port 8000"), classify("uvicorn MEMOS_SERVER.APP --port 8000"))
+        # "pitfall" is case-sensitive, like the old substring check.
+        self.assertEqual(classify("Pitfall: none"), [])
+
+    def test_rules_extend_from_json(self) -> None:
+        from memos_server.line_classifier import LineClassifier, load_rules
+
+        rules = {
+            "actions": ["kubectl"],
+            "directives": [{"bucket": "decisions", "prefix": "(?:定了)", "kind": "split"}],
+            "markers": [{"bucket": "risks", "any": ["注意："], "ignore_case": False}],
+            "anchors": [{"bucket": "facts", "item": "kafka port 9092", "all": [["kafka"], ["9092"]]}],
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "rules.json"
+            path.write_text(json.dumps(rules, ensure_ascii=False), encoding="utf-8")
+            classify = LineClassifier(load_rules(path)).classify
+
+            self.assertEqual(classify("kubectl get pods"), [("actions", "kubectl get pods")])
+            self.assertEqual(classify("定了：用 Kafka"), [("decisions", "用 Kafka")])
+            self.assertEqual(
+                classify("注意：Kafka 监听 9092"), [("risks", "注意：Kafka 监听 9092"), ("facts", "kafka port 9092")]
+            )
+            # Built-in rules still apply.
+            self.assertEqual(classify("redis 6379"), [("facts", "redis port 6379")])
+
+            path.write_text(json.dumps({"markers": [{"bucket": "nope", "any": ["x"]}]}), encoding="utf-8")
+            with self.assertRaises(ValueError):
+                load_rules(path)
+
+    def test_default_classifier_reads_rules_path_setting(self) -> None:
+        from memos_server.line_classifier import default_classifier
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "rules.json"
+            path.write_text(json.dumps({"actions": ["helm"]}), encoding="utf-8")
+            os.environ["MEMOS_CARD_RULES_PATH"] = str(path)
+            default_classifier.cache_clear()
+            try:
+                self.assertEqual(default_classifier().classify("helm install x"), [("actions", "helm install x")])
+            finally:
+                del os.environ["MEMOS_CARD_RULES_PATH"]
+                default_classifier.cache_clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
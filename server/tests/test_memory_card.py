@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+def _transcript(messages: list[tuple[str, str]]) -> str:
+    return "\n".join(f"[{role}] {text}" for role, text in messages)
+
+
+class TestIncrementalCardMerge(unittest.TestCase):
+    def test_incremental_merge_matches_full_recompute_on_seed(self) -> None:
+        from memos_server.condensation import structured_condense
+        from memos_server.demo_seed import get_demo_seed_messages_zh
+        from memos_server.memory_card import merge_card
+
+        seed = get_demo_seed_messages_zh()
+        full = structured_condense(_transcript(seed))
+
+        for batch in (1, 2, 3, 5, 7, len(seed)):
+            card: str | None = None
+            for i in range(0, len(seed), batch):
+                card = merge_card(card, _transcript(seed[i : i + batch]))
+            self.assertEqual(card, full, f"batch={batch}")
+
+        obj = json.loads(full)
+        self.assertTrue(obj["decisions"])
+        self.assertTrue(obj["constraints"])
+        self.assertIn("raw_excerpt", obj)
+
+    def test_snapshot_chain_matches_full_recompute(self) -> None:
+        from memos_server.condensation import condense_card, snapshot_input, structured_condense
+        from memos_server.demo_seed import get_demo_seed_messages_zh
+
+        messages = [
+            {"id": f"m{i}", "role": role, "text": text, "created_at": ""}
+            for i, (role, text) in enumerate(get_demo_seed_messages_zh())
+        ]
+        prev = None
+        for i in range(0, len(messages), 4):
+            prev, _, _ = condense_card(snapshot_input(messages[i : i + 4], None, prev))
+        self.assertEqual(prev, structured_condense(_transcript([(m["role"], m["text"]) for m in messages])))
+
+    def test_stored_buckets_fold_like_the_transcript(self) -> None:
+        from memos_server.condensation import structured_condense
+        from memos_server.demo_seed import get_demo_seed_messages_zh
+        from memos_server.memory_card import joined_scan, memory_buckets, merge_card
+
+        seed = get_demo_seed_messages_zh()
+        card: str | None = None
+        for i in range(0, len(seed), 3):
+            batch = seed[i : i + 3]
+            # What the aggregation query returns: stored items, first seen first, per bucket.
+            buckets: dict[str, list[str]] = {}
+            for role, text in batch:
+                for name, items in memory_buckets(role, text).items():
+                    buckets.setdefault(name, []).extend(x for x in items if x not in buckets[name])
+            card = merge_card(card, joined_scan([(role, len(text), text[:180]) for role, text in batch], buckets))
+        self.assertEqual(card, structured_condense(_transcript(seed)))
+
+    def test_buckets_are_deduplicated_and_bounded(self) -> None:
+        from memos_server.memory_card import BUCKET_LIMITS, merge_card
+
+        card = merge_card(None, "[user] 决策：用 Redis；用 Postgres")
+        card = merge_card(card, "\n".join(f"[user] 决策：选项 {i}" for i in range(10)) + "\n[user] 决策：用 Redis")
+        decisions = json.loads(card)["decisions"]
+        self.assertEqual(len(decisions), BUCKET_LIMITS["decisions"])
+        self.assertEqual(decisions[:3], ["用 Redis", "用 Postgres", "选项 0"])
+
+    def test_signal_risks_span_batches(self) -> None:
+        from memos_server.memory_card import merge_card
+
+        card = merge_card(None, "[user] 浏览器报 CORS 错误")
+        self.assertNotIn("CORS-like symptom masking backend error (e.g. DB auth / 500)", json.loads(card)["risks"])
+        card = merge_card(card, "[agent] 后端其实返回 500：password authentication failed")
+        risks = json.loads(card)["risks"]
+        self.assertEqual(risks.count("CORS-like symptom masking backend error (e.g. DB auth / 500)"), 1)
+
+    def test_legacy_summaries_are_merged(self) -> None:
+        from memos_server.memory_card import merge_card
+
+        legacy = json.dumps({"schema": "memos.memory_card.v1", "facts": ["postgres port 5432"], "risks": []})
+        obj = json.loads(merge_card(legacy, "[user] 事实：后端 FastAPI"))
+        self.assertEqual(obj["facts"], ["postgres port 5432", "后端 FastAPI"])
+
+        # Plain-text summaries (pre-card rows) are folded in as transcript.
+        obj = json.loads(merge_card("[user] 约束：保留 /v1", "[user] 决策：不接入 LLM"))
+        self.assertEqual(obj["constraints"], ["保留 /v1"])
+        self.assertEqual(obj["decisions"], ["不接入 LLM"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class _Result:
+    def __init__(self, rowcount: int) -> None:
+        self.rowcount = rowcount
+
+
+class _RecordingSession:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, dict[str, object]]] = []
+
+    def execute(self, stmt, params):  # type: ignore[no-untyped-def]
+        self.calls.append((str(stmt), dict(params)))
+        return _Result(sum(1 for k in params if k.startswith("id_")))
+
+
+def _rows(i: int):  # type: ignore[no-untyped-def]
+    from memos_server.audit import audit_row
+    from memos_server.persistence import context_pack_row
+
+    pack = context_pack_row("ns", "s1", f"q{i}", {"schema": "memos.context_pack.v1"}, session_summary_id=None, retrieved_memory_ids=[])
+    return [pack], [audit_row("ns", "s1", "QUERY", {"i": i}), audit_row("ns", "s1", "CONTEXT_PACK", {"context_pack_id": pack["id"]})]
+
+
+class TestPersistenceWriter(unittest.TestCase):
+    def _writer(self, **kwargs):  # type: ignore[no-untyped-def]
+        from memos_server.persistence import PersistenceWriter
+
+        class _Writer(PersistenceWriter):
+            def __init__(self, **kw) -> None:  # type: ignore[no-untyped-def]
+                super().__init__(None, **kw)  # type: ignore[arg-type]
+                self.batches: list[tuple[list[dict[str, object]], list[dict[str, object]]]] = []
+
+            def _write_batch(self, packs, audits):  # type: ignore[no-untyped-def]
+                self.batches.append((packs, audits))
+
+        return _Writer(mode="async", **kwargs)
+
+    def test_background_batches_preserve_order(self) -> None:
+        writer = self._writer(max_queue=100, batch_size=6, flush_interval_ms=20)
+        for i in range(10):
+            writer.submit(_RecordingSession(), *_rows(i))  # type: ignore[arg-type]
+        writer.start()
+        writer.stop()
+
+        queries = [p["query_text"] for packs, _ in writer.batches for p in packs]
+        self.assertEqual(queries, [f"q{i}" for i in range(10)])
+        self.assertGreater(len(writer.batches), 1)
+        self.assertTrue(all(a["created_at"] for _, audits in writer.batches for a in audits))
+
+    def test_full_queue_falls_back_to_request_transaction(self) -> None:
+        writer = self._writer(max_queue=1, batch_size=10, flush_interval_ms=20)
+        session = _RecordingSession()
+        writer.submit(session, *_rows(0))  # type: ignore[arg-type]
+        writer.submit(session, *_rows(1))  # type: ignore[arg-type]
+
+        sqls = [sql for sql, _ in session.calls]
+        self.assertEqual(len(sqls), 2)
+        self.assertIn("INSERT INTO context_packs", sqls[0])
+        self.assertIn("CAST(:pack_0 AS jsonb)", sqls[0])
+        self.assertIn("INSERT INTO audit_logs", sqls[1])
+        self.assertEqual(writer.stats().sync_fallbacks, 1)
+        self.assertEqual(writer.stats().queued, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
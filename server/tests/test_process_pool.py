@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class TestProcessPool(unittest.TestCase):
+    def tearDown(self) -> None:
+        from memos_server.process_pool import shutdown_process_pools
+
+        shutdown_process_pools()
+
+    def test_resize_shuts_the_old_pool_down(self) -> None:
+        from memos_server.process_pool import get_process_pool
+
+        pool = get_process_pool("test", 2)
+        self.assertIs(get_process_pool("test", 2), pool)
+        # Other names are independent.
+        self.assertIsNot(get_process_pool("other", 2), pool)
+
+        resized = get_process_pool("test", 3)
+        self.assertIsNot(resized, pool)
+        with self.assertRaises(RuntimeError):
+            pool.submit(abs, -1)
+        self.assertEqual(resized.submit(abs, -1).result(timeout=60), 1)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class _DictRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+
+    def get(self, key: str):  # type: ignore[no-untyped-def]
+        return self.data.get(key)
+
+    def set(self, key: str, value: str, ex: int | None = None) -> None:
+        self.data[key] = value
+
+    def incr(self, key: str) -> int:
+        self.data[key] = str(int(self.data.get(key) or 0) + 1)
+        return int(self.data[key])
+
+    def pipeline(self, transaction: bool = True):  # type: ignore[no-untyped-def]
+        return self
+
+    def execute(self) -> list[object]:
+        return []
+
+
+class TestQueryCache(unittest.TestCase):
+    def test_key_covers_every_input(self) -> None:
+        from memos_server.query_cache import cache_key
+
+        base = ("ns", "s1", "redis 端口", 6, "vector", "cfg1", 3)
+        key = cache_key(*base)
+        self.assertEqual(key, cache_key(*base))
+        for i, changed in enumerate(["ns2", "s2", "redis", 5, "hybrid", "cfg2", 4]):
+            variant = list(base)
+            variant[i] = changed
+            self.assertNotEqual(key, cache_key(*variant), msg=f"field {i}")
+
+    def test_normalize_query(self) -> None:
+        from memos_server.query_cache import normalize_query
+
+        self.assertEqual(normalize_query("  redis \n\t 端口 "), "redis 端口")
+        # NFC: composed and decomposed forms share a cache entry.
+        self.assertEqual(normalize_query("cafe\u0301"), normalize_query("caf\u00e9"))
+
+    def test_watermark_bump_invalidates(self) -> None:
+        from memos_server.query_cache import QueryCache, bump_watermarks, cache_key
+
+        client = _DictRedis()
+        cache = QueryCache(client, ttl_seconds=60)  # type: ignore[arg-type]
+
+        def key() -> str:
+            return cache_key("ns", "s1", "q", 6, "vector", "cfg", cache.watermark("ns", "s1"))
+
+        cache.put(key(), {"id": "ret-1"})
+        self.assertEqual(cache.get(key()), {"id": "ret-1"})
+
+        bump_watermarks(client, [("ns", "s1"), ("ns", "s1"), ("ns", "other")])  # type: ignore[arg-type]
+        self.assertEqual(cache.watermark("ns", "s1"), 1)
+        self.assertIsNone(cache.get(key()))
+
+
+    def test_redis_errors_bypass_the_cache(self) -> None:
+        import asyncio
+
+        import redis
+
+        from memos_server.query_cache import QueryCache
+
+        class _Down:
+            def get(self, key: str):  # type: ignore[no-untyped-def]
+                raise redis.ConnectionError("down")
+
+        class _AsyncDown:
+            async def get(self, key: str):  # type: ignore[no-untyped-def]
+                raise redis.ConnectionError("down")
+
+        cache = QueryCache(_Down(), ttl_seconds=60, aclient=_AsyncDown())  # type: ignore[arg-type]
+        self.assertIsNone(cache.watermark("ns", "s1"))
+        self.assertIsNone(cache.get("k"))
+        self.assertIsNone(asyncio.run(cache.awatermark("ns", "s1")))
+        self.assertIsNone(asyncio.run(cache.aget("k")))
+        # The async methods need the async client: a clear error, not an assert.
+        with self.assertRaises(RuntimeError):
+            asyncio.run(QueryCache(_Down(), ttl_seconds=60).awatermark("ns", "s1"))  # type: ignore[arg-type]
+
+
+if __name__ == "__main__":
+    unittest.main()
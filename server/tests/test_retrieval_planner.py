@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class _Result:
+    def __init__(self, rows=None, scalar=None) -> None:  # type: ignore[no-untyped-def]
+        self._rows = rows or []
+        self._scalar = scalar
+
+    def scalar(self):  # type: ignore[no-untyped-def]
+        return self._scalar
+
+    def mappings(self):  # type: ignore[no-untyped-def]
+        return self
+
+    def all(self):  # type: ignore[no-untyped-def]
+        return self._rows
+
+
+class _Bind:
+    url = "postgresql+psycopg://fake/planner"
+
+
+class _FakeSession:
+    """Answers the planner's statements: session size, ANN rows per ef_search, exact rows."""
+
+    def __init__(self, session_rows: int, ann_rows_for_ef, exact_rows: int, pgvector: str = "0.7.4") -> None:  # type: ignore[no-untyped-def]
+        self.session_rows = session_rows
+        self.ann_rows_for_ef = ann_rows_for_ef
+        self.exact_rows = exact_rows
+        self.pgvector = pgvector
+        self.ef = 0
+        self.statements: list[str] = []
+
+    def get_bind(self) -> _Bind:
+        return _Bind()
+
+    def execute(self, stmt, params=None):  # type: ignore[no-untyped-def]
+        sql = str(stmt)
+        self.statements.append(sql)
+        if "extversion" in sql:
+            return _Result(scalar=self.pgvector)
+        if "COUNT(*)" in sql:
+            return _Result(scalar=min(self.session_rows, params["cap"]))
+        if "hnsw.ef_search" in sql:
+            self.ef = int(params["ef"])
+            return _Result()
+        if "set_config" in sql:
+            return _Result()
+        if "MATERIALIZED" in sql:
+            return _Result(rows=self._rows(min(self.exact_rows, params["k"])))
+        return _Result(rows=self._rows(min(self.ann_rows_for_ef(self.ef), params["k"])))
+
+    @staticmethod
+    def _rows(n: int) -> list[dict[str, object]]:
+        return [{"id": str(i), "text": f"t{i}", "role": "user", "score": 1.0 - i / 100} for i in range(n)]
+
+
+def _search(session: _FakeSession, top_k: int = 6):  # type: ignore[no-untyped-def]
+    from memos_server.retrieval import vector_search
+
+    return vector_search(
+        session,  # type: ignore[arg-type]
+        "ns",
+        "s1",
+        None,  # type: ignore[arg-type]
+        top_k,
+        exact_max_rows=100,
+        ef_search=40,
+        max_ef_search=400,
+    )
+
+
+class TestRetrievalPlanner(unittest.TestCase):
+    def setUp(self) -> None:
+        from memos_server import retrieval
+
+        retrieval._PGVECTOR_VERSIONS.clear()
+
+    def test_small_session_uses_exact_scan(self) -> None:
+        res = _search(_FakeSession(session_rows=30, ann_rows_for_ef=lambda ef: 0, exact_rows=30))
+        self.assertEqual(res.strategy_used, "exact_session_scan")
+        self.assertEqual(len(res.rows), 6)
+        self.assertEqual(res.debug()["method"], "retrieval:exact_session_scan")
+
+    def test_large_session_probes_until_top_k(self) -> None:
+        session = _FakeSession(session_rows=10_000, ann_rows_for_ef=lambda ef: ef // 40, exact_rows=10_000)
+        res = _search(session)
+        self.assertEqual(res.strategy_used, "ann_hnsw")
+        self.assertEqual(res.plan.session_rows, 101)
+        self.assertEqual(len(res.rows), 6)
+        self.assertEqual((res.rounds, res.ef_search), (4, 320))
+        self.assertFalse(res.iterative_scan)
+
+    def test_ann_shortfall_falls_back_to_exact(self) -> None:
+        res = _search(_FakeSession(session_rows=10_000, ann_rows_for_ef=lambda ef: 2, exact_rows=10_000))
+        self.assertEqual(res.strategy_used, "exact_session_scan")
+        self.assertEqual(res.ef_search, 400)
+        self.assertEqual(len(res.rows), 6)
+
+    def test_iterative_scan_enabled_on_pgvector_08(self) -> None:
+        session = _FakeSession(session_rows=10_000, ann_rows_for_ef=lambda ef: 50, exact_rows=0, pgvector="0.8.0")
+        res = _search(session)
+        self.assertTrue(res.iterative_scan)
+        self.assertEqual(res.rounds, 1)
+        self.assertTrue(any("hnsw.iterative_scan" in s for s in session.statements))
@@ -0,0 +1,717 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class _FakeRedis:
+    """Just enough of redis-py (decode_responses=True) for the scheduler keys; TTLs are ignored."""
+
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.lists: dict[str, list[str]] = {}
+        # Keys extended by the token-guarded renew script.
+        self.renewals: list[str] = []
+
+    def pipeline(self, transaction: bool = True):  # type: ignore[no-untyped-def]
+        return _Pipeline(self)
+
+    def register_script(self, source: str):  # type: ignore[no-untyped-def]
+        def release(keys, args):  # type: ignore[no-untyped-def]
+            if self.strings.get(keys[0]) == args[0]:
+                del self.strings[keys[0]]
+                return 1
+            return 0
+
+        def renew(keys, args):  # type: ignore[no-untyped-def]
+            if self.strings.get(keys[0]) == args[0]:
+                self.renewals.append(keys[0])
+                return 1
+            return 0
+
+        return renew if "PEXPIRE" in source else release
+
+    def set(self, key: str, value: str, nx: bool = False, px: int | None = None):  # type: ignore[no-untyped-def]
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        return True
+
+    def pexpire(self, key: str, ms: int) -> bool:
+        return key in self.strings
+
+    def hget(self, key: str, field: str):  # type: ignore[no-untyped-def]
+        return self.hashes.get(key, {}).get(field)
+
+    def hset(self, key: str, field: str | None = None, value: object = None, mapping=None) -> None:  # type: ignore[no-untyped-def]
+        h = self.hashes.setdefault(key, {})
+        if field is not None:
+            h[field] = str(value)
+        h.update({k: str(v) for k, v in (mapping or {}).items()})
+
+    def incr(self, key: str) -> int:
+        self.strings[key] = str(int(self.strings.get(key, 0)) + 1)
+        return int(self.strings[key])
+
+    def hincrby(self, key: str, field: str, amount: int) -> int:
+        h = self.hashes.setdefault(key, {})
+        h[field] = str(int(h.get(field, 0)) + amount)
+        return int(h[field])
+
+    def hgetall(self, key: str) -> dict[str, str]:
+        return dict(self.hashes.get(key, {}))
+
+    def zadd(self, key: str, mapping: dict[str, float]) -> None:
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zrange(self, key: str, start: int, end: int, withscores: bool = False):  # type: ignore[no-untyped-def]
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda kv: (kv[1], kv[0]))
+        return items if withscores else [k for k, _ in items]
+
+    def zincrby(self, key: str, amount: float, member: str) -> float:
+        z = self.zsets.setdefault(key, {})
+        z[member] = z.get(member, 0) + amount
+        return z[member]
+
+    def zrem(self, key: str, member: str) -> None:
+        self.zsets.get(key, {}).pop(member, None)
+
+    def zrevrange(self, key: str, start: int, end: int, withscores: bool = False):  # type: ignore[no-untyped-def]
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda kv: -kv[1])[start : end + 1]
+        return items if withscores else [k for k, _ in items]
+
+    def zcard(self, key: str) -> int:
+        return len(self.zsets.get(key, {}))
+
+    def rpush(self, key: str, *values: str) -> int:
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    def lpop(self, key: str, count: int):  # type: ignore[no-untyped-def]
+        items = self.lists.get(key, [])
+        popped, self.lists[key] = items[:count], items[count:]
+        return popped or None
+
+    def llen(self, key: str) -> int:
+        return len(self.lists.get(key, []))
+
+    def lpush(self, key: str, *values: object) -> int:
+        self.lists[key] = [str(v) for v in reversed(values)] + self.lists.get(key, [])
+        return len(self.lists[key])
+
+    def ltrim(self, key: str, start: int, end: int) -> None:
+        self.lists[key] = self.lists.get(key, [])[start : end + 1]
+
+    def lrange(self, key: str, start: int, end: int) -> list[str]:
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start : end + 1]
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.lists.pop(key, None)
+            self.zsets.pop(key, None)
+            self.hashes.pop(key, None)
+            self.strings.pop(key, None)
+
+
+class _Pipeline:
+    def __init__(self, client: _FakeRedis) -> None:
+        self._client = client
+        self._calls: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):  # type: ignore[no-untyped-def]
+        return lambda *args, **kwargs: self._calls.append((name, args, kwargs))
+
+    def execute(self) -> list[object]:
+        return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+
+
+class _FakeQueue:
+    """Records `(delay seconds, func, kwargs)`; positional job args are recorded by name."""
+
+    def __init__(self) -> None:
+        self.jobs: list[tuple[float, str, dict[str, object]]] = []
+        self.descriptions: list[str] = []
+        self.timeouts: list[int] = []
+
+    def _kwargs(self, kwargs: dict[str, object]) -> dict[str, object]:
+        from memos_server.scheduler import JOB_ARGS
+
+        if "description" in kwargs:
+            self.descriptions.append(str(kwargs.pop("description")))
+        if "job_timeout" in kwargs:
+            self.timeouts.append(int(kwargs.pop("job_timeout")))  # type: ignore[call-overload]
+        if "args" in kwargs:
+            return dict(zip(JOB_ARGS, kwargs["args"]))  # type: ignore[call-overload]
+        return kwargs
+
+    def enqueue(self, func: str, **kwargs) -> None:  # type: ignore[no-untyped-def]
+        self.jobs.append((0.0, func, self._kwargs(kwargs)))
+
+    def enqueue_in(self, delay, func: str, **kwargs) -> None:  # type: ignore[no-untyped-def]
+        self.jobs.append((delay.total_seconds(), func, self._kwargs(kwargs)))
+
+    @property
+    def name(self) -> str:
+        return "condensation"
+
+    @property
+    def count(self) -> int:
+        return len(self.jobs)
+
+
+class _Record:
+    def __init__(self, i: int, session_id: str = "s1") -> None:
+        self.id = f"m{i}"
+        self.namespace = "ns"
+        self.session_id = session_id
+
+
+class _Rows:
+    def __init__(self, rows: list[dict[str, object]], scalar: object = None) -> None:
+        self._rows = rows
+        self._scalar = scalar
+        self.rowcount = len(rows)
+
+    def mappings(self):  # type: ignore[no-untyped-def]
+        return self
+
+    def all(self) -> list[dict[str, object]]:
+        return self._rows
+
+    def first(self):  # type: ignore[no-untyped-def]
+        return self._rows[0] if self._rows else None
+
+    def scalar(self):  # type: ignore[no-untyped-def]
+        return self._scalar
+
+
+class _MemoriesSession:
+    """Answers the condensation SQL from an in-memory `memories` table.
+
+    Even-numbered rows carry ingest-time buckets; odd ones were written before enrichment.
+    """
+
+    def __init__(
+        self, n: int, sessions: int = 1, texts: list[tuple[str, str]] | None = None, *, same_created_at: bool = False
+    ) -> None:
+        from memos_server.memory_card import memory_buckets
+
+        # Message i belongs to session s{1 + i % sessions}.
+        self.memories = {}
+        for i in range(n):
+            role, text = texts[i] if texts else ("user", f"message {i}")
+            self.memories[f"m{i}"] = {
+                "id": f"m{i}",
+                "namespace": "ns",
+                "session_id": f"s{1 + i % sessions}",
+                "role": role,
+                "text": text,
+                "buckets": (memory_buckets(role, text) if i % 2 == 0 else None),
+                # `same_created_at`: one multi-row insert (every row gets the same now()).
+                "created_at": ("2026-01-01 00:00:00+00:00" if same_created_at else f"2026-01-01 00:{i // 60:02d}:{i % 60:02d}+00:00"),
+            }
+        self.snapshots: list[dict[str, object]] = []
+        self.statements: list[str] = []
+        self.commits = 0
+
+    def _aggregate(self, ids: list[str], limit: int) -> list[dict[str, object]]:
+        picked = sorted((self.memories[i] for i in ids if i in self.memories), key=lambda r: (r["created_at"], r["id"]))
+        out: dict[tuple[str, str, str], list[str]] = {}
+        for r in picked:
+            for bucket, items in (r["buckets"] or {}).items():
+                seen = out.setdefault((str(r["namespace"]), str(r["session_id"]), bucket), [])
+                seen.extend(item for item in dict.fromkeys(items) if item not in seen)
+        return [
+            {"namespace": k[0], "session_id": k[1], "bucket": k[2], "item": item}
+            for k in sorted(out)
+            for item in out[k][:limit]
+        ]
+
+    def execute(self, stmt, params=None):  # type: ignore[no-untyped-def]
+        sql = str(stmt)
+        self.statements.append(sql)
+        if "INSERT INTO condensations" in sql and "id_0" in params:
+            # Multi-row insert (`bulk_insert`): columns are suffixed with the row number.
+            n = sum(1 for k in params if k.startswith("id_"))
+            for i in range(n):
+                self.snapshots.append({k[: -len(f"_{i}")]: v for k, v in params.items() if k.endswith(f"_{i}")})
+            return _Rows([{}] * n)
+        if "INSERT INTO condensations" in sql:
+            self.snapshots.append(dict(params))
+            return _Rows([], scalar="2026-02-01 00:00:00+00:00")
+        if "SELECT now()" in sql:
+            return _Rows([], scalar="2026-02-01 00:00:00+00:00")
+        if "DISTINCT ON" in sql:
+            latest = {(str(snap["namespace"]), str(snap["session_id"])): snap for snap in self.snapshots}
+            wanted = set(zip(params["namespaces"], params["session_ids"]))
+            return _Rows(
+                [
+                    dict(snap, created_at="2026-02-01 00:00:00+00:00")
+                    for k, snap in latest.items()
+                    if k in wanted
+                ]
+            )
+        if "UPDATE memories" in sql:
+            for i, buckets in zip(params["ids"], params["buckets"]):
+                self.memories[i]["buckets"] = json.loads(buckets)
+            return _Rows([])
+        if "jsonb_each" in sql:
+            return _Rows(self._aggregate(params["ids"], params["limit"]))
+        if "(created_at, id) >" in sql:
+            # Backlog past the previous snapshot's (covered_until, covered_id) cursor.
+            snap = next((x for x in self.snapshots if x["id"] == params["prev_summary_id"]), None)
+            cursor = (str(snap["covered_until"]), str(snap["covered_id"])) if snap else ("", "")
+            rows = [
+                r
+                for r in self.memories.values()
+                if (r["namespace"], r["session_id"]) == (params["namespace"], params["session_id"])
+                and (str(r["created_at"]), str(r["id"])) > cursor
+            ]
+            if "COUNT(*)" in sql:
+                return _Rows([], scalar=len(rows))
+            return _Rows(self._message_rows(rows)[: params["limit"]])
+        if "FROM memories" in sql and "ANY" in sql:
+            return _Rows(self._message_rows([self.memories[i] for i in params["ids"] if i in self.memories]))
+        return _Rows([])
+
+    def _message_rows(self, rows: list[dict[str, object]]) -> list[dict[str, object]]:
+        return [
+            dict(
+                r,
+                text_length=len(str(r["text"])),
+                head=str(r["text"])[:180],
+                text=(r["text"] if r["buckets"] is None else None),
+            )
+            for r in sorted(rows, key=lambda r: (str(r["created_at"]), str(r["id"])))
+        ]
+
+    def commit(self) -> None:
+        self.commits += 1
+
+
+def _scheduler(client: _FakeRedis, queue: _FakeQueue):  # type: ignore[no-untyped-def]
+    from memos_server.scheduler import CondensationScheduler
+
+    return CondensationScheduler(
+        client,  # type: ignore[arg-type]
+        queue,  # type: ignore[arg-type]
+        quiet_ms=2000,
+        max_wait_ms=30_000,
+        run_budget_seconds=30,
+        min_new_messages=4,
+    )
+
+
+class TestCondensationScheduler(unittest.TestCase):
+    def test_bootstrap_goes_to_the_interactive_lane_without_debounce(self) -> None:
+        from memos_server.queue import LANE_BULK, LANE_INTERACTIVE
+        from memos_server.scheduler import BATCH_JOB_FUNC, JOB_FUNC, CondensationScheduler, batch_key, track_pending
+
+        client, bulk, interactive = _FakeRedis(), _FakeQueue(), _FakeQueue()
+        scheduler = CondensationScheduler(
+            client,  # type: ignore[arg-type]
+            bulk,  # type: ignore[arg-type]
+            quiet_ms=2000,
+            max_wait_ms=30_000,
+            run_budget_seconds=30,
+            min_new_messages=4,
+            interactive=interactive,  # type: ignore[arg-type]
+            batch_queue_depth=1,
+        )
+        bulk.jobs.append((0.0, "busy", {}))
+        # Still ingesting: a bulk job would be debounced (or batched at this depth).
+        track_pending(client, [_Record(0)])
+        track_pending(client, [_Record(1, "s2")])
+        self.assertTrue(scheduler.request("ns", "s1", trigger_reason="bootstrap_summary", trigger_details={}))
+        self.assertTrue(scheduler.request("ns", "s2", trigger_reason="new_messages_threshold", trigger_details={}))
+
+        self.assertEqual([(d, f) for d, f, _ in interactive.jobs], [(0.0, JOB_FUNC)])
+        self.assertEqual(interactive.jobs[0][2]["session_id"], "s1")
+        self.assertEqual([f for _, f, _ in bulk.jobs], ["busy", BATCH_JOB_FUNC])
+        self.assertEqual(client.llen(batch_key("condensation")), 1)
+        # Interactive jobs start right away, even while the session keeps ingesting.
+        self.assertFalse(scheduler.defer_if_busy("ns", "s1", dict(interactive.jobs[0][2]), LANE_INTERACTIVE))
+        self.assertEqual(scheduler.stats().interactive, 1)
+        # Lane disabled: every trigger is bulk.
+        self.assertEqual(_scheduler(client, bulk).lane_for("bootstrap_summary"), LANE_BULK)
+
+    def test_lane_wait_percentiles(self) -> None:
+        from memos_server.queue import LANE_BULK, LANE_INTERACTIVE
+        from memos_server.scheduler import _WAIT_SAMPLES, lane_waits, now_ms
+
+        client = _FakeRedis()
+        scheduler = _scheduler(client, _FakeQueue())
+        now = now_ms()
+        for wait in range(1, 101):
+            scheduler.record_wait(LANE_INTERACTIVE, now - wait * 10)
+        interactive, bulk = lane_waits(client)  # type: ignore[arg-type]
+        self.assertEqual((interactive.lane, interactive.samples), (LANE_INTERACTIVE, 100))
+        self.assertTrue(500 <= interactive.p50_ms <= 520, interactive)
+        self.assertTrue(900 <= interactive.p90_ms <= 920, interactive)
+        self.assertTrue(1000 <= interactive.max_ms <= 1020, interactive)
+        self.assertEqual((bulk.lane, bulk.samples, bulk.p99_ms), (LANE_BULK, 0, 0))
+
+        for _ in range(_WAIT_SAMPLES + 10):
+            scheduler.record_wait(LANE_BULK, now)
+        self.assertEqual(lane_waits(client)[1].samples, _WAIT_SAMPLES)  # type: ignore[arg-type]
+
+    def test_requests_coalesce_into_one_job(self) -> None:
+        from memos_server.scheduler import track_pending
+
+        client, queue = _FakeRedis(), _FakeQueue()
+        scheduler = _scheduler(client, queue)
+        track_pending(client, [_Record(i) for i in range(3)], at_ms=1)
+
+        outcomes = [scheduler.request("ns", "s1", trigger_reason="r", trigger_details={}) for _ in range(10)]
+        self.assertEqual(outcomes.count(True), 1)
+        self.assertEqual(len(queue.jobs), 1)
+        # Ingest has long been quiet: runs immediately.
+        self.assertEqual(queue.jobs[0][0], 0.0)
+        stats = scheduler.stats()
+        self.assertEqual((stats.requested, stats.scheduled, stats.coalesced), (10, 1, 9))
+
+    def test_job_payload_is_references_only(self) -> None:
+        from memos_server.scheduler import JOB_ARGS, track_pending
+
+        client, queue = _FakeRedis(), _FakeQueue()
+        scheduler = _scheduler(client, queue)
+        track_pending(client, [_Record(i) for i in range(3)], at_ms=1)
+        details = {"source": "api:/v1/query", "new_message_count": 3}
+        scheduler.request("ns", "s1", trigger_reason="bootstrap_summary", trigger_details=details)
+
+        self.assertEqual(list(queue.jobs[0][2]), list(JOB_ARGS))
+        self.assertEqual(queue.descriptions, ["condense ns/s1"])
+        # The worker resolves the trigger from the session's meta hash.
+        self.assertEqual(scheduler.trigger("ns", "s1"), ("bootstrap_summary", details))
+
+    def test_busy_session_is_debounced(self) -> None:
+        from memos_server.scheduler import now_ms, track_pending
+
+        client, queue = _FakeRedis(), _FakeQueue()
+        scheduler = _scheduler(client, queue)
+        track_pending(client, [_Record(0)])
+        scheduler.request("ns", "s1", trigger_reason="r", trigger_details={})
+        self.assertGreater(queue.jobs[0][0], 1.0)
+
+        # Still ingesting when the job starts: re-scheduled with the same token...
+        job_kwargs = dict(queue.jobs[0][2])
+        track_pending(client, [_Record(1)])
+        self.assertTrue(scheduler.defer_if_busy("ns", "s1", job_kwargs))
+        self.assertEqual(queue.jobs[-1][2]["token"], job_kwargs["token"])
+        # ...but never past max_wait after the first request.
+        job_kwargs["first_requested_ms"] = now_ms() - 30_000
+        self.assertFalse(scheduler.defer_if_busy("ns", "s1", job_kwargs))
+
+    def test_drain_restore_and_follow_up(self) -> None:
+        from memos_server.scheduler import now_ms, track_pending
+
+        client, queue = _FakeRedis(), _FakeQueue()
+        scheduler = _scheduler(client, queue)
+        track_pending(client, [_Record(i) for i in range(3)], at_ms=10)
+        track_pending(client, [_Record(9)], at_ms=5)
+        scheduler.request("ns", "s1", trigger_reason="r", trigger_details={})
+        token = str(queue.jobs[0][2]["token"])
+
+        drained = scheduler.drain("ns", "s1")
+        self.assertEqual([m for m, _ in drained], ["m9", "m0", "m1", "m2"])
+        self.assertEqual(scheduler.drain("ns", "s1"), [])
+
+        # Unfound rows: stale ones are dropped, recent ones kept (and not counted as new work).
+        fresh = now_ms()
+        scheduler.restore("ns", "s1", [("old", 1_000), ("new", fresh * 1000)], drop_stale=True)
+        self.assertFalse(scheduler.finish("ns", "s1", token, trigger_details={}, carried=1))
+        self.assertEqual(len(queue.jobs), 1)
+
+        # Released: new arrivals past the threshold schedule a follow-up right away.
+        scheduler.request("ns", "s1", trigger_reason="r", trigger_details={})
+        token = str(queue.jobs[-1][2]["token"])
+        track_pending(client, [_Record(i) for i in range(10, 14)], at_ms=fresh - 10_000)
+        self.assertTrue(scheduler.finish("ns", "s1", token, trigger_details={}, carried=1))
+        self.assertEqual(scheduler.trigger("ns", "s1")[1]["new_message_count"], 5)
+
+
+class TestBacklogCatchUp(unittest.TestCase):
+    def _fold(self, n: int, pending_n: int, token: str | None = None):  # type: ignore[no-untyped-def]
+        from memos_server.scheduler import fold_backlog, track_pending
+
+        client, queue = _FakeRedis(), _FakeQueue()
+        scheduler = _scheduler(client, queue)
+        if token is not None:
+            client.set("memos:condense:inflight:ns:s1", token)
+        track_pending(client, [_Record(i) for i in range(pending_n)], at_ms=1)
+        session = _MemoriesSession(n)
+        out = fold_backlog(
+            session,  # type: ignore[arg-type]
+            client,  # type: ignore[arg-type]
+            scheduler,
+            "ns",
+            "s1",
+            scheduler.drain("ns", "s1"),
+            max_batch=40,
+            catchup_batches=3,
+            trigger_reason="new_messages_threshold",
+            trigger_details={},
+            token=token,
+        )
+        return client, session, out
+
+    def test_catch_up_renews_the_inflight_marker_per_chunk(self) -> None:
+        client, _, out = self._fold(130, 130, token="t1")
+        self.assertEqual(len(out.results), 4)
+        self.assertEqual(client.renewals, ["memos:condense:inflight:ns:s1"] * 4)
+
+        # A marker re-acquired by a newer request (ours expired) is left alone.
+        client.renewals.clear()
+        client.set("memos:condense:inflight:ns:s1", "t2")
+        self.assertFalse(_scheduler(client, _FakeQueue()).renew("ns", "s1", "t1"))
+        self.assertEqual(client.renewals, [])
+
+    def test_jobs_carry_the_configured_timeout(self) -> None:
+        from memos_server.scheduler import CondensationScheduler, now_ms
+
+        client, queue = _FakeRedis(), _FakeQueue()
+        scheduler = CondensationScheduler(
+            client,  # type: ignore[arg-type]
+            queue,  # type: ignore[arg-type]
+            quiet_ms=2000,
+            max_wait_ms=30_000,
+            run_budget_seconds=30,
+            min_new_messages=4,
+            job_timeout_seconds=600,
+        )
+        client.hset("memos:condense:meta:ns:s1", "last_ingest_ms", "1")
+        scheduler.request("ns", "s1", trigger_reason="r", trigger_details={})
+        client.hset("memos:condense:meta:ns:s2", "last_ingest_ms", str(now_ms()))
+        scheduler.request("ns", "s2", trigger_reason="r", trigger_details={})
+        # Immediate and debounced (`enqueue_in`) jobs alike.
+        self.assertEqual([delay > 0 for delay, _, _ in queue.jobs], [False, True])
+        self.assertEqual(queue.timeouts, [600, 600])
+
+    def test_deep_backlog_is_folded_in_ordered_committed_chunks(self) -> None:
+        from memos_server.scheduler import backlog_depths
+        from memos_server.session_state import SessionState, state_key
+
+        client, session, out = self._fold(130, 130)
+        self.assertTrue(out.catch_up)
+        self.assertEqual([len(r.memory_ids) for r in out.results], [40, 40, 40, 10])
+        self.assertEqual(session.commits, 4)
+        self.assertEqual(out.results[0].memory_ids[0], "m0")
+        self.assertEqual(out.results[-1].memory_ids[-1], "m129")
+        # Each snapshot folds into the previous one and records what it covers.
+        self.assertEqual([s["trigger_reason"] for s in session.snapshots], ["backlog_catch_up"] * 4)
+        for prev, snap in zip(out.results, session.snapshots[1:]):
+            self.assertIn(prev.condensation_id, str(snap["trigger_details"]))
+        self.assertEqual(session.snapshots[-1]["covered_until"], session.memories["m129"]["created_at"])
+        # Hot state points at the last snapshot; the backlog is gone.
+        state = SessionState.from_hash(client.hgetall(state_key("ns", "s1")))
+        self.assertEqual(state.summary_id, out.results[-1].condensation_id)
+        self.assertEqual(backlog_depths(client), [])
+
+    def test_shallow_backlog_folds_one_batch(self) -> None:
+        from memos_server.scheduler import backlog_depths
+
+        client, session, out = self._fold(90, 90)
+        self.assertFalse(out.catch_up)
+        self.assertEqual([len(r.memory_ids) for r in out.results], [40])
+        self.assertEqual(len(out.rest), 50)
+        self.assertEqual(backlog_depths(client), [("ns", "s1", 50)])
+
+    def test_created_at_backlog_folds_rows_sharing_a_timestamp(self) -> None:
+        from memos_server.scheduler import fold_backlog
+
+        # Rows of one batch insert share created_at; chunks end inside that tie group.
+        client, queue = _FakeRedis(), _FakeQueue()
+        session = _MemoriesSession(130, same_created_at=True)
+        out = fold_backlog(
+            session,  # type: ignore[arg-type]
+            client,  # type: ignore[arg-type]
+            _scheduler(client, queue),
+            "ns",
+            "s1",
+            [],
+            max_batch=40,
+            catchup_batches=3,
+            trigger_reason="new_messages_threshold",
+            trigger_details={},
+        )
+        self.assertTrue(out.catch_up)
+        self.assertEqual([len(r.memory_ids) for r in out.results], [40, 40, 40, 10])
+        folded = [m for r in out.results for m in r.memory_ids]
+        self.assertEqual(sorted(folded), sorted(session.memories))
+        self.assertEqual(session.snapshots[-1]["covered_id"], folded[-1])
+
+    def test_unwritten_rows_are_carried(self) -> None:
+        client, session, out = self._fold(30, 35)
+        self.assertEqual([len(r.memory_ids) for r in out.results], [30])
+        self.assertEqual(sorted(m for m, _ in out.carried), ["m30", "m31", "m32", "m33", "m34"])
+
+
+    def test_stored_buckets_are_aggregated_instead_of_reparsed(self) -> None:
+        from memos_server.condensation import structured_condense
+        from memos_server.demo_seed import get_demo_seed_messages_zh
+        from memos_server.scheduler import fold_backlog, track_pending
+
+        seed = get_demo_seed_messages_zh()
+        client, queue = _FakeRedis(), _FakeQueue()
+        scheduler = _scheduler(client, queue)
+        track_pending(client, [_Record(i) for i in range(len(seed))], at_ms=1)
+        session = _MemoriesSession(len(seed), texts=seed)
+        out = fold_backlog(
+            session,  # type: ignore[arg-type]
+            client,  # type: ignore[arg-type]
+            scheduler,
+            "ns",
+            "s1",
+            scheduler.drain("ns", "s1"),
+            max_batch=40,
+            catchup_batches=3,
+            trigger_reason="t",
+            trigger_details={},
+        )
+        self.assertEqual(out.results[0].condensed_text, structured_condense("\n".join(f"[{r}] {t}" for r, t in seed)))
+        # Rows without buckets were enriched on the way.
+        self.assertTrue(all(m["buckets"] is not None for m in session.memories.values()))
+
+
+class TestBatchFallback(unittest.TestCase):
+    def _batch_scheduler(self, client: _FakeRedis, queue: _FakeQueue, batch_size: int = 50):  # type: ignore[no-untyped-def]
+        from memos_server.scheduler import CondensationScheduler
+
+        return CondensationScheduler(
+            client,  # type: ignore[arg-type]
+            queue,  # type: ignore[arg-type]
+            quiet_ms=2000,
+            max_wait_ms=30_000,
+            run_budget_seconds=30,
+            min_new_messages=4,
+            batch_queue_depth=2,
+            batch_size=batch_size,
+        )
+
+    def _busy_queue(self) -> _FakeQueue:
+        queue = _FakeQueue()
+        queue.enqueue("other.job")
+        queue.enqueue("other.job")
+        return queue
+
+    def test_deep_queue_collects_sessions_into_one_batch_job(self) -> None:
+        from memos_server.scheduler import BATCH_JOB_FUNC, batch_key
+
+        client, queue = _FakeRedis(), self._busy_queue()
+        scheduler = self._batch_scheduler(client, queue)
+        for sid in ("s1", "s2", "s3", "s4", "s5"):
+            self.assertTrue(scheduler.request("ns", sid, trigger_reason="t", trigger_details={}))
+
+        batch_jobs = [job for job in queue.jobs if job[1] == BATCH_JOB_FUNC]
+        self.assertEqual(len(batch_jobs), 1)
+        self.assertEqual(batch_jobs[0][2], {"queue_name": "condensation"})
+        self.assertEqual(client.llen(batch_key("condensation")), 5)
+        self.assertEqual(scheduler.stats().batched, 5)
+
+    def test_batch_entries_of_both_payload_formats_are_taken(self) -> None:
+        from memos_server.scheduler import batch_key
+
+        client, queue = _FakeRedis(), self._busy_queue()
+        scheduler = self._batch_scheduler(client, queue)
+        scheduler.request("ns", "s1", trigger_reason="t1", trigger_details={"k": 1})
+        # Pushed before slim payloads: keyword entry with its trigger.
+        old = {"namespace": "ns", "session_id": "s2", "token": "x", "first_requested_ms": 1, "trigger_reason": "t2", "trigger_details": {}}
+        client.rpush(batch_key("condensation"), json.dumps(old))
+
+        entries = {e["session_id"]: e for e in scheduler.take_batch("condensation")}
+        self.assertEqual((entries["s1"]["trigger_reason"], entries["s1"]["trigger_details"]), ("t1", {"k": 1}))
+        self.assertEqual(entries["s2"], old)
+
+    def test_batch_folds_sessions_with_one_fetch_and_one_commit(self) -> None:
+        from memos_server.scheduler import backlog_depths, fold_batch, inflight_key, track_pending
+        from memos_server.session_state import SessionState, state_key
+
+        client, queue = _FakeRedis(), self._busy_queue()
+        scheduler = self._batch_scheduler(client, queue)
+        track_pending(client, [_Record(i, f"s{1 + i % 3}") for i in range(30)], at_ms=1)
+        for sid in ("s1", "s2", "s3"):
+            scheduler.request("ns", sid, trigger_reason="t", trigger_details={})
+        session = _MemoriesSession(30, sessions=3)
+
+        results, legacy = fold_batch(
+            session,  # type: ignore[arg-type]
+            client,  # type: ignore[arg-type]
+            scheduler,
+            scheduler.take_batch("condensation"),
+            max_batch=40,
+        )
+        self.assertEqual(legacy, [])
+        self.assertEqual(len(results), 3)
+        self.assertEqual(session.commits, 1)
+        # One message fetch + one bucket aggregation; rows without buckets are enriched once.
+        self.assertEqual(sum("FROM memories" in sql for sql in session.statements), 2)
+        self.assertEqual(sum("UPDATE memories" in sql for sql in session.statements), 1)
+        self.assertEqual(sum("INSERT INTO condensations" in sql for sql in session.statements), 1)
+        self.assertEqual(sum("INSERT INTO audit_logs" in sql for sql in session.statements), 1)
+        self.assertEqual(sorted(len(r.memory_ids) for r in results), [10, 10, 10])
+        for sid in ("s1", "s2", "s3"):
+            state = SessionState.from_hash(client.hgetall(state_key("ns", sid)))
+            self.assertIn(state.summary_id, {r.condensation_id for r in results})
+            self.assertNotIn(inflight_key("ns", sid), client.strings)
+        self.assertEqual(backlog_depths(client), [])
+
+    def test_batch_matches_per_session_snapshot(self) -> None:
+        from memos_server.scheduler import fold_backlog, fold_batch, track_pending
+
+        client, queue = _FakeRedis(), self._busy_queue()
+        scheduler = self._batch_scheduler(client, queue)
+        track_pending(client, [_Record(i) for i in range(12)], at_ms=1)
+        scheduler.request("ns", "s1", trigger_reason="t", trigger_details={})
+        batched, _ = fold_batch(
+            _MemoriesSession(12),  # type: ignore[arg-type]
+            client,  # type: ignore[arg-type]
+            scheduler,
+            scheduler.take_batch("condensation"),
+            max_batch=40,
+        )
+
+        client2 = _FakeRedis()
+        scheduler2 = _scheduler(client2, _FakeQueue())
+        track_pending(client2, [_Record(i) for i in range(12)], at_ms=1)
+        single = fold_backlog(
+            _MemoriesSession(12),  # type: ignore[arg-type]
+            client2,  # type: ignore[arg-type]
+            scheduler2,
+            "ns",
+            "s1",
+            scheduler2.drain("ns", "s1"),
+            max_batch=40,
+            catchup_batches=3,
+            trigger_reason="t",
+            trigger_details={},
+        )
+        self.assertEqual(batched[0].condensed_text, single.results[0].condensed_text)
+        self.assertEqual(batched[0].memory_ids, single.results[0].memory_ids)
+
+    def test_leftover_entries_schedule_the_next_batch_job(self) -> None:
+        from memos_server.scheduler import BATCH_JOB_FUNC
+
+        client, queue = _FakeRedis(), self._busy_queue()
+        scheduler = self._batch_scheduler(client, queue, batch_size=2)
+        for sid in ("s1", "s2", "s3"):
+            scheduler.request("ns", sid, trigger_reason="t", trigger_details={})
+
+        self.assertEqual(len(scheduler.take_batch("condensation")), 2)
+        self.assertTrue(scheduler.end_batch(queue))  # type: ignore[arg-type]
+        self.assertEqual(sum(job[1] == BATCH_JOB_FUNC for job in queue.jobs), 2)
+        self.assertEqual(len(scheduler.take_batch("condensation")), 1)
+        self.assertFalse(scheduler.end_batch(queue))  # type: ignore[arg-type]
+
+
+if __name__ == "__main__":
+    unittest.main()
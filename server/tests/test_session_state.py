@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class _HashRedis:
+    """Just enough of redis-py (decode_responses=True) for hash-based session state."""
+
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[str, str]] = {}
+        self._results: list[object] = []
+
+    def pipeline(self, transaction: bool = True):  # type: ignore[no-untyped-def]
+        return self
+
+    def execute(self) -> list[object]:
+        out, self._results = self._results, []
+        return out
+
+    def hgetall(self, key: str) -> dict[str, str]:
+        return dict(self.hashes.get(key, {}))
+
+    def hset(self, key: str, field: str | None = None, value: object = None, mapping=None) -> None:  # type: ignore[no-untyped-def]
+        h = self.hashes.setdefault(key, {})
+        if field is not None:
+            h[field] = str(value)
+        h.update({k: str(v) for k, v in (mapping or {}).items()})
+        self._results.append(1)
+
+    def hincrby(self, key: str, field: str, amount: int) -> int:
+        h = self.hashes.setdefault(key, {})
+        h[field] = str(int(h.get(field, 0)) + amount)
+        self._results.append(int(h[field]))
+        return int(h[field])
+
+    def delete(self, key: str) -> None:
+        self.hashes.pop(key, None)
+        self._results.append(1)
+
+
+class _Result:
+    def __init__(self, first=None, scalar=None) -> None:  # type: ignore[no-untyped-def]
+        self._first = first
+        self._scalar = scalar
+
+    def mappings(self):  # type: ignore[no-untyped-def]
+        return self
+
+    def first(self):  # type: ignore[no-untyped-def]
+        return self._first
+
+    def scalar(self):  # type: ignore[no-untyped-def]
+        return self._scalar
+
+
+class _Session:
+    def __init__(self, unsummarized: int) -> None:
+        self.unsummarized = unsummarized
+        self.statements = 0
+
+    def execute(self, stmt, params=None):  # type: ignore[no-untyped-def]
+        self.statements += 1
+        if "FROM condensations" in str(stmt):
+            return _Result(first=None)
+        return _Result(scalar=self.unsummarized)
+
+
+class TestSessionState(unittest.TestCase):
+    def test_bootstrap_then_redis_only(self) -> None:
+        from memos_server.session_state import count_unsummarized, load_or_bootstrap
+
+        client = _HashRedis()
+        # An ingest counter alone (no bootstrap yet) is not a usable state.
+        count_unsummarized(client, {("ns", "s1"): 2})
+        session = _Session(unsummarized=5)
+        state = load_or_bootstrap(session, client, "ns", "s1")  # type: ignore[arg-type]
+        self.assertIsNone(state.summary_id)
+        self.assertEqual(state.unsummarized, 5)
+        self.assertEqual(session.statements, 2)
+
+        count_unsummarized(client, {("ns", "s1"): 3})
+        state = load_or_bootstrap(session, client, "ns", "s1")  # type: ignore[arg-type]
+        self.assertEqual(state.unsummarized, 8)
+        self.assertEqual(session.statements, 2)
+
+    def test_record_summary_consumes_counter(self) -> None:
+        from memos_server.condensation import card_to_plain_text, estimate_tokens
+        from memos_server.session_state import SessionState, count_unsummarized, record_summary, state_key
+
+        client = _HashRedis()
+        count_unsummarized(client, {("ns", "s1"): 6})
+        card = json.dumps({"schema": "memos.memory_card.v2", "facts": ["端口 5432"]}, ensure_ascii=False)
+        record_summary(
+            client,  # type: ignore[arg-type]
+            "ns",
+            "s1",
+            summary_id="c1",
+            created_at="2026-01-01 00:00:00+00:00",
+            condensed_text=card,
+            summarized=4,
+        )
+        state = SessionState.from_hash(client.hgetall(state_key("ns", "s1")))
+        self.assertEqual(state.summary_id, "c1")
+        self.assertEqual(state.unsummarized, 2)
+        self.assertEqual(state.plain_text, card_to_plain_text(card))
+        self.assertEqual(state.token_condensed, estimate_tokens(card_to_plain_text(card)))
+
+        # Summarizing more than was counted (e.g. counter rebuilt meanwhile) clamps at zero.
+        record_summary(client, "ns", "s1", summary_id="c2", created_at="x", condensed_text=card, summarized=9)  # type: ignore[arg-type]
+        self.assertEqual(SessionState.from_hash(client.hgetall(state_key("ns", "s1"))).unsummarized, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class TestVectorCodec(unittest.TestCase):
+    def test_to_vector_is_float32_and_keeps_precision(self) -> None:
+        import numpy as np
+
+        from memos_server.embedding import fake_embedding
+        from memos_server.vector_codec import to_vector
+
+        emb = fake_embedding("what port does redis use?")
+        vec = to_vector(emb, dim=len(emb))
+        self.assertEqual(vec.dtype, np.float32)
+        self.assertEqual(vec.shape, (len(emb),))
+        # Same precision as the float4 `vector` column; no 6-decimal rounding.
+        np.testing.assert_array_equal(vec, np.asarray(emb, dtype=np.float32))
+
+    def test_to_vector_validates_shape(self) -> None:
+        from memos_server.vector_codec import to_vector
+
+        with self.assertRaises(ValueError):
+            to_vector([[0.1, 0.2]])
+        with self.assertRaises(ValueError):
+            to_vector([0.1, 0.2], dim=3)
+        with self.assertRaises(ValueError):
+            to_vector([0.1, float("nan")])
+
+    def test_binary_roundtrip_through_pgvector(self) -> None:
+        import numpy as np
+        from pgvector import Vector
+
+        from memos_server.vector_codec import from_db, to_vector
+
+        vec = to_vector([0.1234567, -0.5, 1.0])
+        loaded = from_db(Vector.from_binary(Vector(vec).to_binary()))
+        np.testing.assert_array_equal(loaded, vec)
+
+    def test_from_db_accepts_text_format(self) -> None:
+        import numpy as np
+
+        from memos_server.vector_codec import from_db
+
+        np.testing.assert_allclose(from_db("[0.5,-1,0.25]"), [0.5, -1.0, 0.25])
+        self.assertIsNone(from_db(None))
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class _FakeProcess:
+    def __init__(self, target, args, name, daemon) -> None:  # type: ignore[no-untyped-def]
+        self.args = args
+        self.alive = False
+        self.exitcode: int | None = None
+        self.terminated = 0
+        self.killed = False
+
+    def start(self) -> None:
+        self.alive = True
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def crash(self, code: int = 1) -> None:
+        self.alive, self.exitcode = False, code
+
+    def terminate(self) -> None:
+        self.terminated += 1
+
+    def kill(self) -> None:
+        self.killed = True
+        self.crash(-9)
+
+    def join(self, timeout: float | None = None) -> None:
+        pass
+
+
+class _FakeContext:
+    def __init__(self) -> None:
+        self.spawned: list[_FakeProcess] = []
+
+    def Process(self, **kwargs) -> _FakeProcess:  # type: ignore[no-untyped-def]
+        proc = _FakeProcess(**kwargs)
+        self.spawned.append(proc)
+        return proc
+
+
+class _FakeStatsRedis:
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[str, int]] = {}
+
+    def hincrby(self, key: str, field: str, n: int) -> int:
+        h = self.hashes.setdefault(key, {})
+        h[field] = h.get(field, 0) + n
+        return h[field]
+
+    def hgetall(self, key: str) -> dict[str, int]:
+        return dict(self.hashes.get(key, {}))
+
+
+class TestShardRouting(unittest.TestCase):
+    def test_sessions_stick_to_one_shard_and_spread(self) -> None:
+        from memos_server.queue import create_queues, shard_index
+
+        queues = create_queues("redis://localhost:6379/0", shards=4)
+        self.assertEqual([q.name for q in queues.shards], [f"condensation:{i}" for i in range(4)])
+        self.assertIs(queues.for_session("ns", "s1"), queues.for_session("ns", "s1"))
+        # crc32 is stable across processes (`hash()` is salted per process).
+        self.assertEqual(shard_index("ns", "s1", 4), shard_index("ns", "s1", 4))
+
+        used = {shard_index("ns", f"s{i}", 4) for i in range(200)}
+        self.assertEqual(used, {0, 1, 2, 3})
+
+    def test_single_shard_uses_plain_queue(self) -> None:
+        from memos_server.queue import create_queues
+        from memos_server.worker_pool import shard_worker_queues
+
+        queues = create_queues("redis://localhost:6379/0", interactive=False)
+        self.assertEqual(queues.shards, ())
+        self.assertIs(queues.for_session("ns", "s1"), queues.condensation)
+        self.assertEqual(shard_worker_queues(queues, 0), [queues.condensation])
+
+    def test_shard_zero_drains_legacy_queue(self) -> None:
+        from memos_server.queue import create_queues
+        from memos_server.worker_pool import shard_worker_queues
+
+        queues = create_queues("redis://localhost:6379/0", shards=3)
+        self.assertEqual(
+            [q.name for q in shard_worker_queues(queues, 0)], ["condensation:interactive", "condensation:0", "condensation"]
+        )
+        self.assertEqual([q.name for q in shard_worker_queues(queues, 2)], ["condensation:interactive", "condensation:2"])
+
+    def test_interactive_lane_first_with_starvation_guard(self) -> None:
+        from memos_server.queue import LaneOrder, create_queues
+        from memos_server.worker_pool import shard_worker_queues
+
+        queues = create_queues("redis://localhost:6379/0", shards=2)
+        order = LaneOrder(shard_worker_queues(queues, 1), burst=3)
+        names = lambda qs: [q.name for q in qs]  # noqa: E731
+        self.assertEqual(names(order.initial()), ["condensation:interactive", "condensation:1"])
+
+        # Two interactive jobs: still interactive first; the third yields one bulk dequeue.
+        self.assertEqual(names(order.after("condensation:interactive"))[0], "condensation:interactive")
+        self.assertEqual(names(order.after("condensation:interactive"))[0], "condensation:interactive")
+        self.assertEqual(names(order.after("condensation:interactive")), ["condensation:1", "condensation:interactive"])
+        # Back to interactive first after that dequeue, whichever lane served it.
+        self.assertEqual(names(order.after("condensation:1"))[0], "condensation:interactive")
+        self.assertEqual(order.streak, 0)
+
+    def test_scheduler_enqueues_on_session_shard(self) -> None:
+        from test_scheduler import _FakeQueue, _FakeRedis
+
+        from memos_server.queue import shard_index
+        from memos_server.scheduler import CondensationScheduler
+
+        shards = [_FakeQueue() for _ in range(4)]
+        scheduler = CondensationScheduler(
+            _FakeRedis(),  # type: ignore[arg-type]
+            _FakeQueue(),  # type: ignore[arg-type]
+            route=lambda ns, sid: shards[shard_index(ns, sid, 4)],  # type: ignore[arg-type,return-value]
+            quiet_ms=0,
+            max_wait_ms=30_000,
+            run_budget_seconds=30,
+            min_new_messages=4,
+        )
+        for sid in ("a", "b", "c", "d", "e"):
+            scheduler.request("ns", sid, trigger_reason="t", trigger_details={})
+
+        for i, queue in enumerate(shards):
+            for _, _, kwargs in queue.jobs:
+                self.assertEqual(shard_index("ns", str(kwargs["session_id"]), 4), i)
+        self.assertEqual(sum(len(q.jobs) for q in shards), 5)
+
+
+class TestWorkerPool(unittest.TestCase):
+    def _pool(self, mp: _FakeContext, client: _FakeStatsRedis | None = None):  # type: ignore[no-untyped-def]
+        from memos_server.worker_pool import WorkerPool
+
+        return WorkerPool(
+            2,
+            lambda index: None,
+            client=client,  # type: ignore[arg-type]
+            queue_names=["condensation:0", "condensation:1"],
+            mp_context=mp,
+        )
+
+    def test_crashed_child_is_restarted_with_backoff(self) -> None:
+        from memos_server.worker_pool import pool_restarts
+
+        mp, client = _FakeContext(), _FakeStatsRedis()
+        pool = self._pool(mp, client)
+        pool.start()
+        self.assertEqual(pool.alive(), 2)
+        t0 = pool._started_at[1]
+
+        # Dies right after starting: first restart has a 1s backoff.
+        mp.spawned[1].crash()
+        pool.supervise_once(now=t0 + 0.5)
+        self.assertEqual(len(mp.spawned), 2)
+        pool.supervise_once(now=t0 + 1.6)
+        self.assertEqual(len(mp.spawned), 3)
+        self.assertEqual(pool.alive(), 2)
+        self.assertEqual(mp.spawned[2].args[1], 1)
+        self.assertEqual(pool_restarts(client), {"condensation:1": 1})  # type: ignore[arg-type]
+
+    def test_child_that_ran_for_a_while_restarts_immediately(self) -> None:
+        mp = _FakeContext()
+        pool = self._pool(mp)
+        pool.start()
+        t0 = pool._started_at[0]
+
+        mp.spawned[0].crash()
+        pool.supervise_once(now=t0 + 60)
+        self.assertEqual(len(mp.spawned), 3)
+        self.assertEqual(pool.restarts, 1)
+
+    def test_stop_drains_then_kills_stragglers(self) -> None:
+        mp = _FakeContext()
+        pool = self._pool(mp)
+        pool.drain_seconds = 0
+        pool.start()
+        mp.spawned[0].crash(0)  # finished its job within the drain window
+
+        pool.stop()
+        self.assertEqual([p.terminated for p in mp.spawned], [0, 1])
+        self.assertEqual([p.killed for p in mp.spawned], [False, True])
+
+        # No restarts once stopping.
+        pool.supervise_once()
+        self.assertEqual(len(mp.spawned), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
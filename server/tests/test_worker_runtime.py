@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class TestWorkerRuntime(unittest.TestCase):
+    def tearDown(self) -> None:
+        from memos_server.worker_runtime import reset_worker_context
+
+        reset_worker_context()
+
+    def test_context_is_built_once_per_process(self) -> None:
+        # Engines and Redis clients connect lazily: no services needed.
+        from memos_server.worker_runtime import get_worker_context, reset_worker_context
+
+        reset_worker_context()
+        first = get_worker_context()
+        self.assertIs(get_worker_context(), first)
+        self.assertIs(get_worker_context().db.engine, first.db.engine)
+
+        reset_worker_context()
+        self.assertIsNot(get_worker_context(), first)
+
+    def test_after_fork_keeps_engine(self) -> None:
+        from memos_server.worker_runtime import _after_fork_in_child, get_worker_context
+
+        ctx = get_worker_context()
+        _after_fork_in_child()
+        self.assertIs(get_worker_context().db.engine, ctx.db.engine)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+import unittest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+class _StreamClient:
+    def __init__(self) -> None:
+        self.entries: list[tuple[str, dict[str, str]]] = []
+
+    def xadd(self, stream: str, fields: dict[str, str]) -> str:
+        entry_id = f"{len(self.entries) + 1}-0"
+        self.entries.append((entry_id, dict(fields)))
+        return entry_id
+
+
+class TestWriteBehindPayload(unittest.TestCase):
+    def test_enqueue_decode_roundtrip(self) -> None:
+        from memos_server.audit import audit_row
+        from memos_server.ingest import new_memory
+        from memos_server.write_behind import _decode, enqueue_ingest
+
+        client = _StreamClient()
+        records = [new_memory("ns", "s1", "user", "端口 5432", {"k": 1}), new_memory("ns", "s1", "agent", "ok")]
+        audit = audit_row("ns", "s1", "INGEST_BATCH", {"count": 2})
+        enqueue_ingest(client, "memos:ingest:stream", records, [audit])  # type: ignore[arg-type]
+
+        ids, decoded, audits = _decode(client.entries)
+        self.assertEqual(ids, ["1-0"])
+        self.assertEqual([r.id for r in decoded], [r.id for r in records])
+        self.assertEqual(decoded[0].text, "端口 5432")
+        self.assertEqual(decoded[0].metadata, {"k": 1})
+        # Accept time is stamped so rows flushed later keep arrival order.
+        self.assertTrue(all(r.created_at for r in decoded))
+        self.assertEqual(audits[0]["id"], audit["id"])
+
+        # Entries queued before per-session batch audits carry a single `audit`.
+        legacy = json.dumps({"memories": [], "audit": audit})
+        self.assertEqual(_decode([("2-0", {"payload": legacy})])[2], [audit])
+
+    def test_malformed_entries_are_acked_not_retried(self) -> None:
+        from memos_server.write_behind import _decode
+
+        ids, decoded, audits = _decode([("1-0", {"payload": "{not json"}), None])
+        self.assertEqual(ids, ["1-0"])
+        self.assertEqual(decoded, [])
+        self.assertEqual(audits, [])
+
+
+class _NoGroupClient:
+    """Stream client whose consumer group vanished (e.g. Redis restarted)."""
+
+    def __init__(self) -> None:
+        self.groups: list[str] = []
+
+    def xautoclaim(self, stream: str, group: str, *args, **kwargs):  # type: ignore[no-untyped-def]
+        import redis
+
+        if group not in self.groups:
+            raise redis.ResponseError("NOGROUP No such key 'memos:ingest:stream' or consumer group")
+        return ("0-0", [], [])
+
+    def xreadgroup(self, *args, **kwargs):  # type: ignore[no-untyped-def]
+        return []
+
+    def xgroup_create(self, stream: str, group: str, **kwargs) -> None:  # type: ignore[no-untyped-def]
+        self.groups.append(group)
+
+
+class TestFlusherLoop(unittest.TestCase):
+    def test_missing_group_is_recreated(self) -> None:
+        from memos_server.write_behind import FLUSHER_GROUP, flush_pass
+
+        client = _NoGroupClient()
+        args = (None, client, None, "memos:ingest:stream", "c1")
+        self.assertEqual(flush_pass(*args, batch_size=10, claim_idle_ms=0), 0)  # type: ignore[arg-type]
+        self.assertEqual(client.groups, [FLUSHER_GROUP])
+        # Next pass reads from the recreated group.
+        self.assertEqual(flush_pass(*args, batch_size=10, claim_idle_ms=0), 0)  # type: ignore[arg-type]
+        self.assertEqual(client.groups, [FLUSHER_GROUP])
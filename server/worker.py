@@ -9,26 +9,64 @@ How to run locally:
   python worker.py
 
 This process listens to the Redis-backed queue and executes background jobs.
+
+Jobs share one per-process runtime (settings, SQLAlchemy engine/pool, Redis clients; see
+`memos_server/worker_runtime.py`), created here before the first job.
+
+Sharded pool (session affinity, see `memos_server/queue.py` / `memos_server/worker_pool.py`):
+
+  MEMOS_CONDENSATION_SHARDS=4 python worker.py --pool     # supervisor + one worker per shard
+  MEMOS_CONDENSATION_SHARDS=4 python worker.py --shard 2  # a single shard (external supervisor)
+
+The API must run with the same MEMOS_CONDENSATION_SHARDS so it routes jobs to the same queues.
+
+Every worker drains the interactive lane (`condensation:interactive`) first; after
+MEMOS_CONDENSATION_INTERACTIVE_BURST interactive jobs in a row it takes one bulk job
+(`LaneOrder` in `memos_server/queue.py`).
 """
 
+import argparse
 import os
 
 import redis
-from rq import SimpleWorker, Worker
+from rq import Queue, SimpleWorker, Worker
 
 from memos_server.env import init_env
+from memos_server.queue import LaneOrder, shard_queue_name
+from memos_server.settings import get_settings
+from memos_server.worker_pool import WorkerPool, shard_worker_queues
+from memos_server.worker_runtime import WorkerContext, init_worker_context
 
 
-def main() -> None:
-  init_env()
+class _LaneWorkerMixin:
+  # RQ calls `reorder_queues` after every dequeue; the lane order replaces its strategy.
+  lane_order: LaneOrder | None = None
+
+  def reorder_queues(self, reference_queue):  # type: ignore[no-untyped-def]
+    if self.lane_order is None:
+      return super().reorder_queues(reference_queue)  # type: ignore[misc]
+    self._ordered_queues = self.lane_order.after(reference_queue.name)
+
+
+class LaneWorker(_LaneWorkerMixin, Worker):
+  pass
+
 
-  redis_url = os.getenv("MEMOS_REDIS_URL", "redis://localhost:6379/0")
-  conn = redis.Redis.from_url(redis_url)
+class LaneSimpleWorker(_LaneWorkerMixin, SimpleWorker):
+  pass
 
-  # RQ's default Worker uses os.fork(), which doesn't exist on Windows.
-  # On Windows we use SimpleWorker (runs jobs in-process).
-  worker_cls = SimpleWorker if os.name == "nt" else Worker
-  worker = worker_cls(["condensation"], connection=conn)
+
+def run_worker(ctx: WorkerContext, queues: list[Queue]) -> None:
+  # Default: SimpleWorker runs jobs in this process, so the runtime (and its warm connection
+  # pool) is reused by every job. MEMOS_WORKER_CLASS=fork restores RQ's fork-per-job Worker
+  # (isolation from leaking/crashing jobs, at the cost of a fresh pool per job).
+  # os.fork() doesn't exist on Windows: always SimpleWorker there.
+  fork = ctx.settings.worker_class == "fork" and os.name != "nt"
+  worker_cls = LaneWorker if fork else LaneSimpleWorker
+  worker = worker_cls(queues, connection=queues[0].connection)
+  if ctx.queues.interactive is not None:
+    worker.lane_order = LaneOrder(queues, burst=ctx.settings.condensation_interactive_burst)
+    worker._ordered_queues = worker.lane_order.initial()
 
   # Make failures loud during local dev/demo so queue stalls are obvious.
   def on_exception(job, exc_type, exc_value, tb):  # type: ignore[no-untyped-def]
@@ -39,7 +77,46 @@ def main() -> None:
       print("[worker] job failed (unable to format exception)")
 
   worker.push_exc_handler(on_exception)
-  worker.work(with_scheduler=False)
+  # The RQ scheduler moves debounced condensation jobs (`enqueue_in`) onto the queue when due.
+  worker.work(with_scheduler=True)
+
+
+def run_shard(index: int) -> None:
+  # Pool children build their own runtime (nothing is shared with the supervisor).
+  ctx = init_worker_context()
+  run_worker(ctx, shard_worker_queues(ctx.queues, index))
+
+
+def run_pool() -> None:
+  init_env()
+  settings = get_settings()
+  shards = max(1, int(settings.condensation_shards))
+  pool = WorkerPool(
+    shards,
+    run_shard,
+    client=redis.Redis.from_url(settings.redis_url, decode_responses=True),
+    queue_names=[shard_queue_name(i, shards) for i in range(shards)],
+    drain_seconds=settings.worker_pool_drain_seconds,
+  )
+  print(f"[worker-pool] starting {shards} worker(s)")
+  pool.run()
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="MemOS condensation worker")
+  mode = parser.add_mutually_exclusive_group()
+  mode.add_argument("--pool", action="store_true", help="supervise one worker process per shard")
+  mode.add_argument("--shard", type=int, default=None, help="consume a single shard queue")
+  args = parser.parse_args()
+
+  if args.pool:
+    run_pool()
+  elif args.shard is not None:
+    run_shard(args.shard)
+  else:
+    ctx = init_worker_context()
+    # Unsharded: the one queue; sharded without a pool: every shard in this process.
+    run_worker(ctx, ctx.queues.all() if ctx.queues.shards else shard_worker_queues(ctx.queues, 0))
 
 
 if __name__ == "__main__":
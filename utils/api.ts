@@ -79,6 +79,7 @@ export type QueryResponse = {
   session_summary_id?: string | null;
   session_summary_cache_hit?: boolean;
   session_summary_enqueued?: boolean;
+  session_summary_deferred?: boolean;
   context_pack_id?: string | null;
   context_pack?: Record<string, unknown>;
 };